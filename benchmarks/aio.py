@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Usage:
+    aio.py [--requests=<N>] [--concurrency=<N>] [--workers=<N>] [--kdf-cost=<N>] [<NAME>...]
+    aio.py --help
+
+Arguments:
+    <NAME>                    only run the named operations
+                              (generate, encrypt and derive by default)
+
+Options:
+    -n --requests=<N>         operations run per measurement [default: 200]
+    -c --concurrency=<N>      coroutines issuing operations at once [default: 32]
+    -w --workers=<N>          processes in the papyrus.aio pool [default: all cores]
+    --kdf-cost=<N>            KDF cost used by encrypt [default: 12]
+    -h --help                 display this help
+
+Runs each operation --requests times from --concurrency coroutines, once
+inline on the event loop and once through papyrus.aio, while a heartbeat
+coroutine measures how late the event loop wakes it up. Inline calls block
+the loop for the length of every operation, offloaded ones should keep the
+lag close to zero however many requests are in flight.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+from docopt import docopt
+
+PASSPHRASE = 'benchmark passphrase'
+
+# The heartbeat asks to be woken up this often
+TICK = 0.001
+
+OPERATIONS = ('generate', 'encrypt', 'derive')
+
+def get_operations(kdf_cost):
+    from papyrus import aio
+    from papyrus.account import BitcoinAccount
+    from papyrus.derivation import derive
+    from papyrus.encryption import KeyEncryptor
+
+    xpub = BitcoinAccount.generate().pub_key()
+    counter = iter(range(1 << 31))
+
+    # (inline, offloaded) pairs, each taking the pool
+    return {'generate': (lambda pool: BitcoinAccount.generate(),
+                         lambda pool: aio.agenerate(BitcoinAccount, pool=pool)),
+            'encrypt': (lambda pool: KeyEncryptor(PASSPHRASE, cost=kdf_cost).encrypt('key'),
+                        lambda pool: aio.aencrypt('key', PASSPHRASE, cost=kdf_cost, pool=pool)),
+            'derive': (lambda pool: derive(xpub, 'M/0/{}'.format(next(counter))),
+                       lambda pool: aio.aderive(xpub, 'M/0/{}'.format(next(counter)), pool=pool)),
+            }
+
+async def heartbeat(lags, stop):
+    loop = asyncio.get_running_loop()
+
+    while not stop.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0, loop.time() - expected))
+
+async def load(operation, pool, requests, concurrency, offload):
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            if offload:
+                await operation(pool)
+            else:
+                operation(pool)
+                # Let the heartbeat run between blocking calls
+                await asyncio.sleep(0)
+
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+
+async def measure(operation, pool, requests, concurrency, offload):
+    lags = []
+    stop = asyncio.Event()
+    beat = asyncio.ensure_future(heartbeat(lags, stop))
+
+    start = time.perf_counter()
+    await load(operation, pool, requests, concurrency, offload)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+
+    lags.sort()
+    return (requests / elapsed,
+            1000 * statistics.median(lags),
+            1000 * lags[int(len(lags) * 0.99)],
+            1000 * lags[-1])
+
+def main():
+    args = docopt(__doc__)
+    requests = int(args['--requests'])
+    concurrency = int(args['--concurrency'])
+    workers = None if args['--workers'] == 'all cores' else int(args['--workers'])
+    names = args['<NAME>'] or OPERATIONS
+
+    unknown = sorted(set(names) - set(OPERATIONS))
+    if unknown:
+        sys.exit('Unknown operation: {}'.format(', '.join(unknown)))
+
+    from papyrus.aio import AsyncPool
+
+    operations = get_operations(int(args['--kdf-cost']))
+    loop = asyncio.new_event_loop()
+
+    print('{:<10} {:<8} {:>10} {:>12} {:>12} {:>12}'.format('operation', 'mode', 'ops/s',
+                                                          'lag p50 ms', 'lag p99 ms', 'lag max ms'))
+    with AsyncPool(workers=workers) as pool:
+        # Start the worker processes before measuring
+        loop.run_until_complete(pool.run(os.getpid))
+
+        for name in names:
+            for mode, operation in zip(('inline', 'aio'), operations[name]):
+                result = loop.run_until_complete(measure(operation, pool, requests, concurrency, mode == 'aio'))
+                print('{:<10} {:<8} {:>10.1f} {:>12.2f} {:>12.2f} {:>12.2f}'.format(name, mode, *result))
+
+    loop.close()
+
+if __name__ == '__main__':
+    main()
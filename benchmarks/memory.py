@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Usage:
+    memory.py [--count=<N>] [<NAME>...]
+    memory.py --help
+
+Arguments:
+    <NAME>                    only measure the named account types
+                              (ethereum and bitcoin by default)
+
+Options:
+    -n --count=<N>            accounts kept alive per measurement [default: 1000]
+    -h --help                 display this help
+
+Reports the memory held per account right after generation and after its
+keys and address have been formatted once, as when they are written out.
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from docopt import docopt
+
+ACCOUNT_TYPES = ('ethereum', 'bitcoin')
+
+def get_account_cls(name):
+    from papyrus.account import BitcoinAccount, EthereumAccount
+
+    return {'ethereum': EthereumAccount,
+            'bitcoin': BitcoinAccount,
+            }[name]
+
+def _format(account):
+    account.pub_key()
+    account.priv_key()
+    account.address()
+
+def measure(account_cls, count):
+    # Warm up first so imports and caches are not counted against the accounts
+    _format(account_cls.generate())
+
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+
+    accounts = [account_cls.generate() for _ in range(count)]
+    gc.collect()
+    generated = tracemalloc.get_traced_memory()[0] - start
+
+    for account in accounts:
+        _format(account)
+    gc.collect()
+    formatted = tracemalloc.get_traced_memory()[0] - start
+
+    tracemalloc.stop()
+    return generated / count, formatted / count
+
+def main():
+    args = docopt(__doc__)
+    count = int(args['--count'])
+    names = args['<NAME>'] or ACCOUNT_TYPES
+
+    unknown = sorted(set(names) - set(ACCOUNT_TYPES))
+    if unknown:
+        sys.exit('Unknown account type: {}'.format(', '.join(unknown)))
+
+    print('{:<10} {:>12} {:>12}'.format('account', 'generated', 'formatted'))
+    for name in names:
+        generated, formatted = measure(get_account_cls(name), count)
+        print('{:<10} {:>10.0f} B {:>10.0f} B'.format(name, generated, formatted))
+
+if __name__ == '__main__':
+    main()
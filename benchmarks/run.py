@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+"""
+Usage:
+    run.py [--save=<FILE>] [--compare=<FILE>] [--threshold=<PERCENT>] [--duration=<SECONDS>] [<NAME>...]
+    run.py --list
+    run.py --help
+
+Arguments:
+    <NAME>                    only run the named benchmarks (all by default)
+
+Options:
+    -s --save=<FILE>          record the results as a baseline in FILE
+    -c --compare=<FILE>       compare the results against the baseline in FILE
+    -t --threshold=<PERCENT>  slowdown tolerated before a benchmark is reported
+                              as a regression [default: 20]
+    -d --duration=<SECONDS>   time spent measuring each benchmark [default: 1]
+    -l --list                 list the available benchmarks
+    -h --help                 display this help
+
+Exits with a non-zero status when --compare finds a regression.
+"""
+
+import io
+import sys
+import json
+import time
+import platform
+import itertools
+
+from docopt import docopt
+
+PASSPHRASE = 'benchmark passphrase'
+
+# Measurements are taken in rounds and the fastest round is kept, which is
+# the most stable figure on a machine that is doing other work
+ROUNDS = 5
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+# Each benchmark does its (untimed) setup and returns the operation to time
+
+@benchmark('ethereum_generate')
+def ethereum_generate():
+    from papyrus.account import EthereumAccount
+
+    return EthereumAccount.generate
+
+@benchmark('bitcoin_generate')
+def bitcoin_generate():
+    from papyrus.account import BitcoinAccount
+
+    return BitcoinAccount.generate
+
+@benchmark('ec_generate_ecdsa')
+def ec_generate_ecdsa():
+    from papyrus.account import ECDSABackend
+
+    return ECDSABackend().generate
+
+@benchmark('ec_generate_openssl')
+def ec_generate_openssl():
+    from papyrus.account import OpenSSLBackend
+
+    return OpenSSLBackend().generate
+
+@benchmark('ec_public_key')
+def ec_public_key():
+    from papyrus.account import get_ec_backend
+
+    secret, _ = get_ec_backend().generate()
+    return lambda: get_ec_backend().public_key(secret)
+
+@benchmark('ec_table_build')
+def ec_table_build():
+    from papyrus.curve import FixedBaseTable
+
+    return FixedBaseTable.build
+
+@benchmark('ec_table_load')
+def ec_table_load():
+    import os
+    import atexit
+    import tempfile
+    from papyrus.curve import FixedBaseTable
+
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    atexit.register(os.remove, filename)
+
+    FixedBaseTable.build().save(filename)
+    return lambda: FixedBaseTable.load(filename)
+
+@benchmark('drbg_randrange')
+def drbg_randrange():
+    from ecdsa import SECP256k1
+    from papyrus.entropy import HmacDRBG
+
+    drbg = HmacDRBG()
+    return lambda: drbg.randrange(SECP256k1.order)
+
+@benchmark('ethereum_pub_key')
+def ethereum_pub_key():
+    from papyrus.account import EthereumAccount
+
+    # Accounts cache their public key so create a fresh one for every call
+    secret = EthereumAccount.generate()._priv_key
+    return lambda: EthereumAccount(priv_key=secret).pub_key()
+
+@benchmark('bitcoin_pub_key')
+def bitcoin_pub_key():
+    from papyrus.account import BitcoinAccount
+
+    account = BitcoinAccount.generate()
+    return lambda: BitcoinAccount(priv_key=account._priv_key, network=account._network).pub_key()
+
+@benchmark('ethereum_address')
+def ethereum_address():
+    from papyrus.account import EthereumAccount
+
+    pub_key = EthereumAccount.generate()._pub_key
+    return lambda: EthereumAccount(pub_key=pub_key).address()
+
+@benchmark('bitcoin_address')
+def bitcoin_address():
+    from papyrus.account import BitcoinAccount
+
+    account = BitcoinAccount.generate()
+    return lambda: BitcoinAccount(pub_key=account.pub_key(), network=account._network).address()
+
+@benchmark('bitcoin_derive_range')
+def bitcoin_derive_range():
+    from papyrus.account import BitcoinAccount
+
+    account = BitcoinAccount.generate()
+    watch_only = BitcoinAccount(pub_key=account.pub_key(), network=account._network)
+    children = watch_only.derive_range(0, 0x7fffffff)
+    return lambda: next(children)
+
+@benchmark('multichain_addresses')
+def multichain_addresses():
+    from papyrus.multichain import MultiChainAccount
+
+    secret = MultiChainAccount.generate()._priv_key
+    return lambda: MultiChainAccount(priv_key=secret).serialize()
+
+@benchmark('multichain_from_secrets')
+def multichain_from_secrets():
+    import os
+    from papyrus.account import KEY_STREAM_BATCH_SIZE
+    from papyrus.multichain import MultiChainAccount
+
+    # Times a whole batch, points are only computed when a batch starts
+    secrets = [os.urandom(32) for _ in range(KEY_STREAM_BATCH_SIZE)]
+    return lambda: [account.serialize() for account in MultiChainAccount.from_secrets(secrets)]
+
+@benchmark('key_stream')
+def key_stream():
+    from papyrus.account import key_stream
+
+    keys = key_stream()
+    return lambda: next(keys)
+
+@benchmark('encrypted_priv_key')
+def encrypted_priv_key():
+    from papyrus.account import EthereumAccount
+
+    account = EthereumAccount.generate()
+    return lambda: account.encrypted_priv_key(PASSPHRASE)
+
+@benchmark('key_encryptor')
+def key_encryptor():
+    from papyrus.account import EthereumAccount
+    from papyrus.encryption import KeyEncryptor
+
+    account = EthereumAccount.generate()
+    encryptor = KeyEncryptor(PASSPHRASE)
+    return lambda: account.encrypted_priv_key(encryptor=encryptor)
+
+@benchmark('decrypt')
+def decrypt():
+    from papyrus.account import EthereumAccount
+    from papyrus.encryption import KeyDecryptor
+
+    # A fresh decryptor per call so every decrypt pays for the derivation
+    encrypted_key = EthereumAccount.generate().encrypted_priv_key(PASSPHRASE)
+    return lambda: KeyDecryptor(PASSPHRASE).decrypt(encrypted_key)
+
+@benchmark('qrcode_png')
+def qrcode_png():
+    import qrcode
+    from papyrus.account import EthereumAccount
+
+    address = EthereumAccount.generate().address()
+    return lambda: qrcode.make(address).save(io.BytesIO())
+
+@benchmark('qr_encode')
+def qr_encode():
+    from papyrus import qr
+    from papyrus.account import EthereumAccount
+
+    address = EthereumAccount.generate().address()
+
+    def encode():
+        qr.clear_cache()
+        qr.encode(address, account_type=EthereumAccount.ACCOUNT_TYPE)
+    return encode
+
+@benchmark('qr_encode_fixed_mask')
+def qr_encode_fixed_mask():
+    from papyrus import qr
+    from papyrus.account import EthereumAccount
+
+    address = EthereumAccount.generate().address()
+
+    def encode():
+        qr.clear_cache()
+        qr.encode(address, account_type=EthereumAccount.ACCOUNT_TYPE, mask=0)
+    return encode
+
+@benchmark('qr_png')
+def qr_png():
+    from papyrus import qr
+    from papyrus.account import EthereumAccount
+
+    address = EthereumAccount.generate().address()
+    return lambda: qr.make_image(address, account_type=EthereumAccount.ACCOUNT_TYPE).save(io.BytesIO(), 'PNG')
+
+@benchmark('qr_terminal')
+def qr_terminal():
+    from papyrus import qr
+    from papyrus.account import EthereumAccount
+
+    address = EthereumAccount.generate().address()
+    account_type = EthereumAccount.ACCOUNT_TYPE
+    stream = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+
+    def draw():
+        # Encoding is measured by qr_encode, only time the rendering
+        qr.draw(address, account_type=account_type, stream=stream)
+        stream.buffer.seek(0)
+        stream.buffer.truncate()
+    return draw
+
+def measure(func, duration):
+    # Calibrate the number of calls per round so a round lasts roughly
+    # duration / ROUNDS seconds
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in itertools.repeat(None, calls):
+            func()
+        elapsed = time.perf_counter() - start
+
+        if elapsed >= duration / ROUNDS / 10 or calls >= 1 << 20:
+            break
+        calls *= 2
+
+    calls = max(1, int(calls * (duration / ROUNDS) / max(elapsed, 1e-9)))
+
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in itertools.repeat(None, calls):
+            func()
+        elapsed = (time.perf_counter() - start) / calls
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def run(names, duration):
+    results = {}
+
+    for name in names:
+        seconds = measure(BENCHMARKS[name](), duration)
+        results[name] = seconds
+
+        print('{:<24}{:>14.1f} us/op{:>14.1f} ops/s'.format(name, seconds * 1e6, 1 / seconds))
+
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+
+    print()
+    for name, seconds in sorted(results.items()):
+        if name not in baseline:
+            print('{:<24}{:>14}'.format(name, 'no baseline'))
+            continue
+
+        change = seconds / baseline[name] - 1
+        regressed = change > threshold
+        print('{:<24}{:>+13.1f}%{}'.format(name, change * 100, '  REGRESSION' if regressed else ''))
+
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+if __name__ == '__main__':
+    args = docopt(__doc__)
+
+    if args['--list']:
+        print('\n'.join(sorted(BENCHMARKS)))
+        sys.exit(0)
+
+    names = args['<NAME>'] or sorted(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        sys.exit('Unknown benchmarks: {}'.format(', '.join(unknown)))
+
+    results = run(names, float(args['--duration']))
+
+    if args['--save']:
+        with open(args['--save'], 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'results': results,
+                       },
+                      f,
+                      indent=4,
+                      sort_keys=True)
+
+    if args['--compare']:
+        with open(args['--compare']) as f:
+            baseline = json.load(f)['results']
+
+        if compare(results, baseline, float(args['--threshold']) / 100):
+            sys.exit(1)
@@ -13,15 +13,17 @@ setup(
     include_package_data=True,
     entry_points={},
     scripts=['scripts/papyrus'],
+    python_requires='>=3.7',
     install_requires=['cryptography',
                       'qrcode',
-                      'qrcode-terminal',
+                      'pillow',
                       'docopt',
                       'blessings',
                       'ecdsa',
                       'pysha3',
                       'bitmerchant',
-                      'qrtools',
+                      'base58',
+                      'zbar',
                       'lockbox'],
     dependency_links=['git+https://github.com/kyokley/lockbox.git@master#egg=lockbox-1.0'],
     setup_requires=['pytest-runner'],
@@ -33,12 +35,8 @@ setup(
         'Intended Audience :: Developers',
         'License :: Other/Proprietary License',
         'Natural Language :: English',
-        "Programming Language :: Python :: 2",
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
+        'Programming Language :: Python :: 3.7',
         # An invalid classifier disables uploads to PyPI; DevPi doesn't care.
         'Private :: Do Not Upload',
     ],
@@ -1,4 +1,34 @@
-from papyrus.account import (BitcoinAccount,
-                             EthereumAccount,
-                             PapyrusException,
-                             )
+import importlib
+
+from papyrus.exceptions import PapyrusException
+
+# Submodules pull in heavy dependencies (ecdsa, bitmerchant, lockbox...) so
+# they are only imported the first time one of their names is accessed
+_LAZY_ATTRIBUTES = {'AccountRecord': 'papyrus.account',
+                    'BitcoinAccount': 'papyrus.account',
+                    'EthereumAccount': 'papyrus.account',
+                    'generate_many': 'papyrus.account',
+                    'VanityPattern': 'papyrus.vanity',
+                    'find_vanity': 'papyrus.vanity',
+                    'DerivationCache': 'papyrus.derivation',
+                    'derive': 'papyrus.derivation',
+                    'KeyEncryptor': 'papyrus.encryption',
+                    'KeyDecryptor': 'papyrus.encryption',
+                    'AccountTable': 'papyrus.table',
+                    'AddressCollector': 'papyrus.index',
+                    'AddressIndex': 'papyrus.index',
+                    'merge_index': 'papyrus.index',
+                    'MultiChainAccount': 'papyrus.multichain',
+                    'HmacDRBG': 'papyrus.entropy',
+                    'AsyncPool': 'papyrus.aio',
+                    }
+
+__all__ = ['PapyrusException'] + sorted(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError("module 'papyrus' has no attribute '{}'".format(name))
+
+    return getattr(importlib.import_module(module), name)
@@ -1,20 +1,144 @@
+import hmac
 import sha3
-import qrcode_terminal
+import itertools
 
-from bitmerchant.wallet import Wallet
+from binascii import unhexlify
+from collections import namedtuple
+from hashlib import sha512
+
+# Dependencies that are only needed by some code paths (bitmerchant's wallet
+# for bitcoin, cryptography for encryption, qrcode for display) are
+# imported where they are used to keep `import papyrus` cheap
 from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
-from ecdsa import SigningKey, SECP256k1
-from lockbox import encrypt
+from ecdsa import SECP256k1
+from ecdsa.util import randrange
+
+from papyrus.curve import GX, GY, add_affine, get_table, to_affine
+from papyrus.encryption import KeyEncryptor
+from papyrus.exceptions import PapyrusException
+
+# Child numbers at or above this use hardened (private) derivation
+HARDENED_BOUNDARY = 0x80000000
+
+# Number of points converted to affine coordinates with a single inversion
+KEY_STREAM_BATCH_SIZE = 256
+
+MAINNET = 'mainnet'
+TESTNET = 'testnet'
+
+AccountRecord = namedtuple('AccountRecord', ['account_type',
+                                             'network',
+                                             'address',
+                                             'pub_key',
+                                             'priv_key',
+                                             'derivation_path',
+                                             ])
+
+# Keys and addresses are kept as raw bytes, hex and base58 are only produced
+# when asked for. Batches keep hundreds of thousands of accounts alive so this
+# (and the slots) keep each one to a few hundred bytes.
+SECRET_SIZE = 32
+ETHEREUM_PUB_KEY_SIZE = 64
+ADDRESS_SIZE = 20
+EXTENDED_KEY_SIZE = 78
+
+class ECDSABackend(object):
+    # Pure Python secp256k1 arithmetic, always available
+    NAME = 'ecdsa'
+
+    def generate(self, drbg=None):
+        # Returns a random secret exponent and its 64 byte public key. The
+        # secret is drawn from drbg (an HmacDRBG) when given, from the OS
+        # otherwise.
+        secret = randrange(SECP256k1.order) if drbg is None else drbg.randrange(SECP256k1.order)
+        return secret, self.public_key(secret)
+
+    def public_key(self, secret):
+        # A few dozen additions of precomputed multiples of G, see
+        # papyrus.curve
+        return get_table().multiply(secret)
+
+class OpenSSLBackend(ECDSABackend):
+    # Generates keys with OpenSSL through cryptography, in constant time.
+    # Public keys of existing secrets still come from the fixed-base table:
+    # cryptography validates a loaded secret with a second scalar
+    # multiplication, which makes that about three times slower than the
+    # table.
+    NAME = 'openssl'
+
+    def __init__(self):
+        from cryptography.exceptions import UnsupportedAlgorithm
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+        self._ec = ec
+        self._curve = ec.SECP256K1()
+        self._encoding = (Encoding.X962, PublicFormat.UncompressedPoint)
+
+        try:
+            ec.generate_private_key(self._curve)
+        except UnsupportedAlgorithm:
+            raise PapyrusException('OpenSSL was built without secp256k1 support')
+
+    def generate(self, drbg=None):
+        if drbg is None:
+            key = self._ec.generate_private_key(self._curve)
+        else:
+            # The table is not constant time, new secrets drawn from a DRBG
+            # are multiplied by OpenSSL despite the cost of validating them
+            key = self._ec.derive_private_key(drbg.randrange(SECP256k1.order), self._curve)
+
+        return (key.private_numbers().private_value,
+                key.public_key().public_bytes(*self._encoding)[1:])
+
+EC_BACKENDS = {ECDSABackend.NAME: ECDSABackend,
+               OpenSSLBackend.NAME: OpenSSLBackend,
+               }
+
+# Chosen on first use in each process
+_ec_backend = None
+
+def get_ec_backend():
+    global _ec_backend
+
+    if _ec_backend is None:
+        try:
+            _ec_backend = OpenSSLBackend()
+        except (ImportError, PapyrusException):
+            _ec_backend = ECDSABackend()
+
+    return _ec_backend
+
+def set_ec_backend(name):
+    global _ec_backend
+
+    if name not in EC_BACKENDS:
+        raise ValueError('Unknown EC backend: {}'.format(name))
+
+    _ec_backend = EC_BACKENDS[name]()
+    return _ec_backend
 
-class PapyrusException(Exception):
-    pass
+def _compress(pub_key):
+    # Compressed SEC encoding of a 64 byte public key
+    return bytes([2 + (pub_key[63] & 1)]) + pub_key[:32]
+
+def _check_size(name, value, size):
+    if value is not None and len(value) != size:
+        raise ValueError('{} must be {} bytes, not {}'.format(name, size, len(value)))
+
+    return value
 
 class Account(object):
+    ACCOUNT_TYPE = None
+
+    __slots__ = ('_pub_key', '_priv_key', '_address', '_network', '_derivation_path')
+
     def __init__(self,
                  pub_key=None,
                  priv_key=None,
                  address=None,
                  network=None,
+                 derivation_path=None,
                  ):
         if not pub_key and not priv_key:
             raise ValueError('A private or public key must be provided')
@@ -23,6 +147,7 @@ class Account(object):
         self._priv_key = priv_key
         self._address = address
         self._network = network
+        self._derivation_path = derivation_path
 
     def __str__(self):
         if self.has_private_keys:
@@ -39,6 +164,14 @@ class Account(object):
     def has_private_keys(self):
         return bool(self._priv_key)
 
+    @property
+    def network_name(self):
+        return MAINNET
+
+    @property
+    def derivation_path(self):
+        return self._derivation_path
+
     def pub_key(self):
         raise NotImplementedError('This function must be overridden by subclasses')
 
@@ -53,89 +186,350 @@ class Account(object):
         raise NotImplementedError('This function must be overridden by subclasses')
 
     def print_qrcode(self):
+        from papyrus import qr
+
         print('Address: ')
-        qrcode_terminal.draw(self._address)
+        qr.draw(self.address(), account_type=self.ACCOUNT_TYPE)
+
+    def encrypted_priv_key(self, passphrase=None, encryptor=None):
+        # Pass a KeyEncryptor to choose the KDF and its cost, or when
+        # encrypting many accounts with the same passphrase so the key is only
+        # derived once
+        if encryptor is None:
+            encryptor = KeyEncryptor(passphrase)
 
-    def encrypted_priv_key(self, passphrase):
-        return encrypt(passphrase, self.priv_key())
+        return encryptor.encrypt(self.priv_key())
+
+    def serialize(self):
+        return AccountRecord(account_type=self.ACCOUNT_TYPE,
+                             network=self.network_name,
+                             address=self.address(),
+                             pub_key=self.pub_key(),
+                             priv_key=self.priv_key() if self.has_private_keys else None,
+                             derivation_path=self.derivation_path,
+                             )
+
+def _ethereum_bytes(key):
+    # ecdsa keys and hex strings (with or without 0x) are accepted as well
+    if key is None or isinstance(key, bytes):
+        return key
+
+    if hasattr(key, 'to_string'):
+        return key.to_string()
+
+    return unhexlify(key[2:] if key.startswith('0x') else key)
 
 class EthereumAccount(Account):
+    ACCOUNT_TYPE = 'ethereum'
+
+    __slots__ = ()
+
+    def __init__(self,
+                 pub_key=None,
+                 priv_key=None,
+                 address=None,
+                 network=None,
+                 derivation_path=None,
+                 ):
+        super().__init__(pub_key=_check_size('Public key', _ethereum_bytes(pub_key), ETHEREUM_PUB_KEY_SIZE),
+                         priv_key=_check_size('Private key', _ethereum_bytes(priv_key), SECRET_SIZE),
+                         address=_check_size('Address', _ethereum_bytes(address), ADDRESS_SIZE),
+                         network=network,
+                         derivation_path=derivation_path,
+                         )
+
     @classmethod
-    def generate(cls):
-        priv_key = SigningKey.generate(curve=SECP256k1)
-        pub_key = priv_key.get_verifying_key()
+    def generate(cls, drbg=None):
+        secret, pub_key = get_ec_backend().generate(drbg)
 
         return cls(pub_key=pub_key,
-                   priv_key=priv_key)
+                   priv_key=secret.to_bytes(SECRET_SIZE, 'big'))
 
-    def pub_key(self):
+    def _pub_key_bytes(self):
         if not self._pub_key:
-            self._pub_key = self._priv_key.get_verifying_key()
+            self._pub_key = get_ec_backend().public_key(int.from_bytes(self._priv_key, 'big'))
 
-        return self._pub_key.to_string().hex()
+        return self._pub_key
+
+    def pub_key(self):
+        return self._pub_key_bytes().hex()
 
     def priv_key(self):
         if not self.has_private_keys:
             raise ValueError('This Account object does not contain private keys')
 
-        return self._priv_key.to_string().hex()
+        return self._priv_key.hex()
 
-    def address(self):
+    def _address_bytes(self):
         if not self._address:
             keccak = sha3.keccak_256()
-            keccak.update(self._pub_key.to_string())
+            keccak.update(self._pub_key_bytes())
 
-            self._address = '0x' + keccak.hexdigest()[24:]
+            self._address = keccak.digest()[12:]
 
         return self._address
 
+    def address(self):
+        return '0x' + self._address_bytes().hex()
+
+def _decode_extended_key(key, version):
+    # Base58 extended keys are decoded, the version checks the network and
+    # whether the key is public or private
+    if key is None:
+        return None
+
+    if not isinstance(key, bytes):
+        import base58
+
+        key = base58.b58decode_check(key)
+
+    _check_size('Extended key', key, EXTENDED_KEY_SIZE)
+
+    if key[:4] != version.to_bytes(4, 'big'):
+        raise ValueError('Extended key version {} does not match the network'.format(key[:4].hex()))
+
+    return key
+
+def _decode_address(address, network):
+    if address is None or isinstance(address, bytes):
+        return _check_size('Address', address, ADDRESS_SIZE)
+
+    import base58
+
+    address = base58.b58decode_check(address)
+
+    if address[:1] != bytes([network.PUBKEY_ADDRESS]):
+        raise ValueError('Address version {} does not match the network'.format(address[:1].hex()))
+
+    return _check_size('Address', address[1:], ADDRESS_SIZE)
+
 class BitcoinAccount(Account):
+    ACCOUNT_TYPE = 'bitcoin'
+
+    __slots__ = ('_wallet',)
+
     def __init__(self,
                  pub_key=None,
                  priv_key=None,
                  address=None,
                  network=None,
+                 derivation_path=None,
                  ):
         if network not in (BitcoinTestNet, BitcoinMainNet):
             raise ValueError('A valid network must be provided')
 
-        super().__init__(pub_key=pub_key,
-                         priv_key=priv_key,
-                         address=address,
+        # Extended keys are stored as their 78 byte BIP32 serialization and
+        # the address as the 20 byte hash160 of the public key
+        super().__init__(pub_key=_decode_extended_key(pub_key, network.EXT_PUBLIC_KEY),
+                         priv_key=_decode_extended_key(priv_key, network.EXT_SECRET_KEY),
+                         address=_decode_address(address, network),
                          network=network,
+                         derivation_path=derivation_path,
                          )
+        self._wallet = None
 
     @classmethod
-    def generate(cls, extra_entropy=None, testnet=False):
+    def generate(cls, extra_entropy=None, testnet=False, drbg=None):
+        from bitmerchant.wallet import Wallet
+
         network = BitcoinMainNet if not testnet else BitcoinTestNet
-        wallet = Wallet.new_random_wallet(extra_entropy, network=network)
-        child_account = wallet.get_child(0, is_prime=True)
 
-        return cls(pub_key=child_account.serialize_b58(private=False),
-                   priv_key=child_account.serialize_b58(private=True),
+        if drbg is None:
+            wallet = Wallet.new_random_wallet(extra_entropy, network=network)
+        else:
+            # Same 512 bit seed as new_random_wallet, read from the DRBG
+            seed = drbg.read(64)
+            if extra_entropy:
+                seed += str(extra_entropy).encode('utf-8')
+
+            wallet = Wallet.from_master_secret(seed, network=network)
+        # get_child is memoized in a process wide cache of 1024 wallets,
+        # which would only ever hold on to these throwaway random ones
+        child_account = Wallet.get_child.__wrapped__(wallet, 0, is_prime=True)
+
+        # Only the serialized keys are kept, holding on to the wallet would
+        # cost a few kilobytes per account
+        return cls(pub_key=unhexlify(child_account.serialize(private=False)),
+                   priv_key=unhexlify(child_account.serialize(private=True)),
                    network=network,
+                   derivation_path="m/0'",
                    )
 
-    def pub_key(self):
+    @property
+    def wallet(self):
+        # Deserializing an extended key decompresses (and for private keys
+        # recomputes) the public point, so only do it once per account
+        if self._wallet is None:
+            from bitmerchant.wallet import Wallet
+
+            self._wallet = Wallet.deserialize(self._priv_key or self._pub_key, network=self._network)
+
+        return self._wallet
+
+    @property
+    def network_name(self):
+        return TESTNET if self._network == BitcoinTestNet else MAINNET
+
+    def _pub_key_bytes(self):
         if not self._pub_key:
-            wallet = Wallet.deserialize(self._priv_key, network=self._network)
-            self._pub_key = wallet.serialize_b58(private=False)
+            pub_key = get_ec_backend().public_key(int.from_bytes(self._priv_key[46:], 'big'))
+
+            # Same depth, fingerprint, child number and chain code as the
+            # private key, followed by the compressed point
+            self._pub_key = (self._network.EXT_PUBLIC_KEY.to_bytes(4, 'big') +
+                             self._priv_key[4:45] +
+                             _compress(pub_key))
 
         return self._pub_key
 
+    def pub_key(self):
+        import base58
+
+        return base58.b58encode_check(self._pub_key_bytes()).decode('ascii')
+
     def priv_key(self):
+        import base58
+
         if not self.has_private_keys:
             raise ValueError('This Account object does not contain private keys')
 
-        return Wallet.deserialize(self._priv_key, network=self._network).export_to_wif()
-
-    def address(self):
+        # WIF of the secret, flagged as belonging to a compressed public key
+        return base58.b58encode_check(bytes([self._network.SECRET_KEY]) + self._priv_key[46:] + b'\x01').decode('ascii')
+
+    def derive_range(self, start, count):
+        from bitmerchant.wallet.utils import hash160
+
+        if start < 0 or count < 0 or start + count > HARDENED_BOUNDARY:
+            raise ValueError('Only non-hardened children between 0 and {} can be derived'.format(HARDENED_BOUNDARY - 1))
+
+        # Everything that depends only on the parent is computed once up front
+        # instead of once per child as repeated Wallet.get_child calls would
+        wallet = self.wallet
+        chain_code = unhexlify(wallet.chain_code)
+        parent_key = unhexlify(wallet.get_public_key_hex())
+        point = wallet.public_key.to_point()
+        parent_point = (point.x(), point.y())
+        parent_secret = int(wallet.private_key.get_key(), 16) if self.has_private_keys else None
+
+        header = bytes([wallet.depth + 1]) + hash160(parent_key)[:4]
+        pub_version = self._network.EXT_PUBLIC_KEY.to_bytes(4, 'big')
+        priv_version = self._network.EXT_SECRET_KEY.to_bytes(4, 'big')
+        backend = get_ec_backend()
+
+        for index in range(start, start + count):
+            child_number = index.to_bytes(4, 'big')
+            I = hmac.new(chain_code, parent_key + child_number, sha512).digest()
+            I_L, child_chain_code = int.from_bytes(I[:32], 'big'), I[32:]
+
+            if I_L >= SECP256k1.order:
+                # BIP32 says to skip the (astronomically unlikely) invalid index
+                continue
+
+            if parent_secret is not None:
+                child_secret = (I_L + parent_secret) % SECP256k1.order
+                child_key = _compress(backend.public_key(child_secret))
+            else:
+                child_key = _compress(get_table().multiply(I_L, offset=parent_point))
+            body = header + child_number + child_chain_code
+
+            priv_key = None
+            if parent_secret is not None:
+                priv_key = priv_version + body + b'\x00' + child_secret.to_bytes(32, 'big')
+
+            yield self.__class__(pub_key=pub_version + body + child_key,
+                                 priv_key=priv_key,
+                                 address=hash160(child_key),
+                                 network=self._network,
+                                 derivation_path='{}/{}'.format(self.derivation_path, index) if self.derivation_path else None,
+                                 )
+
+    def _address_bytes(self):
         if not self._address:
-            wallet = Wallet.deserialize(self._priv_key or self._pub_key, network=self._network)
-            self._address = wallet.to_address()
+            from bitmerchant.wallet.utils import hash160
+
+            self._address = hash160(self._pub_key_bytes()[45:])
 
         return self._address
 
+    def address(self):
+        import base58
+
+        return base58.b58encode_check(bytes([self._network.PUBKEY_ADDRESS]) + self._address_bytes()).decode('ascii')
+
+def _generate_serialized(args):
+    account_cls, kwargs = args
+    return account_cls.generate(**kwargs).serialize()
+
+def generate_many(account_cls,
+                  n,
+                  workers=None,
+                  chunksize=None,
+                  executor=None,
+                  extra_entropy=None,
+                  drbg=None,
+                  **kwargs):
+    from papyrus.entropy import HmacDRBG
+    from papyrus.parallel import map_chunked
+
+    if n < 0:
+        raise ValueError('The number of accounts must not be negative')
+
+    # Every account of the batch is drawn from a single DRBG, with
+    # extra_entropy mixed in once when it is seeded rather than into every
+    # key. Each chunk sent to a worker unpickles its own freshly seeded copy.
+    if drbg is None:
+        drbg = HmacDRBG(personalization=extra_entropy)
+    elif extra_entropy is not None:
+        raise ValueError('extra_entropy must be given to the DRBG when it is created')
+    kwargs['drbg'] = drbg
+
+    return map_chunked(_generate_serialized,
+                       itertools.repeat((account_cls, kwargs), n),
+                       workers=workers,
+                       chunksize=chunksize,
+                       executor=executor)
+
+def key_stream(start=None,
+               batch_size=KEY_STREAM_BATCH_SIZE,
+               ):
+    # Yields (secret exponent, 64 byte public key) pairs for consecutive
+    # secrets, adding G to step from one public point to the next instead of
+    # doing a full scalar multiplication per key. Consecutive keys are
+    # trivially related so only use this where a single key is kept, such as
+    # vanity searches.
+    order = SECP256k1.order
+
+    while True:
+        if start is None:
+            secret = randrange(order)
+        else:
+            secret, start = start, None
+
+            if not 0 < secret < order:
+                raise ValueError('The starting secret must be between 1 and the curve order')
+
+        point = get_table().multiply(secret)
+        jacobian = (int.from_bytes(point[:32], 'big'), int.from_bytes(point[32:], 'big'), 1)
+
+        while secret < order:
+            count = min(batch_size, order - secret)
+
+            points = [jacobian]
+            for _ in range(count):
+                jacobian = add_affine(*jacobian, GX, GY)
+
+                if jacobian is None:
+                    break
+                points.append(jacobian)
+
+            for x, y in to_affine(points[:count]):
+                yield secret, x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+                secret += 1
+
+            if jacobian is None:
+                # Ran into +/-G, start over from a fresh random secret
+                break
+
 if __name__ == '__main__':
     bitcoin = BitcoinAccount.generate()
     print(bitcoin)
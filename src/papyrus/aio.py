@@ -0,0 +1,122 @@
+import os
+import asyncio
+import weakref
+import functools
+import threading
+
+from bitmerchant.network import BitcoinMainNet
+
+from papyrus.encryption import DEFAULT_KDF, KeyEncryptor
+
+# Jobs a pool accepts per worker before callers have to wait for a slot.
+# A couple per worker keeps every process busy without letting a burst of
+# requests queue up work (and memory) the pool cannot get through.
+PENDING_PER_WORKER = 2
+
+class AsyncPool(object):
+    # A process pool shared by coroutines. At most max_pending jobs are
+    # submitted at once, later callers wait (without blocking the event loop)
+    # until a slot frees up, which pushes back on whoever is producing the
+    # requests instead of queueing them without bound.
+    def __init__(self, workers=None, max_pending=None, executor=None):
+        self.workers = workers or os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = self.workers * PENDING_PER_WORKER
+        elif max_pending < 1:
+            raise ValueError('max_pending must be a positive integer')
+
+        self.max_pending = max_pending
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._lock = threading.Lock()
+        # asyncio primitives belong to a single event loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    @property
+    def executor(self):
+        # Worker processes are only started by the first job
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+            return self._executor
+
+    def _semaphore(self, loop):
+        semaphore = self._semaphores.get(loop)
+
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+
+        return semaphore
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None and self._owns_executor:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+# Created on first use, shared by every coroutine that is not given a pool
+_pool = None
+
+def get_pool():
+    global _pool
+
+    if _pool is None:
+        _pool = AsyncPool()
+
+    return _pool
+
+def _generate(account_cls, kwargs):
+    account = account_cls.generate(**kwargs)
+    # Compute the public key in the worker rather than on the event loop
+    account._pub_key_bytes()
+    return account
+
+def _encrypt(data, passphrase, kdf, cost):
+    return KeyEncryptor(passphrase, kdf=kdf, cost=cost).encrypt(data)
+
+def _derive(extended_key, path, network):
+    from papyrus.derivation import derive
+
+    account = derive(extended_key, path, network=network)
+    # The wallet is only a cache and would make the result ~50 times larger
+    # to send back
+    account._wallet = None
+    return account
+
+async def agenerate(account_cls, pool=None, **kwargs):
+    # account_cls.generate(**kwargs) in a worker process
+    return await (pool or get_pool()).run(_generate, account_cls, kwargs)
+
+async def aencrypt(data, passphrase=None, encryptor=None, kdf=DEFAULT_KDF, cost=None, pool=None):
+    # Encrypts data (e.g. account.priv_key()) like Account.encrypted_priv_key.
+    # Deriving the key from a passphrase is what takes the time so it is done
+    # in a worker process. A KeyEncryptor has already paid for the
+    # derivation and encrypts in microseconds, on the event loop.
+    if encryptor is not None:
+        return encryptor.encrypt(data)
+
+    if passphrase is None:
+        raise ValueError('A passphrase or encryptor must be provided')
+
+    return await (pool or get_pool()).run(_encrypt, data, passphrase, kdf, cost)
+
+async def aderive(extended_key, path, network=BitcoinMainNet, pool=None):
+    # papyrus.derivation.derive in a worker process. Every worker keeps its
+    # own derivation cache.
+    return await (pool or get_pool()).run(_derive, extended_key, path, network)
@@ -0,0 +1,98 @@
+CHARSET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+
+# Checksum constants of BIP173 bech32 (segwit version 0) and BIP350 bech32m
+# (versions 1 to 16)
+BECH32 = 1
+BECH32M = 0x2bc830a3
+
+GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+
+def _polymod(values):
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            chk ^= GENERATOR[i] if (top >> i) & 1 else 0
+
+    return chk
+
+def _expand_hrp(hrp):
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+def _checksum(hrp, data, const):
+    polymod = _polymod(_expand_hrp(hrp) + data + [0] * 6) ^ const
+    return [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+
+def _convert_bits(data, from_bits, to_bits, pad):
+    acc = 0
+    bits = 0
+    result = []
+    max_value = (1 << to_bits) - 1
+
+    for value in data:
+        if value >> from_bits:
+            return None
+
+        acc = (acc << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((acc >> bits) & max_value)
+
+    if pad:
+        if bits:
+            result.append((acc << (to_bits - bits)) & max_value)
+    elif bits >= from_bits or ((acc << (to_bits - bits)) & max_value):
+        return None
+
+    return result
+
+def encode(hrp, version, program):
+    # Segwit address of a witness version and program, e.g. the hash160 of a
+    # compressed public key for version 0
+    if not 0 <= version <= 16:
+        raise ValueError('Invalid witness version {}'.format(version))
+
+    if not 2 <= len(program) <= 40 or (version == 0 and len(program) not in (20, 32)):
+        raise ValueError('Invalid witness program length {}'.format(len(program)))
+
+    data = [version] + _convert_bits(program, 8, 5, True)
+    data += _checksum(hrp, data, BECH32 if version == 0 else BECH32M)
+
+    return hrp + '1' + ''.join(CHARSET[value] for value in data)
+
+def decode(hrp, address):
+    # Returns the witness version and program of a segwit address, raising
+    # ValueError if it is invalid or for another network
+    if any(ord(c) < 33 or ord(c) > 126 for c in address) or (address.lower() != address and address.upper() != address):
+        raise ValueError('Invalid characters in {}'.format(address))
+
+    address = address.lower()
+    separator = address.rfind('1')
+
+    if separator < 1 or separator + 7 > len(address) or len(address) > 90:
+        raise ValueError('Invalid segwit address {}'.format(address))
+
+    if address[:separator] != hrp:
+        raise ValueError('{} is not a {} address'.format(address, hrp))
+
+    if any(c not in CHARSET for c in address[separator + 1:]):
+        raise ValueError('Invalid characters in {}'.format(address))
+
+    data = [CHARSET.find(c) for c in address[separator + 1:]]
+    const = _polymod(_expand_hrp(hrp) + data)
+
+    if const not in (BECH32, BECH32M) or not data[0] <= 16:
+        raise ValueError('Invalid segwit address {}'.format(address))
+
+    version = data[0]
+    program = _convert_bits(data[1:-6], 5, 8, False)
+
+    if (program is None or
+            (const == BECH32) != (version == 0) or
+            not 2 <= len(program) <= 40 or
+            (version == 0 and len(program) not in (20, 32))):
+        raise ValueError('Invalid segwit address {}'.format(address))
+
+    return version, bytes(program)
@@ -0,0 +1,260 @@
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+
+from ecdsa import SECP256k1
+from ecdsa.ellipticcurve import Point
+from ecdsa.numbertheory import inverse_mod
+
+from papyrus.exceptions import PapyrusException
+
+P = SECP256k1.curve.p()
+ORDER = SECP256k1.order
+GX = SECP256k1.generator.x()
+GY = SECP256k1.generator.y()
+
+# Fixed-base multiplication of G. Secrets are split into 8 bit windows and
+# the table holds d * 256**j * G for every window j and digit d, so a
+# multiplication is one mixed addition per non zero window (32 at most) and
+# a single inversion. The table is 32 * 255 affine points, about 510KB.
+WINDOW_BITS = 8
+WINDOWS = 256 // WINDOW_BITS
+DIGITS = (1 << WINDOW_BITS) - 1
+POINT_SIZE = 64
+TABLE_SIZE = WINDOWS * DIGITS * POINT_SIZE
+
+MAGIC = b'PAPYECG\x00'
+FORMAT_VERSION = 1
+
+# Magic, format version, window bits and the SHA-256 of the points, which
+# are checked when a cached table is loaded since a corrupt table would
+# silently produce wrong keys
+HEADER = struct.Struct('<8sBB6x32s')
+
+# Names a file to cache the table in. The file is memory mapped so every
+# process shares it instead of building its own copy.
+TABLE_CACHE_VARIABLE = 'PAPYRUS_EC_TABLE'
+
+try:
+    # Modular inverses through pow are only supported from Python 3.8, and
+    # are several times faster than ecdsa's inverse_mod
+    pow(2, -1, P)
+
+    def inverse(x):
+        return pow(x, -1, P)
+except ValueError:
+    def inverse(x):
+        return inverse_mod(x, P)
+
+def add_affine(X1, Y1, Z1, x2, y2):
+    # Mixed Jacobian/affine addition (a = 0 on secp256k1)
+    Z1Z1 = Z1 * Z1 % P
+    H = (x2 * Z1Z1 - X1) % P
+    r = (y2 * Z1 * Z1Z1 - Y1) % P
+
+    if H == 0:
+        # The points are equal or opposite, which the formula does not handle
+        return None
+
+    HH = H * H % P
+    HHH = H * HH % P
+    V = X1 * HH % P
+
+    X3 = (r * r - HHH - 2 * V) % P
+    Y3 = (r * (V - X3) - Y1 * HHH) % P
+    Z3 = Z1 * H % P
+
+    return X3, Y3, Z3
+
+def double(X1, Y1, Z1):
+    # Jacobian doubling (a = 0 on secp256k1)
+    A = X1 * X1 % P
+    B = Y1 * Y1 % P
+    C = B * B % P
+    D = 2 * ((X1 + B) * (X1 + B) - A - C) % P
+    E = 3 * A % P
+
+    X3 = (E * E - 2 * D) % P
+    Y3 = (E * (D - X3) - 8 * C) % P
+    Z3 = 2 * Y1 * Z1 % P
+
+    return X3, Y3, Z3
+
+def to_affine(points):
+    # Montgomery's trick: invert every Z with a single modular inversion
+    prefixes = []
+    acc = 1
+    for _, _, Z in points:
+        prefixes.append(acc)
+        acc = acc * Z % P
+
+    inv = inverse(acc)
+
+    affine = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        z_inv = inv * prefixes[i] % P
+        inv = inv * Z % P
+
+        z_inv2 = z_inv * z_inv % P
+        affine[i] = (X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+
+    return affine
+
+def _to_bytes(x, y):
+    return x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+
+class FixedBaseTable(object):
+    def __init__(self, points):
+        # points is any buffer of TABLE_SIZE bytes, e.g. a memory map
+        self._points = points
+
+    @classmethod
+    def build(cls):
+        points = bytearray()
+        x, y = GX, GY
+
+        for _ in range(WINDOWS):
+            # 1 to 256 times the window's base, the last one being the base
+            # of the next window
+            multiples = [(x, y, 1), double(x, y, 1)]
+            for _ in range(DIGITS - 1):
+                multiples.append(add_affine(*multiples[-1], x, y))
+
+            affine = to_affine(multiples)
+            for point in affine[:DIGITS]:
+                points += _to_bytes(*point)
+
+            x, y = affine[DIGITS]
+
+        return cls(bytes(points))
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            header = f.read(HEADER.size)
+
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise PapyrusException('{} is not an EC table'.format(filename))
+
+            _, version, window_bits, digest = HEADER.unpack(header)
+
+            if version != FORMAT_VERSION or window_bits != WINDOW_BITS:
+                raise PapyrusException('Unsupported EC table in {}'.format(filename))
+
+            if os.fstat(f.fileno()).st_size != HEADER.size + TABLE_SIZE:
+                raise PapyrusException('{} is truncated'.format(filename))
+
+            points = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))[HEADER.size:]
+
+        if hashlib.sha256(points).digest() != digest:
+            raise PapyrusException('{} is corrupt'.format(filename))
+
+        return cls(points)
+
+    def save(self, filename):
+        # Written to a unique temporary file and renamed over filename, so
+        # processes building the table at the same time never see (or
+        # interleave) a partial file
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                                             prefix=os.path.basename(filename) + '.')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, WINDOW_BITS, hashlib.sha256(self._points).digest()))
+                f.write(self._points)
+
+            os.replace(temp_filename, filename)
+        except BaseException:
+            os.unlink(temp_filename)
+            raise
+
+    def _jacobian(self, secret, offset=None):
+        # secret * G (plus offset) in Jacobian coordinates, or None when an
+        # addition hits equal or opposite points
+        if not 0 < secret < ORDER:
+            raise ValueError('The secret must be between 1 and the curve order')
+
+        points = self._points
+        acc = None if offset is None else (offset[0], offset[1], 1)
+
+        for window in range(WINDOWS):
+            digit = (secret >> (window * WINDOW_BITS)) & DIGITS
+
+            if not digit:
+                continue
+
+            start = (window * DIGITS + digit - 1) * POINT_SIZE
+            x = int.from_bytes(points[start:start + 32], 'big')
+            y = int.from_bytes(points[start + 32:start + POINT_SIZE], 'big')
+
+            if acc is None:
+                acc = (x, y, 1)
+            else:
+                acc = add_affine(*acc, x, y)
+
+                if acc is None:
+                    # Only reachable through the offset
+                    return None
+
+        return acc
+
+    def multiply(self, secret, offset=None):
+        # Returns secret * G, plus the affine point offset if given, as the
+        # 64 byte affine x || y
+        acc = self._jacobian(secret, offset)
+
+        if acc is None:
+            return _multiply(secret, offset)
+
+        X, Y, Z = acc
+        z_inv = inverse(Z)
+        z_inv2 = z_inv * z_inv % P
+
+        return _to_bytes(X * z_inv2 % P, Y * z_inv2 * z_inv % P)
+
+    def multiply_many(self, secrets):
+        # multiply for many secrets at once, sharing a single inversion.
+        # Without an offset the partial sums are always smaller multiples of
+        # G than the next window's point, so _jacobian cannot return None.
+        return [_to_bytes(x, y) for x, y in to_affine([self._jacobian(secret) for secret in secrets])]
+
+def _multiply(secret, offset=None):
+    point = SECP256k1.generator * secret
+
+    if offset is not None:
+        point = point + Point(SECP256k1.curve, offset[0], offset[1])
+
+    return _to_bytes(point.x(), point.y())
+
+def load_table(filename):
+    # Memory maps the table cached in filename, building and caching it
+    # first if the file is missing or invalid
+    try:
+        return FixedBaseTable.load(filename)
+    except (OSError, PapyrusException):
+        pass
+
+    table = FixedBaseTable.build()
+
+    try:
+        table.save(filename)
+    except OSError:
+        # Read only location, keep using the table built in memory
+        pass
+
+    return table
+
+# Built (or loaded) on first use in each process
+_table = None
+
+def get_table():
+    global _table
+
+    if _table is None:
+        filename = os.environ.get(TABLE_CACHE_VARIABLE)
+        _table = load_table(filename) if filename else FixedBaseTable.build()
+
+    return _table
@@ -0,0 +1,133 @@
+import threading
+
+from binascii import unhexlify
+from collections import OrderedDict
+
+from bitmerchant.wallet import Wallet
+from bitmerchant.network import BitcoinMainNet
+
+from papyrus.account import BitcoinAccount, HARDENED_BOUNDARY
+
+DEFAULT_CACHE_SIZE = 1024
+
+def parse_path(path):
+    parts = [part for part in path.strip().split('/') if part]
+
+    if parts and parts[0] in ('m', 'M'):
+        parts = parts[1:]
+
+    indexes = []
+    for part in parts:
+        is_prime = part[-1] in "'hHp"
+        number = part[:-1] if is_prime else part
+
+        try:
+            number = int(number)
+        except ValueError:
+            raise ValueError('Invalid derivation path: {}'.format(path))
+
+        if not 0 <= number < HARDENED_BOUNDARY:
+            raise ValueError('Invalid derivation path: {}'.format(path))
+
+        indexes.append((number, is_prime))
+
+    return tuple(indexes)
+
+def _get_child(node, number, is_prime):
+    # Wallet.get_child is memoized in a process wide cache of 1024 wallets.
+    # Skip it so DerivationCache is the only cache and derive_range style
+    # workloads do not thrash it.
+    return Wallet.get_child.__wrapped__(node, number, is_prime=is_prime)
+
+class DerivationCache(object):
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError('maxsize must be a positive integer')
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._nodes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def _get(self, key):
+        with self._lock:
+            node = self._nodes.get(key)
+
+            if node is not None:
+                self._nodes.move_to_end(key)
+
+            return node
+
+    def _put(self, key, node):
+        with self._lock:
+            self._nodes[key] = node
+            self._nodes.move_to_end(key)
+
+            while len(self._nodes) > self.maxsize:
+                self._nodes.popitem(last=False)
+
+    def _node(self, extended_key, indexes, network):
+        # Start from the deepest ancestor (or the node itself) already derived
+        for depth in range(len(indexes), -1, -1):
+            node = self._get((extended_key, network, indexes[:depth]))
+
+            if node is not None:
+                self.hits += 1
+                break
+        else:
+            self.misses += 1
+            depth = 0
+            node = Wallet.deserialize(extended_key, network=network)
+            self._put((extended_key, network, ()), node)
+
+        for i in range(depth, len(indexes)):
+            number, is_prime = indexes[i]
+            node = _get_child(node, number, is_prime)
+            self._put((extended_key, network, indexes[:i + 1]), node)
+
+        return node
+
+    def node(self, extended_key, path, network=BitcoinMainNet):
+        return self._node(extended_key, parse_path(path), network)
+
+    def derive(self, extended_key, path, network=BitcoinMainNet):
+        indexes = parse_path(path)
+
+        if indexes:
+            # Only intermediate nodes are cached. Leaves are rarely requested
+            # twice and would otherwise push the shared branches out.
+            number, is_prime = indexes[-1]
+            child = _get_child(self._node(extended_key, indexes[:-1], network), number, is_prime)
+        else:
+            child = self._node(extended_key, indexes, network)
+
+        if child.private_key:
+            account = BitcoinAccount(priv_key=unhexlify(child.serialize(private=True)),
+                                     network=network,
+                                     derivation_path=path)
+        else:
+            account = BitcoinAccount(pub_key=unhexlify(child.serialize(private=False)),
+                                     network=network,
+                                     derivation_path=path)
+
+        account._wallet = child
+        return account
+
+    def clear(self):
+        with self._lock:
+            self._nodes.clear()
+            self.hits = 0
+            self.misses = 0
+
+default_cache = DerivationCache()
+
+def derive(extended_key, path, network=BitcoinMainNet, cache=None):
+    if cache is None:
+        cache = default_cache
+
+    return cache.derive(extended_key, path, network=network)
@@ -0,0 +1,263 @@
+import os
+import time
+import base64
+
+from collections import namedtuple, OrderedDict
+
+from papyrus.exceptions import PapyrusException
+
+# Encrypted keys produced by papyrus are wrapped in an envelope recording how
+# the encryption key was derived from the passphrase:
+#
+#     $papyrus$2$<kdf>$<name>=<value>,...$<salt>$<fernet token>
+#
+# Anything else is treated as a legacy lockbox blob.
+ENVELOPE_PREFIX = b'$papyrus$'
+ENVELOPE_VERSION = b'2'
+SALT_SIZE = 16
+
+SCRYPT = 'scrypt'
+PBKDF2_SHA256 = 'pbkdf2-sha256'
+KDFS = (SCRYPT, PBKDF2_SHA256)
+DEFAULT_KDF = SCRYPT
+
+# The cost of a KDF is log2 of its work factor: the scrypt N parameter or the
+# number of PBKDF2 iterations. Each step up doubles the time an attacker needs
+# per guessed passphrase, and the time taken to decrypt a key. The defaults
+# take in the order of 50ms on a current desktop CPU, run `papyrus calibrate`
+# to measure them on a given machine.
+DEFAULT_COSTS = {SCRYPT: 14,
+                 PBKDF2_SHA256: 18,
+                 }
+MIN_COST = 10
+# scrypt needs 128 * r * N bytes of memory, 1GB at the maximum cost
+MAX_COSTS = {SCRYPT: 20,
+             PBKDF2_SHA256: 30,
+             }
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# Time a single derivation should take when calibrating
+DEFAULT_TARGET_MS = 100
+
+# Number of derived keys a KeyDecryptor remembers
+DERIVED_KEY_CACHE_SIZE = 16
+
+DecryptResult = namedtuple('DecryptResult', ['priv_key', 'error'])
+
+def kdf_params(kdf=DEFAULT_KDF, cost=None):
+    if kdf not in KDFS:
+        raise PapyrusException('Invalid KDF: {} (expected one of {})'.format(kdf, ', '.join(KDFS)))
+
+    if cost is None:
+        cost = DEFAULT_COSTS[kdf]
+
+    if not MIN_COST <= cost <= MAX_COSTS[kdf]:
+        raise PapyrusException('The {} cost must be between {} and {}'.format(kdf, MIN_COST, MAX_COSTS[kdf]))
+
+    if kdf == SCRYPT:
+        return (('n', 1 << cost), ('r', SCRYPT_R), ('p', SCRYPT_P))
+    else:
+        return (('i', 1 << cost),)
+
+def _format_params(params):
+    return ','.join('{}={}'.format(name, value) for name, value in params).encode('ascii')
+
+def _parse_params(data):
+    return tuple((name, int(value))
+                 for name, value in (param.split('=', 1) for param in data.decode('ascii').split(',')))
+
+def _check_params(kdf, params):
+    # Envelopes are read from files anyone could have crafted. Only accept the
+    # parameters kdf_params can produce so a key cannot make us allocate
+    # gigabytes for scrypt or spin through billions of PBKDF2 iterations.
+    work_factor = dict(params).get('n' if kdf == SCRYPT else 'i', 0)
+
+    if params != kdf_params(kdf, work_factor.bit_length() - 1):
+        raise PapyrusException('Unsupported {} parameters: {}'.format(kdf, _format_params(params).decode('ascii')))
+
+def _derive_key(passphrase, salt, kdf, params):
+    params = dict(params)
+
+    if kdf == SCRYPT:
+        from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+        derivation = Scrypt(salt=salt,
+                            length=32,
+                            n=params['n'],
+                            r=params['r'],
+                            p=params['p'])
+    elif kdf == PBKDF2_SHA256:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+        derivation = PBKDF2HMAC(algorithm=hashes.SHA256(),
+                                length=32,
+                                salt=salt,
+                                iterations=params['i'])
+    else:
+        raise PapyrusException('Unsupported KDF: {}'.format(kdf))
+
+    return base64.urlsafe_b64encode(derivation.derive(passphrase.encode('utf-8')))
+
+def _ensure_bytes(data):
+    return data.encode('utf-8') if isinstance(data, str) else data
+
+class KeyEncryptor(object):
+    # Derives the encryption key from the passphrase once. Every record
+    # encrypted with the same KeyEncryptor shares the salt, while Fernet gives
+    # each record its own random IV.
+    def __init__(self, passphrase, kdf=DEFAULT_KDF, cost=None, salt=None):
+        from cryptography.fernet import Fernet
+
+        self.kdf = kdf
+        self.params = kdf_params(kdf, cost)
+        self.salt = salt or os.urandom(SALT_SIZE)
+
+        self._fernet = Fernet(_derive_key(passphrase, self.salt, kdf, self.params))
+        self._header = b'$'.join([ENVELOPE_PREFIX + ENVELOPE_VERSION,
+                                  kdf.encode('ascii'),
+                                  _format_params(self.params),
+                                  base64.urlsafe_b64encode(self.salt),
+                                  b''])
+
+    def encrypt(self, data):
+        return self._header + self._fernet.encrypt(_ensure_bytes(data))
+
+class KeyDecryptor(object):
+    # Decrypts papyrus envelopes and legacy lockbox blobs with a single
+    # passphrase, remembering the keys derived for recently seen salts so a
+    # batch encrypted by one KeyEncryptor only pays for the derivation once
+    def __init__(self, passphrase):
+        self._passphrase = passphrase
+        self._fernets = OrderedDict()
+
+    def _fernet(self, kdf, params, salt):
+        from cryptography.fernet import Fernet
+
+        key = (kdf, params, salt)
+        fernet = self._fernets.get(key)
+
+        if fernet is None:
+            fernet = Fernet(_derive_key(self._passphrase, salt, kdf, params))
+            self._fernets[key] = fernet
+
+            if len(self._fernets) > DERIVED_KEY_CACHE_SIZE:
+                self._fernets.popitem(last=False)
+        else:
+            self._fernets.move_to_end(key)
+
+        return fernet
+
+    @staticmethod
+    def _parse(data):
+        fields = data[len(ENVELOPE_PREFIX):].split(b'$')
+
+        try:
+            version, kdf, params, salt, token = fields
+            kdf = kdf.decode('ascii')
+            salt = base64.urlsafe_b64decode(salt)
+
+            if version != ENVELOPE_VERSION:
+                raise PapyrusException('Unsupported encrypted key format: version {}'.format(
+                    version.decode('ascii', 'replace')))
+
+            params = _parse_params(params)
+        except ValueError:
+            raise PapyrusException('Malformed encrypted key')
+
+        _check_params(kdf, params)
+        return kdf, params, salt, token
+
+    def decrypt(self, data):
+        from cryptography.fernet import InvalidToken
+
+        data = _ensure_bytes(data).strip()
+
+        if not data.startswith(ENVELOPE_PREFIX):
+            from lockbox import decrypt, LockBoxException
+
+            try:
+                return decrypt(self._passphrase, data)
+            except LockBoxException as e:
+                raise PapyrusException(str(e))
+
+        kdf, params, salt, token = self._parse(data)
+
+        try:
+            fernet = self._fernet(kdf, params, salt)
+        except (KeyError, ValueError):
+            raise PapyrusException('Malformed encrypted key')
+
+        try:
+            return fernet.decrypt(token)
+        except InvalidToken:
+            raise PapyrusException('Invalid passphrase')
+
+def time_derivation(kdf=DEFAULT_KDF, cost=None):
+    params = kdf_params(kdf, cost)
+    salt = os.urandom(SALT_SIZE)
+
+    start = time.perf_counter()
+    _derive_key('papyrus calibration', salt, kdf, params)
+    return time.perf_counter() - start
+
+def calibrate(kdf=DEFAULT_KDF, target_ms=DEFAULT_TARGET_MS):
+    # Every step up in cost doubles the time taken so measure increasing
+    # costs until one exceeds the target. Returns the highest cost within the
+    # target (never less than MIN_COST) and every (cost, seconds) measured.
+    # The first derivation also pays for loading the backend
+    time_derivation(kdf, MIN_COST)
+
+    timings = []
+    for cost in range(MIN_COST, MAX_COSTS[kdf] + 1):
+        seconds = time_derivation(kdf, cost)
+        timings.append((cost, seconds))
+
+        if seconds * 1000 > target_ms:
+            break
+
+    within_target = [cost for cost, seconds in timings if seconds * 1000 <= target_ms]
+    return max(within_target, default=MIN_COST), timings
+
+# Worker processes keep one KeyDecryptor per passphrase so derived keys are
+# reused across the chunks of a batch
+_decryptors = {}
+
+def _decrypt(args):
+    from papyrus.parallel import error_message
+
+    passphrase, encrypted_key = args
+
+    if not encrypted_key:
+        return DecryptResult(priv_key=None, error='No encrypted key found')
+
+    decryptor = _decryptors.get(passphrase)
+    if decryptor is None:
+        _decryptors.clear()
+        decryptor = _decryptors[passphrase] = KeyDecryptor(passphrase)
+
+    try:
+        return DecryptResult(priv_key=decryptor.decrypt(encrypted_key).decode('utf-8'),
+                             error=None)
+    except Exception as e:
+        return DecryptResult(priv_key=None, error=error_message(e))
+
+def decrypt_many(passphrase,
+                 encrypted_keys,
+                 workers=None,
+                 chunksize=None,
+                 executor=None,
+                 ):
+    from papyrus.parallel import map_chunked
+
+    try:
+        return map_chunked(_decrypt,
+                           ((passphrase, encrypted_key) for encrypted_key in encrypted_keys),
+                           workers=workers,
+                           chunksize=chunksize,
+                           executor=executor)
+    finally:
+        # Batches decrypted in this process must not leave the passphrase
+        # behind. Worker processes keep theirs until the executor shuts down.
+        _decryptors.clear()
@@ -0,0 +1,142 @@
+import os
+import hmac
+import weakref
+import threading
+
+from hashlib import sha256
+
+# HMAC_DRBG from NIST SP 800-90A with SHA-256. Seeds are 256 bits of OS
+# entropy plus a 128 bit nonce, the DRBG's full security strength.
+SEED_SIZE = 32
+NONCE_SIZE = 16
+
+# Number of generate requests between reseeds from the OS. SP 800-90A allows
+# up to 2**48, this reseeds far more often since it costs one urandom call.
+RESEED_INTERVAL = 1 << 12
+
+# Bytes produced per generate request, handed out in slices. SP 800-90A
+# allows up to 2**16 bytes per request.
+REQUEST_SIZE = 4096
+
+class HmacDRBG(object):
+    # A single deterministic random bit generator feeding a whole batch of
+    # keys. It is seeded from os.urandom, reseeded from it every
+    # reseed_interval requests and after a fork, and the personalization
+    # (e.g. user supplied extra entropy) is mixed in once when it is seeded.
+    #
+    # Pickled DRBGs (e.g. sent to worker processes) do not carry their state
+    # and are seeded afresh where they are unpickled, so two processes never
+    # produce the same stream. Threads may share a DRBG, every request holds
+    # its lock so no two reads ever return the same bytes.
+    def __init__(self,
+                 personalization=None,
+                 reseed_interval=RESEED_INTERVAL,
+                 entropy=os.urandom,
+                 ):
+        if reseed_interval < 1:
+            raise ValueError('The reseed interval must be a positive integer')
+
+        if personalization is not None and not isinstance(personalization, bytes):
+            # Allow strings and ints, as bitmerchant does for extra entropy
+            personalization = str(personalization).encode('utf-8')
+
+        self.reseed_interval = reseed_interval
+        self._personalization = personalization
+        self._entropy = entropy
+        self._lock = threading.RLock()
+
+        self._key = b'\x00' * 32
+        self._value = b'\x01' * 32
+        self._update(entropy(SEED_SIZE) + entropy(NONCE_SIZE) + (personalization or b''))
+        self._reseed_counter = 1
+
+        self._buffer = b''
+        self._position = 0
+
+        _instances.add(self)
+
+    def __reduce__(self):
+        return (self.__class__, (self._personalization, self.reseed_interval))
+
+    def _hmac(self, key, data):
+        return hmac.new(key, data, sha256).digest()
+
+    def _update(self, provided=b''):
+        self._key = self._hmac(self._key, self._value + b'\x00' + provided)
+        self._value = self._hmac(self._key, self._value)
+
+        if provided:
+            self._key = self._hmac(self._key, self._value + b'\x01' + provided)
+            self._value = self._hmac(self._key, self._value)
+
+    def reseed(self, additional=b''):
+        with self._lock:
+            self._update(self._entropy(SEED_SIZE) + additional)
+            self._reseed_counter = 1
+
+            # Output generated before the reseed is dropped
+            self._buffer = b''
+            self._position = 0
+
+    def generate(self, size):
+        # One SP 800-90A generate request, without additional input
+        if size > 1 << 16:
+            raise ValueError('At most 65536 bytes can be generated per request')
+
+        with self._lock:
+            if self._reseed_counter > self.reseed_interval:
+                self.reseed()
+
+            output = []
+            value = self._value
+            for _ in range(-(-size // 32)):
+                value = self._hmac(self._key, value)
+                output.append(value)
+            self._value = value
+
+            self._update()
+            self._reseed_counter += 1
+
+        return b''.join(output)[:size]
+
+    def read(self, size):
+        # size random bytes, served from REQUEST_SIZE byte requests so small
+        # reads cost a fraction of a request each
+        chunks = []
+
+        with self._lock:
+            while size:
+                if self._position == len(self._buffer):
+                    self._buffer = self.generate(REQUEST_SIZE)
+                    self._position = 0
+
+                chunk = self._buffer[self._position:self._position + size]
+                self._position += len(chunk)
+                size -= len(chunk)
+                chunks.append(chunk)
+
+        return b''.join(chunks)
+
+    def randrange(self, order):
+        # A uniformly random integer between 1 and order - 1, by rejection
+        size = (order.bit_length() + 7) // 8
+        mask = (1 << order.bit_length()) - 1
+
+        while True:
+            value = int.from_bytes(self.read(size), 'big') & mask
+
+            if 0 < value < order:
+                return value
+
+# Every live DRBG, reseeded in the child after a fork so parent and child do
+# not share a stream
+_instances = weakref.WeakSet()
+
+def _reseed_after_fork():
+    for drbg in list(_instances):
+        # Another thread of the parent may have held the lock when it forked
+        drbg._lock = threading.RLock()
+        drbg.reseed()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
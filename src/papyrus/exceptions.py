@@ -0,0 +1,2 @@
+class PapyrusException(Exception):
+    pass
@@ -0,0 +1,116 @@
+import csv
+import json
+import itertools
+
+from papyrus.exceptions import PapyrusException
+
+TEXT = 'text'
+JSONL = 'jsonl'
+CSV = 'csv'
+
+FIELDS = ('type',
+          'network',
+          'address',
+          'encrypted_key',
+          'derivation_path',
+          )
+
+class RecordWriter(object):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, record, encrypted_key):
+        raise NotImplementedError('This function must be overridden by subclasses')
+
+    def flush(self):
+        self._stream.flush()
+
+    @staticmethod
+    def to_dict(record, encrypted_key):
+        if isinstance(encrypted_key, bytes):
+            encrypted_key = encrypted_key.decode('utf-8')
+
+        return {'type': record.account_type,
+                'network': record.network,
+                'address': record.address,
+                'encrypted_key': encrypted_key,
+                'derivation_path': record.derivation_path,
+                }
+
+class TextWriter(RecordWriter):
+    def write(self, record, encrypted_key):
+        row = self.to_dict(record, encrypted_key)
+
+        if row['encrypted_key'] is None:
+            self._stream.write('{}\n'.format(row['address']))
+        else:
+            self._stream.write('{}\t{}\n'.format(row['address'], row['encrypted_key']))
+
+class JSONLWriter(RecordWriter):
+    def write(self, record, encrypted_key):
+        row = self.to_dict(record, encrypted_key)
+        self._stream.write(json.dumps(row, separators=(',', ':')))
+        self._stream.write('\n')
+
+class CSVWriter(RecordWriter):
+    def __init__(self, stream):
+        super().__init__(stream)
+
+        self._writer = csv.DictWriter(stream, fieldnames=FIELDS, lineterminator='\n')
+        self._writer.writeheader()
+
+    def write(self, record, encrypted_key):
+        self._writer.writerow(self.to_dict(record, encrypted_key))
+
+WRITERS = {TEXT: TextWriter,
+           JSONL: JSONLWriter,
+           CSV: CSVWriter,
+           }
+
+def read_encrypted_keys(stream):
+    # Accepts the jsonl, csv and text output of generate-batch as well as
+    # files holding one bare encrypted key per line. Yields (line number,
+    # address, encrypted key); either may be None when the line does not
+    # provide it.
+    stream = iter(stream)
+    first_line = next(stream, '')
+
+    if first_line.strip() == ','.join(FIELDS):
+        yield from _read_csv(stream)
+    else:
+        yield from _read_lines(itertools.chain([first_line], stream))
+
+def _read_csv(stream):
+    # The header has already been read, so rows start on line 2
+    reader = csv.DictReader(stream, fieldnames=FIELDS)
+
+    for row in reader:
+        yield reader.line_num + 1, row['address'] or None, row['encrypted_key'] or None
+
+def _read_lines(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        if line.startswith('{'):
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None, None
+            else:
+                yield line_number, row.get('address'), row.get('encrypted_key')
+        elif '\t' in line:
+            address, encrypted_key = line.split('\t', 1)
+            yield line_number, address, encrypted_key
+        else:
+            yield line_number, None, line
+
+def get_writer(output_format, stream):
+    try:
+        writer_cls = WRITERS[output_format]
+    except KeyError:
+        raise PapyrusException('Invalid output format: {}'.format(output_format))
+
+    return writer_cls(stream)
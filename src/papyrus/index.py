@@ -0,0 +1,264 @@
+import os
+import mmap
+import heapq
+import struct
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, concurrent merges are not serialized
+    fcntl = None
+
+from binascii import unhexlify
+
+from papyrus.exceptions import PapyrusException
+
+MAGIC = b'PAPYIDX\x00'
+FORMAT_VERSION = 1
+
+# Magic, format version and number of records, followed by the records
+HEADER = struct.Struct('<8sB7xQ')
+
+# Records are the 20 bytes an address encodes: the last 20 bytes of the
+# keccak hash of an ethereum public key or the hash160 of a bitcoin one
+RECORD_SIZE = 20
+
+# Existing records are copied to a merged index in slices of at most this
+# many bytes
+COPY_SIZE = 1 << 24
+
+# Addresses an AddressCollector holds in memory (5MB, about 50MB once
+# sorted) before spilling them to a temporary file, and bytes read from each
+# spilled run at a time when they are merged
+RUN_SIZE = 1 << 18
+RUN_READ_SIZE = RECORD_SIZE * 512
+
+def address_bytes(address):
+    # Raw bytes of an ethereum (0x prefixed hex) or bitcoin (base58) address.
+    # Bitcoin networks share records, the version byte is dropped.
+    if isinstance(address, str):
+        if address.startswith('0x'):
+            address = unhexlify(address[2:])
+        else:
+            import base58
+
+            address = base58.b58decode_check(address)[1:]
+
+    if len(address) != RECORD_SIZE:
+        raise ValueError('Address must be {} bytes, not {}'.format(RECORD_SIZE, len(address)))
+
+    return bytes(address)
+
+class AddressIndex(object):
+    # Sorted fixed width address records searched in place through a read
+    # only memory map, so opening an index costs the same for any size and
+    # only the pages a lookup touches are read from disk
+    def __init__(self, filename):
+        self.filename = filename
+        self._mmap = None
+
+        with open(filename, 'rb') as f:
+            header = f.read(HEADER.size)
+
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise PapyrusException('{} is not an address index'.format(filename))
+
+            _, version, count = HEADER.unpack(header)
+
+            if version != FORMAT_VERSION:
+                raise PapyrusException('Unsupported address index version {}'.format(version))
+
+            if os.fstat(f.fileno()).st_size != HEADER.size + count * RECORD_SIZE:
+                raise PapyrusException('{} is truncated'.format(filename))
+
+            self._count = count
+            if count:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, address):
+        key = address_bytes(address)
+        position = self._bisect(key)
+
+        return position < self._count and self._record(position) == key
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._record(position)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _record(self, position):
+        offset = HEADER.size + position * RECORD_SIZE
+        return self._mmap[offset:offset + RECORD_SIZE]
+
+    def _bisect(self, key, low=0):
+        # Position of the first record not less than key
+        high = self._count
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self._record(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def _copy(self, f, start, end):
+        if start >= end:
+            return
+
+        with memoryview(self._mmap) as view:
+            for offset in range(HEADER.size + start * RECORD_SIZE,
+                                HEADER.size + end * RECORD_SIZE,
+                                COPY_SIZE):
+                f.write(view[offset:min(offset + COPY_SIZE, HEADER.size + end * RECORD_SIZE)])
+
+@contextlib.contextmanager
+def _locked(filename):
+    # Exclusive lock on a file next to the index, held from reading the index
+    # until the merged one replaces it so concurrent merges never drop each
+    # other's records. The index itself cannot carry the lock since it is
+    # replaced.
+    if fcntl is None:
+        yield
+        return
+
+    with open(filename + '.lock', 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def merge_index(filename, addresses):
+    # Adds addresses to the index at filename, creating it if needed, and
+    # returns how many were new
+    return _merge(filename, sorted(set(address_bytes(address) for address in addresses)))
+
+def _merge(filename, new):
+    # new yields sorted, unique records. Runs of existing records between the
+    # new ones are copied in bulk so merging a batch costs a sequential copy
+    # of the index plus a binary search per new address.
+    with _locked(filename):
+        existing = AddressIndex(filename) if os.path.exists(filename) else None
+        count = len(existing) if existing is not None else 0
+        added = 0
+
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                                             prefix=os.path.basename(filename) + '.')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+
+                position = 0
+                for key in new:
+                    if existing is not None:
+                        next_position = existing._bisect(key, low=position)
+                        existing._copy(f, position, next_position)
+                        position = next_position
+
+                        if position < count and existing._record(position) == key:
+                            continue
+
+                    f.write(key)
+                    added += 1
+
+                if existing is not None:
+                    existing._copy(f, position, count)
+
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, count + added))
+
+            os.replace(temp_filename, filename)
+        except BaseException:
+            os.unlink(temp_filename)
+            raise
+        finally:
+            if existing is not None:
+                existing.close()
+
+    return added
+
+def _read_run(f, start, end):
+    # Records of a run spilled to f between offsets start and end, read a
+    # few kilobytes at a time however many runs are merged together
+    for offset in range(start, end, RUN_READ_SIZE):
+        data = os.pread(f.fileno(), min(RUN_READ_SIZE, end - offset), offset)
+
+        for position in range(0, len(data), RECORD_SIZE):
+            yield data[position:position + RECORD_SIZE]
+
+class AddressCollector(object):
+    # Gathers any number of addresses for merge_into in bounded memory: up to
+    # run_size records are packed in a bytearray, then sorted and appended as
+    # a run to a temporary file, and the sorted runs are merged back while
+    # the index is written
+    def __init__(self, run_size=RUN_SIZE):
+        self.run_size = run_size
+        self._buffer = bytearray()
+        self._file = None
+        self._runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, address):
+        self._buffer += address_bytes(address)
+
+        if len(self._buffer) >= self.run_size * RECORD_SIZE:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile()
+
+            start = self._file.seek(0, os.SEEK_END)
+            self._file.write(b''.join(self._sorted_buffer()))
+            self._file.flush()
+            self._runs.append((start, self._file.tell()))
+            self._buffer = bytearray()
+
+    def _sorted_buffer(self):
+        # Duplicates are dropped by sorted_records
+        return sorted(bytes(self._buffer[offset:offset + RECORD_SIZE])
+                      for offset in range(0, len(self._buffer), RECORD_SIZE))
+
+    def sorted_records(self):
+        # Every collected record once, in order
+        previous = None
+        runs = [_read_run(self._file, start, end) for start, end in self._runs]
+
+        for record in heapq.merge(self._sorted_buffer(), *runs):
+            if record != previous:
+                yield record
+                previous = record
+
+    def merge_into(self, filename):
+        # merge_index for the collected addresses
+        return _merge(filename, self.sorted_records())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        self._runs = []
+        self._buffer = bytearray()
@@ -0,0 +1,171 @@
+import sha3
+import itertools
+
+from collections import namedtuple
+
+from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
+from bitmerchant.wallet.utils import hash160
+
+from papyrus import bech32
+from papyrus.account import (ETHEREUM_PUB_KEY_SIZE,
+                             KEY_STREAM_BATCH_SIZE,
+                             MAINNET,
+                             SECRET_SIZE,
+                             TESTNET,
+                             EthereumAccount,
+                             _check_size,
+                             _compress,
+                             _ethereum_bytes,
+                             get_ec_backend,
+                             )
+from papyrus.curve import get_table
+
+# Human readable part of native segwit addresses
+SEGWIT_HRP = {MAINNET: 'bc',
+              TESTNET: 'tb',
+              }
+
+MultiChainRecord = namedtuple('MultiChainRecord', ['network',
+                                                   'pub_key',
+                                                   'priv_key',
+                                                   'wif',
+                                                   'ethereum',
+                                                   'p2pkh',
+                                                   'p2sh_p2wpkh',
+                                                   'p2wpkh',
+                                                   ])
+
+class MultiChainAccount(object):
+    # A single secp256k1 key seen from ethereum and bitcoin. The public point
+    # is computed once and every address is derived from it: ethereum hashes
+    # the uncompressed point, bitcoin the compressed one. Bitcoin keys are
+    # plain secrets here rather than BIP32 wallets, use BitcoinAccount for
+    # those.
+    __slots__ = ('_pub_key', '_priv_key', '_network', '_hash160')
+
+    def __init__(self,
+                 pub_key=None,
+                 priv_key=None,
+                 network=BitcoinMainNet,
+                 ):
+        if not pub_key and not priv_key:
+            raise ValueError('A private or public key must be provided')
+
+        if network not in (BitcoinTestNet, BitcoinMainNet):
+            raise ValueError('A valid network must be provided')
+
+        # Keys are the 32 byte secret and 64 byte x || y public point, as
+        # stored by EthereumAccount
+        self._pub_key = _check_size('Public key', _ethereum_bytes(pub_key), ETHEREUM_PUB_KEY_SIZE)
+        self._priv_key = _check_size('Private key', _ethereum_bytes(priv_key), SECRET_SIZE)
+        self._network = network
+        self._hash160 = None
+
+    @classmethod
+    def generate(cls, testnet=False, drbg=None):
+        secret, pub_key = get_ec_backend().generate(drbg)
+
+        return cls(pub_key=pub_key,
+                   priv_key=secret.to_bytes(SECRET_SIZE, 'big'),
+                   network=BitcoinMainNet if not testnet else BitcoinTestNet,
+                   )
+
+    @classmethod
+    def from_secrets(cls, secrets, testnet=False, batch_size=KEY_STREAM_BATCH_SIZE):
+        # Yields an account for each secret (an integer or 32 bytes). Public
+        # points are computed batch_size at a time so converting them to
+        # affine coordinates costs a single inversion per batch.
+        network = BitcoinMainNet if not testnet else BitcoinTestNet
+        table = get_table()
+        secrets = iter(secrets)
+
+        while True:
+            batch = [secret if isinstance(secret, int) else int.from_bytes(_ethereum_bytes(secret), 'big')
+                     for secret in itertools.islice(secrets, batch_size)]
+            if not batch:
+                break
+
+            for secret, pub_key in zip(batch, table.multiply_many(batch)):
+                yield cls(pub_key=pub_key,
+                          priv_key=secret.to_bytes(SECRET_SIZE, 'big'),
+                          network=network,
+                          )
+
+    @property
+    def has_private_keys(self):
+        return bool(self._priv_key)
+
+    @property
+    def network_name(self):
+        return TESTNET if self._network == BitcoinTestNet else MAINNET
+
+    def _pub_key_bytes(self):
+        if not self._pub_key:
+            self._pub_key = get_ec_backend().public_key(int.from_bytes(self._priv_key, 'big'))
+
+        return self._pub_key
+
+    def _hash160_bytes(self):
+        if not self._hash160:
+            self._hash160 = hash160(_compress(self._pub_key_bytes()))
+
+        return self._hash160
+
+    def pub_key(self):
+        # Uncompressed point as ethereum formats it
+        return self._pub_key_bytes().hex()
+
+    def compressed_pub_key(self):
+        # SEC encoding bitcoin addresses are derived from
+        return _compress(self._pub_key_bytes()).hex()
+
+    def priv_key(self):
+        if not self.has_private_keys:
+            raise ValueError('This Account object does not contain private keys')
+
+        return self._priv_key.hex()
+
+    def wif(self):
+        # Private key in the wallet import format, flagged as compressed
+        import base58
+
+        if not self.has_private_keys:
+            raise ValueError('This Account object does not contain private keys')
+
+        return base58.b58encode_check(bytes([self._network.SECRET_KEY]) + self._priv_key + b'\x01').decode('ascii')
+
+    def ethereum_address(self):
+        keccak = sha3.keccak_256()
+        keccak.update(self._pub_key_bytes())
+
+        return '0x' + keccak.digest()[12:].hex()
+
+    def p2pkh_address(self):
+        import base58
+
+        return base58.b58encode_check(bytes([self._network.PUBKEY_ADDRESS]) + self._hash160_bytes()).decode('ascii')
+
+    def p2sh_p2wpkh_address(self):
+        # Segwit nested in a pay to script hash, for wallets that cannot send
+        # to bech32 addresses
+        import base58
+
+        script = b'\x00\x14' + self._hash160_bytes()
+        return base58.b58encode_check(bytes([self._network.SCRIPT_ADDRESS]) + hash160(script)).decode('ascii')
+
+    def p2wpkh_address(self):
+        return bech32.encode(SEGWIT_HRP[self.network_name], 0, self._hash160_bytes())
+
+    def ethereum_account(self):
+        return EthereumAccount(pub_key=self._pub_key_bytes(), priv_key=self._priv_key)
+
+    def serialize(self):
+        return MultiChainRecord(network=self.network_name,
+                                pub_key=self.pub_key(),
+                                priv_key=self.priv_key() if self.has_private_keys else None,
+                                wif=self.wif() if self.has_private_keys else None,
+                                ethereum=self.ethereum_address(),
+                                p2pkh=self.p2pkh_address(),
+                                p2sh_p2wpkh=self.p2sh_p2wpkh_address(),
+                                p2wpkh=self.p2wpkh_address(),
+                                )
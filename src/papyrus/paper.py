@@ -0,0 +1,268 @@
+import os
+import zlib
+import tempfile
+import itertools
+
+from collections import deque
+
+from papyrus import qr
+from papyrus.exceptions import PapyrusException
+
+PDF = '.pdf'
+PNG = '.png'
+
+# Page sizes in inches
+PAGE_SIZES = {'letter': (8.5, 11),
+              'a4': (8.27, 11.69),
+              }
+DEFAULT_PAGE_SIZE = 'letter'
+DEFAULT_DPI = 300
+WALLETS_PER_PAGE = 4
+
+MARGIN = 0.5
+GUTTER = 0.25
+# Fraction of a row's height given to the labels under the qrcodes
+LABEL_HEIGHT = 0.1
+# Smallest printed qrcode in inches. An encrypted key needs a code about 60
+# modules wide, smaller than this and printers start to blur the modules.
+MIN_QR_SIZE = 1
+
+KEY_LABEL = 'Encrypted private key'
+
+def _address_type(address):
+    # Account type of an address, which pins the qrcode version of addresses
+    # (see papyrus.qr.PROFILES)
+    return 'ethereum' if address.startswith('0x') else 'bitcoin'
+
+def _qr_image(data, size, account_type=None):
+    matrix = qr.encode(data, account_type=account_type)
+
+    # Keep every module the same number of pixels wide so the code scans
+    # reliably once printed. The page margins act as the quiet zone.
+    return qr.to_image(matrix, box_size=max(1, size // len(matrix)), border=0)
+
+def _font(size):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed size bitmap font
+        return ImageFont.load_default()
+
+def max_per_page(page_size=DEFAULT_PAGE_SIZE):
+    # Most wallets that fit on a page with every qrcode at least MIN_QR_SIZE
+    try:
+        height = PAGE_SIZES[page_size][1]
+    except KeyError:
+        raise PapyrusException('Invalid page size: {}'.format(page_size))
+
+    return int((height - 2 * MARGIN) * (1 - LABEL_HEIGHT) / (MIN_QR_SIZE + GUTTER))
+
+def render_page(wallets,
+                page_size=DEFAULT_PAGE_SIZE,
+                dpi=DEFAULT_DPI,
+                per_page=WALLETS_PER_PAGE,
+                ):
+    # wallets is a sequence of at most per_page (address, encrypted key)
+    # pairs. The encrypted key may be None for watch-only addresses.
+    from PIL import Image, ImageDraw
+
+    try:
+        width, height = (int(inches * dpi) for inches in PAGE_SIZES[page_size])
+    except KeyError:
+        raise PapyrusException('Invalid page size: {}'.format(page_size))
+
+    if not 1 <= per_page <= max_per_page(page_size):
+        raise PapyrusException('Between 1 and {} wallets fit on a {} page'.format(max_per_page(page_size),
+                                                                                 page_size))
+
+    margin = int(MARGIN * dpi)
+    gutter = int(GUTTER * dpi)
+
+    row_height = (height - 2 * margin) // per_page
+    label_height = int(row_height * LABEL_HEIGHT)
+    qr_size = min(row_height - label_height - gutter,
+                  (width - 2 * margin - gutter) // 2)
+    font = _font(max(8, label_height // 3))
+
+    page = Image.new('1', (width, height), 1)
+    draw = ImageDraw.Draw(page)
+
+    for i, (address, encrypted_key) in enumerate(wallets):
+        top = margin + i * row_height
+
+        if i:
+            # Cut line between wallets
+            draw.line([(margin, top - gutter // 2), (width - margin, top - gutter // 2)], fill=0)
+
+        cells = [(margin, address, address, _address_type(address))]
+        if encrypted_key:
+            cells.append((width - margin - qr_size, encrypted_key, KEY_LABEL, None))
+
+        for left, data, label, account_type in cells:
+            image = _qr_image(data, qr_size, account_type=account_type)
+            page.paste(image, (left, top))
+            draw.text((left, top + qr_size + label_height // 4), label, fill=0, font=font)
+
+    return page
+
+def _render_page(args):
+    wallets, page_size, dpi, per_page = args
+    return render_page(wallets, page_size=page_size, dpi=dpi, per_page=per_page)
+
+def render_pages(wallets,
+                 page_size=DEFAULT_PAGE_SIZE,
+                 dpi=DEFAULT_DPI,
+                 per_page=WALLETS_PER_PAGE,
+                 workers=None,
+                 executor=None,
+                 ):
+    # Yields pages in order while workers render the following ones. Only a
+    # few pages are in flight at a time so arbitrarily long inputs can be
+    # streamed to disk.
+    wallets = iter(wallets)
+    pages = iter(lambda: list(itertools.islice(wallets, per_page)), [])
+    args = ((page, page_size, dpi, per_page) for page in pages)
+
+    if workers == 1 and executor is None:
+        yield from map(_render_page, args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+
+    def submit(executor):
+        pending = deque()
+
+        for arg in args:
+            pending.append(executor.submit(_render_page, arg))
+
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+    if executor is not None:
+        yield from submit(executor)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from submit(executor)
+
+class PDFWriter(object):
+    # Minimal PDF writer storing each page as a single 1-bit image. Pages are
+    # written as they are added, Pillow rewrites the whole document to append
+    # a page which makes long print jobs quadratic.
+    def __init__(self, stream, dpi=DEFAULT_DPI):
+        self._stream = stream
+        self._dpi = dpi
+        self._position = 0
+        self._offsets = {}
+        self._pages = []
+
+        # Objects 1 and 2 are the catalog and page tree, written by close()
+        # once every page is known
+        self._next_id = 3
+
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data):
+        self._stream.write(data)
+        self._position += len(data)
+
+    def _object(self, object_id, dictionary, stream=None):
+        self._offsets[object_id] = self._position
+        self._write('{} 0 obj\n{}'.format(object_id, dictionary).encode('ascii'))
+
+        if stream is not None:
+            self._write(b'\nstream\n')
+            self._write(stream)
+            self._write(b'\nendstream')
+
+        self._write(b'\nendobj\n')
+
+    def add_page(self, image):
+        if image.mode != '1':
+            image = image.convert('1')
+
+        width, height = image.size
+        page_width = width * 72 / self._dpi
+        page_height = height * 72 / self._dpi
+
+        image_id, contents_id, page_id = range(self._next_id, self._next_id + 3)
+        self._next_id += 3
+
+        # Rows of a mode '1' image are packed MSB first with 1 for white,
+        # which is how a 1 bit DeviceGray PDF image is laid out too
+        data = zlib.compress(image.tobytes())
+        self._object(image_id,
+                     '<< /Type /XObject /Subtype /Image /Width {} /Height {} /ColorSpace /DeviceGray '
+                     '/BitsPerComponent 1 /Filter /FlateDecode /Length {} >>'.format(width, height, len(data)),
+                     data)
+
+        contents = 'q {:.2f} 0 0 {:.2f} 0 0 cm /Im Do Q'.format(page_width, page_height).encode('ascii')
+        self._object(contents_id, '<< /Length {} >>'.format(len(contents)), contents)
+
+        self._object(page_id,
+                     '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {:.2f} {:.2f}] '
+                     '/Resources << /XObject << /Im {} 0 R >> >> /Contents {} 0 R >>'.format(page_width,
+                                                                                          page_height,
+                                                                                          image_id,
+                                                                                          contents_id))
+        self._pages.append(page_id)
+
+    def close(self):
+        self._object(1, '<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(2, '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+            ' '.join('{} 0 R'.format(page_id) for page_id in self._pages), len(self._pages)))
+
+        xref = self._position
+        self._write('xref\n0 {}\n'.format(self._next_id).encode('ascii'))
+        self._write(b'0000000000 65535 f \n')
+        for object_id in range(1, self._next_id):
+            self._write('{:010d} 00000 n \n'.format(self._offsets[object_id]).encode('ascii'))
+
+        self._write('trailer\n<< /Size {} /Root 1 0 R >>\nstartxref\n{}\n%%EOF\n'.format(self._next_id,
+                                                                                      xref).encode('ascii'))
+
+def _sheet_filename(output, number):
+    root, ext = os.path.splitext(output)
+    return '{}-{:04d}{}'.format(root, number, ext)
+
+def save_pages(pages, output, dpi=DEFAULT_DPI):
+    # A .pdf output receives every page as it is rendered. A .png output
+    # is split into one numbered sheet per page (e.g. wallets-0001.png).
+    # Returns the number of pages written.
+    ext = os.path.splitext(output)[1].lower()
+
+    if ext not in (PDF, PNG):
+        raise PapyrusException('Paper wallets can only be saved as .pdf or .png')
+
+    count = 0
+
+    if ext == PDF:
+        # Rendered to a temporary file next to output and renamed over it
+        # once complete, a failed render never leaves a truncated document
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(output) or '.',
+                                             prefix=os.path.basename(output) + '.')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer = PDFWriter(f, dpi=dpi)
+
+                for count, page in enumerate(pages, 1):
+                    writer.add_page(page)
+
+                writer.close()
+
+            os.replace(temp_filename, output)
+        except BaseException:
+            os.unlink(temp_filename)
+            raise
+    else:
+        for count, page in enumerate(pages, 1):
+            page.save(_sheet_filename(output, count), 'PNG', dpi=(dpi, dpi))
+
+    return count
@@ -0,0 +1,31 @@
+import os
+
+# Batch commands (generate-batch, recover-batch, qrcode --decode-dir...) map
+# a function over many records in worker processes. Functions mapped over a
+# batch report failures in their results rather than raising them, so that
+# one bad record does not abort the rest of the batch.
+
+def error_message(exception):
+    return str(exception) or exception.__class__.__name__
+
+def map_chunked(func, args, workers=None, chunksize=None, executor=None):
+    # [func(arg) for arg in args], spread over executor or a process pool
+    # started for the call. Runs in this process when a single worker is
+    # asked for and no executor is given.
+    args = list(args)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 and executor is None:
+        return [func(arg) for arg in args]
+
+    # Large chunks keep the pickling overhead per record low while still
+    # leaving a few chunks per worker to balance the load
+    chunksize = chunksize or max(1, len(args) // (workers * 4))
+
+    if executor is not None:
+        return list(executor.map(func, args, chunksize=chunksize))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, args, chunksize=chunksize))
@@ -0,0 +1,162 @@
+import sys
+import functools
+
+from collections import namedtuple
+
+# Values of qrcode.constants, repeated so that importing this module does not
+# load qrcode
+ERROR_CORRECT_L = 1
+ERROR_CORRECT_M = 0
+ERROR_CORRECT_Q = 3
+ERROR_CORRECT_H = 2
+
+QRProfile = namedtuple('QRProfile', ['version', 'error_correction'])
+
+# Addresses have a fixed length per account type so the smallest version
+# holding them can be chosen up front. A 42 character ethereum address (or a
+# bitcoin address of up to 35 characters) is 42 bytes, exactly what a version
+# 3 code holds at the medium error correction level.
+PROFILES = {'ethereum': QRProfile(version=3, error_correction=ERROR_CORRECT_M),
+            'bitcoin': QRProfile(version=3, error_correction=ERROR_CORRECT_M),
+            }
+
+# Only the matrices of addresses (data with a known account type) are
+# cached. Anything else may be a private key and must not outlive the call.
+MATRIX_CACHE_SIZE = 1024
+
+# Modules of light border the QR specification requires around a code
+QUIET_ZONE = 4
+
+# Terminal rendering packs two rows of modules into each line of text using
+# half block characters, dark on a light background. Terminal cells are
+# about twice as tall as they are wide so the modules come out square.
+TERMINAL_COLORS = '\033[30;47m'
+TERMINAL_RESET = '\033[0m'
+HALF_BLOCKS = {(False, False): ' ',
+               (True, False): '\u2580',
+               (False, True): '\u2584',
+               (True, True): '\u2588',
+               }
+TERMINAL_BORDER = 2
+
+# Fallback for terminals whose encoding has no block characters, drawing each
+# module as two colored spaces like qrcode_terminal
+TERMINAL_WHITE = '\033[0;37;47m  '
+TERMINAL_BLACK = '\033[0;37;40m  '
+TERMINAL_NEWLINE = '\033[0m\n'
+
+def _encode(data, version, error_correction, mask):
+    import qrcode
+    from qrcode.exceptions import DataOverflowError
+
+    qr = qrcode.QRCode(version=version,
+                       error_correction=error_correction,
+                       mask_pattern=mask,
+                       border=0)
+    # A single byte mode segment keeps the length of the encoded data
+    # predictable for a pinned version
+    qr.add_data(data, optimize=0)
+
+    try:
+        qr.make(fit=version is None)
+    except DataOverflowError:
+        # Longer than the profile allows for, e.g. a non standard address
+        qr = qrcode.QRCode(error_correction=error_correction,
+                           mask_pattern=mask,
+                           border=0)
+        qr.add_data(data, optimize=0)
+        qr.make(fit=True)
+
+    return tuple(tuple(bool(module) for module in row) for row in qr.get_matrix())
+
+_encode_address = functools.lru_cache(maxsize=MATRIX_CACHE_SIZE)(_encode)
+
+def encode(data, account_type=None, mask=None):
+    # Returns the QR matrix of data as rows of booleans (True for dark
+    # modules) without a quiet zone. The version and error correction level
+    # are pinned for the addresses of known account types, anything else gets
+    # the smallest version that fits. Choosing a mask (0-7) skips evaluating
+    # all eight, which is most of the cost of encoding, at the price of a code
+    # that may be slightly harder to scan.
+    profile = PROFILES.get(account_type)
+
+    if profile is None:
+        return _encode(data, None, ERROR_CORRECT_M, mask)
+
+    return _encode_address(data, profile.version, profile.error_correction, mask)
+
+def to_image(matrix, box_size=10, border=QUIET_ZONE):
+    # Draw the matrix at one pixel per module and scale it up, which is much
+    # cheaper than drawing every module as a rectangle
+    from PIL import Image
+
+    size = len(matrix) + 2 * border
+
+    image = Image.new('1', (size, size), 1)
+    image.putdata([0 if module else 1
+                   for row in _with_border(matrix, border)
+                   for module in row])
+
+    return image.resize((size * box_size, size * box_size), Image.NEAREST)
+
+def _with_border(matrix, border):
+    light_row = (False,) * (len(matrix) + 2 * border)
+    light_edge = (False,) * border
+
+    return ((light_row,) * border +
+            tuple(light_edge + row + light_edge for row in matrix) +
+            (light_row,) * border)
+
+def make_image(data, account_type=None, mask=None, box_size=10, border=QUIET_ZONE):
+    return to_image(encode(data, account_type=account_type, mask=mask),
+                    box_size=box_size,
+                    border=border)
+
+def to_terminal(matrix, border=TERMINAL_BORDER):
+    rows = _with_border(matrix, border)
+    if len(rows) % 2:
+        rows += ((False,) * len(rows[0]),)
+
+    return ''.join(TERMINAL_COLORS +
+                   ''.join(HALF_BLOCKS[modules] for modules in zip(top, bottom)) +
+                   TERMINAL_RESET + '\n'
+                   for top, bottom in zip(rows[::2], rows[1::2]))
+
+def to_terminal_full_blocks(matrix, border=1):
+    return ''.join(''.join(TERMINAL_BLACK if module else TERMINAL_WHITE for module in row) + TERMINAL_NEWLINE
+                   for row in _with_border(matrix, border))
+
+def write_frame(frame, stream=None):
+    # Hand the whole frame to the OS in a single write. Going through the
+    # text layer may split it at buffer boundaries, which shows as the code
+    # scrolling into view over slow links.
+    stream = stream or sys.stdout
+    encoding = getattr(stream, 'encoding', None) or 'utf-8'
+    buffer = getattr(stream, 'buffer', None)
+
+    if buffer is None:
+        stream.write(frame)
+        stream.flush()
+        return
+
+    stream.flush()
+    buffer.write(frame.encode(encoding))
+    buffer.flush()
+
+def draw(data, account_type=None, mask=None, stream=None):
+    stream = stream or sys.stdout
+    matrix = encode(data, account_type=account_type, mask=mask)
+    frame = to_terminal(matrix)
+
+    try:
+        frame.encode(getattr(stream, 'encoding', None) or 'utf-8')
+    except UnicodeEncodeError:
+        frame = to_terminal_full_blocks(matrix)
+
+    write_frame(frame, stream=stream)
+
+def cache_info():
+    return _encode_address.cache_info()
+
+def clear_cache():
+    _encode_address.cache_clear()
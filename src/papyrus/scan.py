@@ -0,0 +1,141 @@
+import os
+
+from collections import namedtuple
+
+from papyrus.exceptions import PapyrusException
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff')
+
+# Scans of paper backups are much larger than zbar needs, codes are cropped
+# and scaled down so the longest side is at most this many pixels
+MAX_SCAN_SIZE = 1024
+
+# Light pixels kept around the cropped code, as a fraction of its size, so
+# the quiet zone zbar looks for survives the crop
+CROP_MARGIN = 0.1
+
+DecodeResult = namedtuple('DecodeResult', ['file', 'payload', 'error'])
+
+# One zbar scanner per process, qrtools creates (and configures) a new one
+# for every image
+_scanner = None
+
+def _get_scanner():
+    global _scanner
+
+    if _scanner is None:
+        import zbar
+
+        _scanner = zbar.ImageScanner()
+        _scanner.parse_config('enable')
+
+    return _scanner
+
+def _otsu_threshold(histogram):
+    # Threshold maximizing the variance between the light and dark pixels
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+
+    best_threshold = 128
+    best_variance = 0
+    dark = dark_weighted = 0
+
+    for threshold, count in enumerate(histogram):
+        dark += count
+        dark_weighted += threshold * count
+        light = total - dark
+
+        if not dark or not light:
+            continue
+
+        difference = dark_weighted / dark - (weighted_total - dark_weighted) / light
+        variance = dark * light * difference * difference
+
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = threshold
+
+    return best_threshold
+
+def _binarize(image, threshold):
+    return image.point(lambda value: 255 if value > threshold else 0)
+
+def prepare(image):
+    # Binarize a grayscale image, crop it to the dark area holding the code
+    # and scale it down, all with Pillow's C implementations
+    from PIL import Image, ImageOps
+
+    threshold = _otsu_threshold(image.histogram())
+
+    box = ImageOps.invert(_binarize(image, threshold)).getbbox()
+    if box:
+        left, top, right, bottom = box
+        margin = int(max(right - left, bottom - top) * CROP_MARGIN)
+        image = image.crop((max(0, left - margin),
+                            max(0, top - margin),
+                            min(image.size[0], right + margin),
+                            min(image.size[1], bottom + margin)))
+
+    if max(image.size) > MAX_SCAN_SIZE:
+        scale = MAX_SCAN_SIZE / max(image.size)
+        image = image.resize((max(1, int(image.size[0] * scale)),
+                              max(1, int(image.size[1] * scale))),
+                             Image.BILINEAR)
+
+    return _binarize(image, threshold)
+
+def _scan(image):
+    import zbar
+
+    width, height = image.size
+    zbar_image = zbar.Image(width, height, 'Y800', image.tobytes())
+    _get_scanner().scan(zbar_image)
+
+    for symbol in zbar_image:
+        data = symbol.data
+        return data.decode('utf-8') if isinstance(data, bytes) else data
+
+    return None
+
+def decode(filename):
+    from PIL import Image
+
+    with Image.open(filename) as image:
+        image = image.convert('L')
+
+    payload = _scan(prepare(image))
+
+    if payload is None:
+        # Thresholding can wipe out codes on unevenly lit scans, try the
+        # untouched image before giving up
+        payload = _scan(image)
+
+    if payload is None:
+        raise PapyrusException('No qrcode found')
+
+    return payload
+
+def _decode(filename):
+    from papyrus.parallel import error_message
+
+    try:
+        return DecodeResult(file=filename, payload=decode(filename), error=None)
+    except Exception as e:
+        return DecodeResult(file=filename, payload=None, error=error_message(e))
+
+def list_images(directory):
+    if not os.path.isdir(directory):
+        raise PapyrusException('{} is not a directory'.format(directory))
+
+    return sorted(entry.path
+                  for entry in os.scandir(directory)
+                  if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS)
+
+def decode_many(filenames,
+                workers=None,
+                chunksize=None,
+                executor=None,
+                ):
+    from papyrus.parallel import map_chunked
+
+    return map_chunked(_decode, filenames, workers=workers, chunksize=chunksize, executor=executor)
@@ -0,0 +1,329 @@
+import sys
+import struct
+import itertools
+
+from array import array
+
+from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
+
+from papyrus.account import (ADDRESS_SIZE,
+                             ETHEREUM_PUB_KEY_SIZE,
+                             EXTENDED_KEY_SIZE,
+                             MAINNET,
+                             TESTNET,
+                             BitcoinAccount,
+                             EthereumAccount,
+                             _ethereum_bytes,
+                             )
+from papyrus.exceptions import PapyrusException
+
+MAGIC = b'PAPYTBL\x00'
+FORMAT_VERSION = 1
+
+# Magic, format version, account type, flags, number of rows and size of the
+# encrypted key blob. The columns follow in the order they are declared in
+# AccountTable, integers are little endian.
+HEADER = struct.Struct('<8sBBBxQQ')
+
+# Set when the rows are stored in address order
+SORTED = 0x01
+
+# Position in these tuples is the id stored in the file
+ACCOUNT_CLASSES = (EthereumAccount, BitcoinAccount)
+NETWORKS = (MAINNET, TESTNET)
+
+BITCOIN_NETWORKS = {MAINNET: BitcoinMainNet,
+                    TESTNET: BitcoinTestNet,
+                    }
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+
+    return column.tobytes()
+
+def _read(f, size, filename):
+    data = bytearray(size)
+
+    if f.readinto(data) != size:
+        raise PapyrusException('{} is truncated'.format(filename))
+
+    return data
+
+class AccountTable(object):
+    # Watch-only accounts of a single type stored as contiguous columns
+    # rather than one object per account. A row costs its raw address, public
+    # key, network id and encrypted key plus an 8 byte offset, so millions of
+    # rows fit where millions of Account objects would not. Accounts are only
+    # built when rows are read back.
+    def __init__(self, account_cls):
+        if not issubclass(account_cls, ACCOUNT_CLASSES):
+            raise ValueError('Only ethereum and bitcoin accounts can be stored in a table')
+
+        self.account_cls = account_cls
+        self._is_bitcoin = issubclass(account_cls, BitcoinAccount)
+        self._pub_key_size = EXTENDED_KEY_SIZE if self._is_bitcoin else ETHEREUM_PUB_KEY_SIZE
+
+        self._addresses = bytearray()
+        self._pub_keys = bytearray()
+        self._networks = bytearray()
+        # Row i's encrypted key is _keys[_key_offsets[i]:_key_offsets[i + 1]]
+        self._key_offsets = array('Q', [0])
+        self._keys = bytearray()
+
+        self._sorted = True
+        # Rows in address order, built on the first lookup of an unsorted table
+        self._order = None
+
+    @classmethod
+    def from_accounts(cls, accounts, account_cls=None, encryptor=None):
+        # Accounts are consumed one at a time so a generator never has more
+        # than one of them alive. Pass a KeyEncryptor to keep the encrypted
+        # private key of every account that has one.
+        accounts = iter(accounts)
+
+        if account_cls is None:
+            first = next(accounts, None)
+            if first is None:
+                raise ValueError('The account class is required to build a table from no accounts')
+
+            account_cls = type(first)
+            accounts = itertools.chain([first], accounts)
+
+        table = cls(account_cls)
+        table.extend(accounts, encryptor=encryptor)
+        return table
+
+    def __len__(self):
+        return len(self._networks)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._account(row)
+
+    def __getitem__(self, row):
+        return self._account(self._check_row(row))
+
+    def __contains__(self, address):
+        return self.find(address) is not None
+
+    @property
+    def is_sorted(self):
+        return self._sorted
+
+    def _check_row(self, row):
+        if row < 0:
+            row += len(self)
+
+        if not 0 <= row < len(self):
+            raise IndexError('Row {} is out of range'.format(row))
+
+        return row
+
+    def _address_bytes(self, row):
+        return bytes(memoryview(self._addresses)[row * ADDRESS_SIZE:(row + 1) * ADDRESS_SIZE])
+
+    def _pub_key_bytes(self, row):
+        return bytes(memoryview(self._pub_keys)[row * self._pub_key_size:(row + 1) * self._pub_key_size])
+
+    def _account(self, row):
+        if self._is_bitcoin:
+            return self.account_cls(pub_key=self._pub_key_bytes(row),
+                                    address=self._address_bytes(row),
+                                    network=BITCOIN_NETWORKS[NETWORKS[self._networks[row]]])
+
+        return self.account_cls(pub_key=self._pub_key_bytes(row),
+                                address=self._address_bytes(row))
+
+    def append(self, account, encrypted_key=None):
+        if not isinstance(account, self.account_cls):
+            raise ValueError('Only {} accounts can be added to this table'.format(self.account_cls.ACCOUNT_TYPE))
+
+        address = account._address_bytes()
+
+        if self._sorted and len(self) and address < self._address_bytes(len(self) - 1):
+            self._sorted = False
+        self._order = None
+
+        if isinstance(encrypted_key, str):
+            encrypted_key = encrypted_key.encode('utf-8')
+
+        self._addresses += address
+        self._pub_keys += account._pub_key_bytes()
+        self._networks.append(NETWORKS.index(account.network_name))
+        self._keys += encrypted_key or b''
+        self._key_offsets.append(len(self._keys))
+
+    def extend(self, accounts, encryptor=None):
+        for account in accounts:
+            encrypted_key = None
+            if encryptor is not None and account.has_private_keys:
+                encrypted_key = encryptor.encrypt(account.priv_key())
+
+            self.append(account, encrypted_key=encrypted_key)
+
+    def encrypted_key(self, row):
+        row = self._check_row(row)
+
+        start, end = self._key_offsets[row], self._key_offsets[row + 1]
+        return bytes(self._keys[start:end]) if end > start else None
+
+    def addresses(self):
+        if not self._is_bitcoin:
+            # A single hex conversion of the whole column, sliced per row
+            column = self._addresses.hex()
+            width = 2 * ADDRESS_SIZE
+
+            return ['0x' + column[start:start + width] for start in range(0, len(column), width)]
+
+        import base58
+
+        versions = [bytes([BITCOIN_NETWORKS[network].PUBKEY_ADDRESS]) for network in NETWORKS]
+        return [base58.b58encode_check(versions[self._networks[row]] + self._address_bytes(row)).decode('ascii')
+                for row in range(len(self))]
+
+    def pub_keys(self):
+        if not self._is_bitcoin:
+            column = self._pub_keys.hex()
+            width = 2 * self._pub_key_size
+
+            return [column[start:start + width] for start in range(0, len(column), width)]
+
+        import base58
+
+        return [base58.b58encode_check(self._pub_key_bytes(row)).decode('ascii')
+                for row in range(len(self))]
+
+    def _sorted_rows(self):
+        return sorted(range(len(self)), key=self._address_bytes)
+
+    def sort(self):
+        # Reorder the rows by address so lookups (and saved files) need no
+        # separate index
+        if self._sorted:
+            return
+
+        rows = self._sorted_rows()
+
+        addresses = bytearray()
+        pub_keys = bytearray()
+        networks = bytearray()
+        key_offsets = array('Q', [0])
+        keys = bytearray()
+
+        for row in rows:
+            addresses += memoryview(self._addresses)[row * ADDRESS_SIZE:(row + 1) * ADDRESS_SIZE]
+            pub_keys += memoryview(self._pub_keys)[row * self._pub_key_size:(row + 1) * self._pub_key_size]
+            networks.append(self._networks[row])
+            keys += memoryview(self._keys)[self._key_offsets[row]:self._key_offsets[row + 1]]
+            key_offsets.append(len(keys))
+
+        self._addresses = addresses
+        self._pub_keys = pub_keys
+        self._networks = networks
+        self._key_offsets = key_offsets
+        self._keys = keys
+
+        self._sorted = True
+        self._order = None
+
+    def _lookup_key(self, address):
+        # Raw addresses match on any network, formatted bitcoin addresses only
+        # match rows on the network they were encoded for
+        if isinstance(address, bytes):
+            network = None
+        elif self._is_bitcoin:
+            import base58
+
+            address = base58.b58decode_check(address)
+            version, address = address[0], address[1:]
+
+            network = next((NETWORKS.index(name)
+                            for name, bitcoin_network in BITCOIN_NETWORKS.items()
+                            if bitcoin_network.PUBKEY_ADDRESS == version), None)
+            if network is None:
+                raise ValueError('Unknown address version {}'.format(version))
+        else:
+            address = _ethereum_bytes(address)
+            network = None
+
+        if len(address) != ADDRESS_SIZE:
+            raise ValueError('Address must be {} bytes, not {}'.format(ADDRESS_SIZE, len(address)))
+
+        return address, network
+
+    def find(self, address):
+        # Returns the row holding address, or None. Binary searches the rows,
+        # sorting an index of them first if the table is not in address order.
+        key, network = self._lookup_key(address)
+
+        if not self._sorted and self._order is None:
+            self._order = array('Q', self._sorted_rows())
+        order = self._order if not self._sorted else None
+
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            row = middle if order is None else order[middle]
+
+            if self._address_bytes(row) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        for position in range(low, len(self)):
+            row = position if order is None else order[position]
+
+            if self._address_bytes(row) != key:
+                break
+
+            if network is None or self._networks[row] == network:
+                return row
+
+        return None
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(HEADER.pack(MAGIC,
+                                FORMAT_VERSION,
+                                ACCOUNT_CLASSES.index(EthereumAccount if not self._is_bitcoin else BitcoinAccount),
+                                SORTED if self._sorted else 0,
+                                len(self),
+                                len(self._keys)))
+            f.write(self._addresses)
+            f.write(self._pub_keys)
+            f.write(self._networks)
+            f.write(_little_endian(self._key_offsets))
+            f.write(self._keys)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            header = f.read(HEADER.size)
+
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise PapyrusException('{} is not an account table'.format(filename))
+
+            _, version, account_type, flags, rows, keys_size = HEADER.unpack(header)
+
+            if version != FORMAT_VERSION:
+                raise PapyrusException('Unsupported account table version {}'.format(version))
+
+            if account_type >= len(ACCOUNT_CLASSES):
+                raise PapyrusException('Unknown account type {} in {}'.format(account_type, filename))
+
+            table = cls(ACCOUNT_CLASSES[account_type])
+            table._addresses = _read(f, rows * ADDRESS_SIZE, filename)
+            table._pub_keys = _read(f, rows * table._pub_key_size, filename)
+            table._networks = _read(f, rows, filename)
+
+            table._key_offsets = array('Q')
+            table._key_offsets.frombytes(_read(f, (rows + 1) * table._key_offsets.itemsize, filename))
+            if sys.byteorder == 'big':
+                table._key_offsets.byteswap()
+
+            table._keys = _read(f, keys_size, filename)
+            table._sorted = bool(flags & SORTED)
+
+        return table
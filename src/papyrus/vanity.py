@@ -0,0 +1,196 @@
+import os
+import re
+import sha3
+import time
+
+from concurrent.futures import (ProcessPoolExecutor,
+                                FIRST_COMPLETED,
+                                wait,
+                                )
+from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
+
+from papyrus.account import (BitcoinAccount,
+                             EthereumAccount,
+                             PapyrusException,
+                             key_stream,
+                             )
+
+HEX_ALPHABET = '0123456789abcdef'
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# Candidates checked by a worker before reporting back to the parent process.
+# A running batch cannot be interrupted, once a match is found the other
+# workers still finish theirs, so a batch should take a fraction of a second.
+# Ethereum candidates cost a point addition each while every bitcoin
+# candidate is a full HD wallet, about 2ms.
+ETHEREUM_BATCH_SIZE = 4096
+BITCOIN_BATCH_SIZE = 64
+
+class VanityPattern(object):
+    def __init__(self,
+                 account_cls,
+                 prefix=None,
+                 suffix=None,
+                 regex=None,
+                 testnet=False,
+                 ):
+        if not (prefix or suffix or regex):
+            raise PapyrusException('A prefix, suffix or regex must be provided')
+
+        if issubclass(account_cls, EthereumAccount):
+            alphabet = HEX_ALPHABET
+            # Ethereum addresses are lowercase hex behind a 0x prefix
+            if prefix:
+                prefix = prefix.lower()
+                if prefix.startswith('0x'):
+                    prefix = prefix[2:]
+            if suffix:
+                suffix = suffix.lower()
+            leading = ''
+        elif issubclass(account_cls, BitcoinAccount):
+            alphabet = BASE58_ALPHABET
+            # The first character of a P2PKH address only encodes the network
+            leading = 'mn' if testnet else '1'
+        else:
+            raise PapyrusException('Invalid account class: {}'.format(account_cls))
+
+        for part in (prefix, suffix):
+            if part and any(c not in alphabet for c in part):
+                raise PapyrusException('{} contains characters that can never appear in an address'.format(part))
+
+        if prefix and leading and prefix[0] not in leading:
+            raise PapyrusException('Addresses on this network must begin with one of: {}'.format(', '.join(leading)))
+
+        self.prefix = prefix
+        self.suffix = suffix
+        self.regex = re.compile(regex) if regex else None
+        self._strip = 2 if issubclass(account_cls, EthereumAccount) else 0
+        self._alphabet = alphabet
+        self._leading = leading
+
+    def matches(self, address):
+        body = address[self._strip:]
+
+        if self.prefix and not body.startswith(self.prefix):
+            return False
+
+        if self.suffix and not body.endswith(self.suffix):
+            return False
+
+        if self.regex and not self.regex.search(address):
+            return False
+
+        return True
+
+    def difficulty(self):
+        # Expected number of candidates to try before finding a match. There
+        # is no sensible estimate for an arbitrary regex.
+        if self.regex:
+            return None
+
+        difficulty = 1
+        if self.prefix:
+            free_chars = len(self.prefix)
+            if self._leading:
+                difficulty *= len(self._leading)
+                free_chars -= 1
+            difficulty *= len(self._alphabet) ** free_chars
+
+        if self.suffix:
+            difficulty *= len(self._alphabet) ** len(self.suffix)
+
+        return difficulty
+
+def estimate_seconds(difficulty, rate):
+    if not difficulty or not rate:
+        return None
+
+    return difficulty / rate
+
+def _search_ethereum(pattern, batch_size):
+    # Step through consecutive keys from a random start so each candidate
+    # costs a point addition plus a hash. Skip building an EthereumAccount per
+    # candidate, only the raw public key bytes are needed for the address.
+    candidates = key_stream(batch_size=batch_size)
+
+    for attempt in range(1, batch_size + 1):
+        secret, pub_key = next(candidates)
+        keccak = sha3.keccak_256()
+        keccak.update(pub_key)
+
+        if pattern.matches('0x' + keccak.hexdigest()[24:]):
+            return attempt, secret.to_bytes(32, 'big')
+
+    return batch_size, None
+
+def _search_bitcoin(pattern, batch_size, testnet):
+    for attempt in range(1, batch_size + 1):
+        account = BitcoinAccount.generate(testnet=testnet)
+
+        if pattern.matches(account.address()):
+            return attempt, account._priv_key
+
+    return batch_size, None
+
+def _search(args):
+    account_cls, pattern, batch_size, testnet = args
+
+    if issubclass(account_cls, EthereumAccount):
+        return _search_ethereum(pattern, batch_size)
+    else:
+        return _search_bitcoin(pattern, batch_size, testnet)
+
+def _load_account(account_cls, secret, testnet):
+    if issubclass(account_cls, EthereumAccount):
+        return account_cls(priv_key=secret)
+    else:
+        return account_cls(priv_key=secret,
+                           network=BitcoinTestNet if testnet else BitcoinMainNet)
+
+def find_vanity(account_cls,
+                prefix=None,
+                suffix=None,
+                regex=None,
+                testnet=False,
+                workers=None,
+                batch_size=None,
+                progress=None,
+                ):
+    pattern = VanityPattern(account_cls,
+                            prefix=prefix,
+                            suffix=suffix,
+                            regex=regex,
+                            testnet=testnet,
+                            )
+    difficulty = pattern.difficulty()
+    workers = workers or os.cpu_count() or 1
+
+    if batch_size is None:
+        batch_size = ETHEREUM_BATCH_SIZE if issubclass(account_cls, EthereumAccount) else BITCOIN_BATCH_SIZE
+
+    args = (account_cls, pattern, batch_size, testnet)
+
+    attempts = 0
+    start = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set(executor.submit(_search, args) for _ in range(workers))
+
+        try:
+            while True:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    batch_attempts, secret = future.result()
+                    attempts += batch_attempts
+
+                    if secret is not None:
+                        return _load_account(account_cls, secret, testnet)
+
+                    pending.add(executor.submit(_search, args))
+
+                if progress:
+                    progress(attempts, time.time() - start, difficulty)
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1,12 +1,26 @@
 import mock
 import pytest
+import itertools
 
+from binascii import unhexlify
+
+from papyrus import account
 from papyrus.account import (Account,
+                             AccountRecord,
+                             ECDSABackend,
                              EthereumAccount,
                              BitcoinAccount,
+                             OpenSSLBackend,
+                             PapyrusException,
+                             generate_many,
+                             get_ec_backend,
+                             key_stream,
+                             set_ec_backend,
                              )
+from papyrus.entropy import HmacDRBG
 from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
-from ecdsa import SECP256k1
+from bitmerchant.wallet import Wallet
+from ecdsa import SigningKey, SECP256k1
 
 class TestAccountInit(object):
     def setup_method(self):
@@ -62,8 +76,8 @@ class TestAccountParentMethodsRaise(object):
 
 class TestAccountEncryptedPrivKey(object):
     def setup_method(self):
-        self.encrypt_patcher = mock.patch('papyrus.account.encrypt')
-        self.mock_encrypt = self.encrypt_patcher.start()
+        self.key_encryptor_patcher = mock.patch('papyrus.account.KeyEncryptor')
+        self.mock_key_encryptor = self.key_encryptor_patcher.start()
 
         self.priv_key_patcher = mock.patch('papyrus.account.Account.priv_key')
         self.mock_priv_key = self.priv_key_patcher.start()
@@ -73,74 +87,119 @@ class TestAccountEncryptedPrivKey(object):
                                address=mock.MagicMock())
 
     def teardown_method(self):
-        self.encrypt_patcher.stop()
+        self.key_encryptor_patcher.stop()
         self.priv_key_patcher.stop()
 
     def test_encrypted_priv_key(self):
-        expected = self.mock_encrypt.return_value
+        expected = self.mock_key_encryptor.return_value.encrypt.return_value
         actual = self.account.encrypted_priv_key('test_passphrase')
 
         assert expected == actual
-        self.mock_encrypt.assert_called_once_with('test_passphrase',
-                                                  self.mock_priv_key.return_value)
+        self.mock_key_encryptor.assert_called_once_with('test_passphrase')
+        self.mock_key_encryptor.return_value.encrypt.assert_called_once_with(self.mock_priv_key.return_value)
+
+    def test_encrypted_priv_key_with_encryptor(self):
+        encryptor = mock.MagicMock()
+
+        actual = self.account.encrypted_priv_key(encryptor=encryptor)
+
+        assert encryptor.encrypt.return_value == actual
+        encryptor.encrypt.assert_called_once_with(self.mock_priv_key.return_value)
+        assert not self.mock_key_encryptor.called
+
+class TestAccountPrintQRCode(object):
+    @mock.patch('papyrus.qr.draw')
+    @mock.patch('papyrus.account.EthereumAccount.address')
+    def test_print_qrcode(self, mock_address, mock_draw):
+        account = EthereumAccount(priv_key=ETHEREUM_SECRET)
+
+        account.print_qrcode()
+
+        mock_draw.assert_called_once_with(mock_address.return_value, account_type='ethereum')
+
+ETHEREUM_SECRET = bytes(range(1, 33))
+
+class TestEthereumAccountInit(object):
+    def setup_method(self):
+        self.signing_key = SigningKey.from_string(ETHEREUM_SECRET, curve=SECP256k1)
+        self.verifying_key = self.signing_key.get_verifying_key()
+
+    def test_raw_bytes(self):
+        account = EthereumAccount(pub_key=self.verifying_key.to_string(),
+                                  priv_key=ETHEREUM_SECRET)
+
+        assert account._priv_key == ETHEREUM_SECRET
+        assert account._pub_key == self.verifying_key.to_string()
+
+    def test_ecdsa_keys(self):
+        account = EthereumAccount(pub_key=self.verifying_key,
+                                  priv_key=self.signing_key)
+
+        assert account._priv_key == ETHEREUM_SECRET
+        assert account._pub_key == self.verifying_key.to_string()
+
+    def test_hex(self):
+        account = EthereumAccount(priv_key='0x' + ETHEREUM_SECRET.hex(),
+                                  address='0x' + '00' * 20)
+
+        assert account._priv_key == ETHEREUM_SECRET
+        assert account._address == bytes(20)
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            EthereumAccount(priv_key=ETHEREUM_SECRET[1:])
+
+    def test_slots(self):
+        with pytest.raises(AttributeError):
+            EthereumAccount(priv_key=ETHEREUM_SECRET).extra = None
 
 class TestEthereumAccountGenerate(object):
     def setup_method(self):
-        self.generate_patcher = mock.patch('papyrus.account.SigningKey.generate')
-        self.mock_generate = self.generate_patcher.start()
+        self.backend_patcher = mock.patch('papyrus.account.get_ec_backend')
+        self.mock_backend = self.backend_patcher.start()
+        self.mock_backend.return_value.generate.return_value = (int.from_bytes(ETHEREUM_SECRET, 'big'), bytes(64))
 
     def teardown_method(self):
-        self.generate_patcher.stop()
+        self.backend_patcher.stop()
 
     def test_generate(self):
         ret_val = EthereumAccount.generate()
 
-        assert ret_val._priv_key == self.mock_generate.return_value
-        assert ret_val._pub_key == self.mock_generate.return_value.get_verifying_key.return_value
-        self.mock_generate.assert_called_once_with(curve=SECP256k1)
-        self.mock_generate.return_value.get_verifying_key.assert_called_once_with()
+        assert ret_val._priv_key == ETHEREUM_SECRET
+        assert ret_val._pub_key == bytes(64)
+        self.mock_backend.return_value.generate.assert_called_once_with(None)
 
-class TestEthereumAccountPubKey(object):
-    def setup_method(self):
-        self.deserialize_patcher = mock.patch('papyrus.account.Wallet.deserialize')
-        self.mock_deserialize = self.deserialize_patcher.start()
+    def test_generate_drbg(self):
+        drbg = mock.MagicMock()
 
-        self.priv_key = mock.MagicMock()
-        self.account = EthereumAccount(priv_key=self.priv_key)
+        EthereumAccount.generate(drbg=drbg)
 
-    def teardown_method(self):
-        self.deserialize_patcher.stop()
+        self.mock_backend.return_value.generate.assert_called_once_with(drbg)
 
-    def test_no_pub_key(self):
-        expected = self.priv_key.get_verifying_key.return_value.to_string.return_value.hex.return_value
-        actual = self.account.pub_key()
+class TestEthereumAccountPubKey(object):
+    def setup_method(self):
+        self.expected = SigningKey.from_string(ETHEREUM_SECRET, curve=SECP256k1).get_verifying_key().to_string()
+        self.account = EthereumAccount(priv_key=ETHEREUM_SECRET)
 
-        assert expected == actual
-        self.priv_key.get_verifying_key.assert_called_once_with()
+    def test_no_pub_key(self):
+        assert self.account.pub_key() == self.expected.hex()
+        assert self.account._pub_key == self.expected
 
-    def test_pub_key(self):
-        self.account._pub_key = mock.MagicMock()
-        expected = self.account._pub_key.to_string.return_value.hex.return_value
-        actual = self.account.pub_key()
+    @mock.patch('papyrus.account.get_ec_backend')
+    def test_pub_key(self, mock_backend):
+        self.account._pub_key = self.expected
 
-        assert expected == actual
-        assert not self.priv_key.get_verifying_key.called
+        assert self.account.pub_key() == self.expected.hex()
+        assert not mock_backend.called
 
 class TestEthereumAccountPrivKey(object):
-    def setup_method(self):
-        self.priv_key = mock.MagicMock()
-        self.pub_key = mock.MagicMock()
-
     def test_has_private_keys(self):
-        account = EthereumAccount(priv_key=self.priv_key)
+        account = EthereumAccount(priv_key=ETHEREUM_SECRET)
 
-        expected = self.priv_key.to_string.return_value.hex.return_value
-        actual = account.priv_key()
-
-        assert expected == actual
+        assert account.priv_key() == ETHEREUM_SECRET.hex()
 
     def test_no_private_keys(self):
-        account = EthereumAccount(pub_key=self.pub_key)
+        account = EthereumAccount(pub_key=bytes(64))
 
         with pytest.raises(ValueError):
             account.priv_key()
@@ -149,109 +208,434 @@ class TestEthereumAccountAddress(object):
     def setup_method(self):
         self.keccak_patcher = mock.patch('papyrus.account.sha3.keccak_256')
         self.mock_keccak = self.keccak_patcher.start()
-        self.mock_keccak.return_value.hexdigest.return_value = '012345678901234567890123456789'
+        self.mock_keccak.return_value.digest.return_value = bytes(range(32))
 
-        self.pub_key = mock.MagicMock()
+        self.pub_key = bytes(64)
         self.account = EthereumAccount(pub_key=self.pub_key)
 
     def teardown_method(self):
         self.keccak_patcher.stop()
 
     def test_address(self):
-        expected = '0x456789'
+        expected = '0x' + bytes(range(12, 32)).hex()
         actual = self.account.address()
 
         assert expected == actual
+        assert self.account._address == bytes(range(12, 32))
+        self.mock_keccak.return_value.update.assert_called_once_with(self.pub_key)
+
+class BitcoinWalletTestCase(object):
+    def setup_method(self):
+        self.wallet = Wallet.from_master_secret(b'papyrus test seed', network=BitcoinTestNet).get_child(0, is_prime=True)
+        self.xpub = self.wallet.serialize_b58(private=False)
+        self.xprv = self.wallet.serialize_b58(private=True)
+
+class TestBitcoinAccountInit(BitcoinWalletTestCase):
+    def test_base58(self):
+        account = BitcoinAccount(pub_key=self.xpub,
+                                 priv_key=self.xprv,
+                                 address=self.wallet.to_address(),
+                                 network=BitcoinTestNet)
+
+        assert account._pub_key == unhexlify(self.wallet.serialize(private=False))
+        assert account._priv_key == unhexlify(self.wallet.serialize(private=True))
+        assert len(account._address) == 20
+
+    def test_wrong_network(self):
+        with pytest.raises(ValueError):
+            BitcoinAccount(pub_key=self.xpub, network=BitcoinMainNet)
+
+        with pytest.raises(ValueError):
+            BitcoinAccount(pub_key=self.xpub, address=self.wallet.to_address(), network=BitcoinMainNet)
+
+    def test_private_key_as_public(self):
+        with pytest.raises(ValueError):
+            BitcoinAccount(pub_key=self.xprv, network=BitcoinTestNet)
+
+    def test_invalid_checksum(self):
+        with pytest.raises(ValueError):
+            BitcoinAccount(pub_key=self.xpub[:-1] + ('1' if self.xpub[-1] != '1' else '2'), network=BitcoinTestNet)
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            BitcoinAccount(pub_key=unhexlify(self.wallet.serialize(private=False))[:-1], network=BitcoinTestNet)
 
 class TestBitcoinAccountGenerate(object):
     def setup_method(self):
-        self.new_random_wallet_patcher = mock.patch('papyrus.account.Wallet.new_random_wallet')
+        self.new_random_wallet_patcher = mock.patch('bitmerchant.wallet.Wallet.new_random_wallet')
         self.mock_new_random_wallet = self.new_random_wallet_patcher.start()
+        self.mock_new_random_wallet.return_value = Wallet.from_master_secret(b'papyrus test seed')
 
     def teardown_method(self):
         self.new_random_wallet_patcher.stop()
 
     def test_generate(self):
         account = BitcoinAccount.generate()
+        expected = Wallet.from_master_secret(b'papyrus test seed').get_child(0, is_prime=True)
+
+        assert account._pub_key == unhexlify(expected.serialize(private=False))
+        assert account._priv_key == unhexlify(expected.serialize(private=True))
+
+        assert account._wallet is None
+        assert account.derivation_path == "m/0'"
+        assert account.network_name == 'mainnet'
+
+    def test_generate_drbg(self):
+        drbg = mock.MagicMock()
+        drbg.read.return_value = b'papyrus test seed'
+
+        account = BitcoinAccount.generate(testnet=True, drbg=drbg)
+        expected = Wallet.from_master_secret(b'papyrus test seed', network=BitcoinTestNet).get_child(0, is_prime=True)
 
-        assert account._pub_key == self.mock_new_random_wallet.return_value.get_child.return_value.serialize_b58.return_value
-        assert account._priv_key == self.mock_new_random_wallet.return_value.get_child.return_value.serialize_b58.return_value
+        assert account._priv_key == unhexlify(expected.serialize(private=True))
+        drbg.read.assert_called_once_with(64)
+        assert not self.mock_new_random_wallet.called
 
-        self.mock_new_random_wallet.return_value.get_child.return_value.serialize_b58.assert_has_calls([mock.call(private=False), mock.call(private=True)])
+    def test_generate_drbg_extra_entropy(self):
+        drbg = mock.MagicMock()
+        drbg.read.return_value = b'papyrus test '
 
-class TestBitcoinAccountPubKey(object):
+        account = BitcoinAccount.generate(extra_entropy='seed', drbg=drbg)
+        expected = Wallet.from_master_secret(b'papyrus test seed').get_child(0, is_prime=True)
+
+        assert account._priv_key == unhexlify(expected.serialize(private=True))
+
+    def test_child_not_memoized(self):
+        before = Wallet.get_child.cache_info().currsize
+
+        BitcoinAccount.generate()
+
+        assert Wallet.get_child.cache_info().currsize == before
+
+class TestBitcoinAccountWallet(BitcoinWalletTestCase):
     def setup_method(self):
-        self.deserialize_patcher = mock.patch('papyrus.account.Wallet.deserialize')
+        super().setup_method()
+        self.deserialize_patcher = mock.patch('bitmerchant.wallet.Wallet.deserialize')
         self.mock_deserialize = self.deserialize_patcher.start()
 
-        self.priv_key = mock.MagicMock()
-        self.account = BitcoinAccount(priv_key=self.priv_key, network=BitcoinTestNet)
+        self.account = BitcoinAccount(priv_key=self.xprv, network=BitcoinTestNet)
 
     def teardown_method(self):
         self.deserialize_patcher.stop()
 
-    def test_pub_key(self):
-        expected = self.mock_deserialize.return_value.serialize_b58.return_value
-        actual = self.account.pub_key()
+    def test_wallet(self):
+        expected = self.mock_deserialize.return_value
+        actual = self.account.wallet
 
         assert expected == actual
-        self.mock_deserialize.assert_called_once_with(self.priv_key, network=BitcoinTestNet)
-        self.mock_deserialize.return_value.serialize_b58.assert_called_once_with(private=False)
+        self.mock_deserialize.assert_called_once_with(self.account._priv_key, network=BitcoinTestNet)
 
-class TestBitcoinAccountPrivKey(object):
-    def setup_method(self):
-        self.priv_key = mock.MagicMock()
-        self.pub_key = mock.MagicMock()
+    def test_accessors_skip_wallet(self):
+        self.account.pub_key()
+        self.account.priv_key()
+        self.account.address()
 
-        self.deserialize_patcher = mock.patch('papyrus.account.Wallet.deserialize')
-        self.mock_deserialize = self.deserialize_patcher.start()
+        assert not self.mock_deserialize.called
 
-    def teardown_method(self):
-        self.deserialize_patcher.stop()
+class TestBitcoinAccountNetworkName(BitcoinWalletTestCase):
+    def test_mainnet(self):
+        wallet = Wallet.from_master_secret(b'papyrus test seed')
+        account = BitcoinAccount(pub_key=wallet.serialize_b58(private=False), network=BitcoinMainNet)
+
+        assert account.network_name == 'mainnet'
+
+    def test_testnet(self):
+        account = BitcoinAccount(pub_key=self.xpub, network=BitcoinTestNet)
+
+        assert account.network_name == 'testnet'
+
+class TestBitcoinAccountPubKey(BitcoinWalletTestCase):
+    def test_pub_key(self):
+        account = BitcoinAccount(pub_key=self.xpub, network=BitcoinTestNet)
+
+        assert account.pub_key() == self.xpub
+
+    def test_from_priv_key(self):
+        account = BitcoinAccount(priv_key=self.xprv, network=BitcoinTestNet)
+
+        assert account.pub_key() == self.xpub
+        assert account._pub_key == unhexlify(self.wallet.serialize(private=False))
 
+class TestBitcoinAccountPrivKey(BitcoinWalletTestCase):
     def test_has_private_keys(self):
-        account = BitcoinAccount(priv_key=self.priv_key, network=BitcoinTestNet)
+        account = BitcoinAccount(priv_key=self.xprv, network=BitcoinTestNet)
 
-        expected = self.mock_deserialize.return_value.export_to_wif.return_value
-        actual = account.priv_key()
+        assert account.priv_key() == self.wallet.export_to_wif().decode('ascii')
 
-        assert expected == actual
-        self.mock_deserialize.assert_called_once_with(self.priv_key, network=BitcoinTestNet)
-        self.mock_deserialize.return_value.export_to_wif.assert_called_once_with()
+    def test_mainnet(self):
+        wallet = Wallet.from_master_secret(b'papyrus test seed')
+        account = BitcoinAccount(priv_key=wallet.serialize_b58(private=True), network=BitcoinMainNet)
+
+        assert account.priv_key() == wallet.export_to_wif().decode('ascii')
 
     def test_no_private_keys(self):
-        account = BitcoinAccount(pub_key=self.pub_key, network=BitcoinTestNet)
+        account = BitcoinAccount(pub_key=self.xpub, network=BitcoinTestNet)
 
         with pytest.raises(ValueError):
             account.priv_key()
 
-class TestBitcoinAccountAddress(object):
+class TestBitcoinAccountAddress(BitcoinWalletTestCase):
+    def test_address_from_pub_key(self):
+        account = BitcoinAccount(pub_key=self.xpub, network=BitcoinTestNet)
+
+        assert account.address() == self.wallet.to_address()
+
+    def test_address_from_priv_key(self):
+        account = BitcoinAccount(priv_key=self.xprv, network=BitcoinTestNet)
+
+        assert account.address() == self.wallet.to_address()
+
+    def test_address(self):
+        account = BitcoinAccount(pub_key=self.xpub, address=self.wallet.to_address(), network=BitcoinTestNet)
+
+        assert account.address() == self.wallet.to_address()
+
+class TestAccountSerialize(object):
     def setup_method(self):
-        self.deserialize_patcher = mock.patch('papyrus.account.Wallet.deserialize')
-        self.mock_deserialize = self.deserialize_patcher.start()
+        self.pub_key_patcher = mock.patch('papyrus.account.Account.pub_key')
+        self.mock_pub_key = self.pub_key_patcher.start()
 
-        self.priv_key = mock.MagicMock()
-        self.pub_key = mock.MagicMock()
+        self.priv_key_patcher = mock.patch('papyrus.account.Account.priv_key')
+        self.mock_priv_key = self.priv_key_patcher.start()
+
+        self.address_patcher = mock.patch('papyrus.account.Account.address')
+        self.mock_address = self.address_patcher.start()
 
     def teardown_method(self):
-        self.deserialize_patcher.stop()
+        self.pub_key_patcher.stop()
+        self.priv_key_patcher.stop()
+        self.address_patcher.stop()
 
-    def test_address_from_pub_key(self):
-        account = BitcoinAccount(pub_key=self.pub_key, network=BitcoinTestNet)
+    def test_serialize_with_private_keys(self):
+        account = Account(priv_key=mock.MagicMock())
 
-        expected = self.mock_deserialize.return_value.to_address.return_value
-        actual = account.address()
+        expected = AccountRecord(account_type=None,
+                                 network='mainnet',
+                                 address=self.mock_address.return_value,
+                                 pub_key=self.mock_pub_key.return_value,
+                                 priv_key=self.mock_priv_key.return_value,
+                                 derivation_path=None)
+        actual = account.serialize()
 
         assert expected == actual
-        self.mock_deserialize.assert_called_once_with(self.pub_key, network=BitcoinTestNet)
-        self.mock_deserialize.return_value.to_address.assert_called_once_with()
 
-    def test_address_from_priv_key(self):
-        account = BitcoinAccount(priv_key=self.priv_key, network=BitcoinTestNet)
+    def test_serialize_without_private_keys(self):
+        account = Account(pub_key=mock.MagicMock())
 
-        expected = self.mock_deserialize.return_value.to_address.return_value
-        actual = account.address()
+        actual = account.serialize()
 
-        assert expected == actual
-        self.mock_deserialize.assert_called_once_with(self.priv_key, network=BitcoinTestNet)
-        self.mock_deserialize.return_value.to_address.assert_called_once_with()
+        assert actual.priv_key is None
+        assert not self.mock_priv_key.called
+
+class TestGenerateMany(object):
+    def setup_method(self):
+        self.account_cls = mock.MagicMock()
+
+    def test_negative(self):
+        with pytest.raises(ValueError):
+            generate_many(self.account_cls, -1)
+
+    def test_single_worker(self):
+        actual = generate_many(self.account_cls, 3, workers=1, testnet=True)
+
+        assert actual == [self.account_cls.generate.return_value.serialize.return_value] * 3
+        assert self.account_cls.generate.call_args_list == [mock.call(testnet=True, drbg=mock.ANY)] * 3
+
+        # A single DRBG feeds the whole batch
+        drbg = self.account_cls.generate.call_args[1]['drbg']
+        assert isinstance(drbg, HmacDRBG)
+        assert all(call[1]['drbg'] is drbg for call in self.account_cls.generate.call_args_list)
+
+    @mock.patch('papyrus.entropy.HmacDRBG')
+    def test_extra_entropy(self, mock_drbg):
+        generate_many(self.account_cls, 2, workers=1, extra_entropy='dice rolls')
+
+        mock_drbg.assert_called_once_with(personalization='dice rolls')
+        assert self.account_cls.generate.call_args_list == [mock.call(drbg=mock_drbg.return_value)] * 2
+
+    def test_drbg(self):
+        drbg = HmacDRBG()
+
+        generate_many(self.account_cls, 2, workers=1, drbg=drbg)
+
+        assert self.account_cls.generate.call_args_list == [mock.call(drbg=drbg)] * 2
+
+        with pytest.raises(ValueError):
+            generate_many(self.account_cls, 2, workers=1, drbg=drbg, extra_entropy='dice rolls')
+
+    def test_process_pool(self):
+        # Workers get freshly seeded copies of the DRBG, never its state
+        records = generate_many(EthereumAccount, 6, workers=2, chunksize=1)
+
+        assert len(records) == 6
+        assert len(set(record.address for record in records)) == 6
+        for record in records:
+            assert record.address.startswith('0x')
+            assert len(record.priv_key) == 64
+
+class TestKeyStream(object):
+    def _assert_valid(self, pairs):
+        for secret, pub_key in pairs:
+            expected = SigningKey.from_secret_exponent(secret, curve=SECP256k1).get_verifying_key().to_string()
+            assert expected == pub_key
+
+    def test_random_start(self):
+        pairs = list(itertools.islice(key_stream(batch_size=8), 20))
+
+        self._assert_valid(pairs)
+        secrets = [secret for secret, _ in pairs]
+        assert secrets == list(range(secrets[0], secrets[0] + 20))
+
+    def test_start(self):
+        pairs = list(itertools.islice(key_stream(start=5, batch_size=8), 20))
+
+        self._assert_valid(pairs)
+        assert [secret for secret, _ in pairs] == list(range(5, 25))
+
+    def test_wraps_at_order(self):
+        pairs = list(itertools.islice(key_stream(start=SECP256k1.order - 3, batch_size=8), 6))
+
+        self._assert_valid(pairs)
+        assert [secret for secret, _ in pairs[:3]] == [SECP256k1.order - 3,
+                                                      SECP256k1.order - 2,
+                                                      SECP256k1.order - 1]
+
+    def test_invalid_start(self):
+        with pytest.raises(ValueError):
+            next(key_stream(start=0))
+
+        with pytest.raises(ValueError):
+            next(key_stream(start=SECP256k1.order))
+
+class TestBitcoinAccountDeriveRange(object):
+    def setup_method(self):
+        self.wallet = Wallet.from_master_secret(b'papyrus test seed', network=BitcoinTestNet).get_child(0, is_prime=True)
+
+    def test_public(self):
+        account = BitcoinAccount(pub_key=self.wallet.serialize_b58(private=False), network=BitcoinTestNet)
+
+        children = list(account.derive_range(3, 4))
+
+        assert len(children) == 4
+        for index, child in enumerate(children, 3):
+            expected = self.wallet.get_child(index)
+
+            assert not child.has_private_keys
+            assert child.address() == expected.to_address()
+            assert child.pub_key() == expected.serialize_b58(private=False)
+            assert child.derivation_path is None
+
+    def test_private(self):
+        account = BitcoinAccount(priv_key=self.wallet.serialize_b58(private=True),
+                                 network=BitcoinTestNet,
+                                 derivation_path="m/0'")
+
+        children = list(account.derive_range(0, 2))
+
+        for index, child in enumerate(children):
+            expected = self.wallet.get_child(index)
+
+            assert child.priv_key() == expected.export_to_wif().decode('ascii')
+            assert child.address() == expected.to_address()
+            assert child.derivation_path == "m/0'/{}".format(index)
+
+    def test_hardened_range(self):
+        account = BitcoinAccount(pub_key=self.wallet.serialize_b58(private=False), network=BitcoinTestNet)
+
+        with pytest.raises(ValueError):
+            list(account.derive_range(0x80000000 - 1, 2))
+
+        with pytest.raises(ValueError):
+            list(account.derive_range(-1, 2))
+
+class ECBackendTestCase(object):
+    def setup_method(self):
+        self.backend = account._ec_backend
+
+    def teardown_method(self):
+        account._ec_backend = self.backend
+
+class TestGetECBackend(ECBackendTestCase):
+    def test_openssl(self):
+        account._ec_backend = None
+
+        assert isinstance(get_ec_backend(), OpenSSLBackend)
+        assert get_ec_backend() is get_ec_backend()
+
+    @mock.patch('papyrus.account.OpenSSLBackend')
+    def test_fallback(self, mock_openssl_backend):
+        mock_openssl_backend.side_effect = PapyrusException('OpenSSL was built without secp256k1 support')
+        account._ec_backend = None
+
+        assert type(get_ec_backend()) is ECDSABackend
+
+    def test_set_ec_backend(self):
+        assert type(set_ec_backend('ecdsa')) is ECDSABackend
+        assert type(get_ec_backend()) is ECDSABackend
+
+        with pytest.raises(ValueError):
+            set_ec_backend('libsecp256k1')
+
+class TestECBackendsAgree(ECBackendTestCase):
+    # Differential test: keys and addresses must not depend on the backend
+    SECRETS = (1, 2, SECP256k1.order - 1) + tuple(range(0xdeadbeef, 0xdeadbeef + 1000, 97))
+
+    def _openssl_public_key(self, secret):
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+        key = ec.derive_private_key(secret, ec.SECP256K1())
+        return key.public_key().public_bytes(Encoding.X962, PublicFormat.UncompressedPoint)[1:]
+
+    def test_public_key(self):
+        for secret in self.SECRETS:
+            assert ECDSABackend().public_key(secret) == self._openssl_public_key(secret)
+
+    def test_generate(self):
+        for backend in (ECDSABackend(), OpenSSLBackend()):
+            for _ in range(5):
+                secret, pub_key = backend.generate()
+
+                assert 0 < secret < SECP256k1.order
+                assert pub_key == self._openssl_public_key(secret)
+                assert pub_key == SigningKey.from_secret_exponent(secret, curve=SECP256k1).get_verifying_key().to_string()
+
+    def test_generate_drbg(self):
+        for backend in (ECDSABackend(), OpenSSLBackend()):
+            drbg = HmacDRBG(entropy=lambda size: bytes(size))
+            expected = HmacDRBG(entropy=lambda size: bytes(size)).randrange(SECP256k1.order)
+
+            secret, pub_key = backend.generate(drbg)
+
+            assert secret == expected
+            assert pub_key == self._openssl_public_key(secret)
+
+    @mock.patch('papyrus.account.get_table')
+    def test_openssl_generate_drbg(self, mock_get_table):
+        # Fresh secrets never go through the table, which is not constant time
+        secret, pub_key = OpenSSLBackend().generate(HmacDRBG())
+
+        assert pub_key == self._openssl_public_key(secret)
+        assert not mock_get_table.called
+
+    def test_addresses(self):
+        for name in ('ecdsa', 'openssl'):
+            set_ec_backend(name)
+            accounts = [EthereumAccount.generate() for _ in range(5)]
+
+            set_ec_backend('ecdsa' if name == 'openssl' else 'openssl')
+            for generated in accounts:
+                loaded = EthereumAccount(priv_key=generated._priv_key)
+
+                assert loaded.address() == generated.address()
+
+    def test_bitcoin_addresses(self):
+        wallet = Wallet.from_master_secret(b'papyrus test seed', network=BitcoinTestNet).get_child(0, is_prime=True)
+
+        for name in ('ecdsa', 'openssl'):
+            set_ec_backend(name)
+            account = BitcoinAccount(priv_key=wallet.serialize_b58(private=True), network=BitcoinTestNet)
+
+            assert account.address() == wallet.to_address()
+            assert [child.address() for child in account.derive_range(0, 3)] == [wallet.get_child(i).to_address()
+                                                                                  for i in range(3)]
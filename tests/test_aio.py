@@ -0,0 +1,153 @@
+import time
+import mock
+import asyncio
+import pytest
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from bitmerchant.network import BitcoinTestNet
+
+from papyrus import aio
+from papyrus.aio import (AsyncPool,
+                         aderive,
+                         aencrypt,
+                         agenerate,
+                         get_pool,
+                         )
+from papyrus.account import BitcoinAccount, EthereumAccount
+from papyrus.derivation import derive
+from papyrus.encryption import KeyDecryptor, KeyEncryptor
+
+PASSPHRASE = 'test passphrase'
+XPUB = 'tpubD6NzVbkrYhZ4XgiXtGrdW5XDAPFCL9h7we1vwNCpn8tGbBcgfVYjXyhWo4E1xkh56hjod1RhGjxbaTLV3X4FyWuejifB9jusQ46QzG87VKp'
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadPoolTestCase(object):
+    def setup_method(self):
+        self.executor = ThreadPoolExecutor(max_workers=8)
+
+    def teardown_method(self):
+        self.executor.shutdown()
+
+class TestAsyncPool(ThreadPoolTestCase):
+    def test_max_pending(self):
+        pool = AsyncPool(max_pending=3, executor=self.executor)
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def job(value):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+
+            time.sleep(0.01)
+
+            with lock:
+                running[0] -= 1
+            return value
+
+        async def main():
+            return await asyncio.gather(*[pool.run(job, i) for i in range(12)])
+
+        assert run(main()) == list(range(12))
+        assert running[1] == 3
+
+    def test_defaults(self):
+        pool = AsyncPool(workers=3)
+
+        assert pool.max_pending == 6
+        assert pool._executor is None
+
+        for max_pending in (0, -1):
+            with pytest.raises(ValueError):
+                AsyncPool(max_pending=max_pending)
+
+    def test_shutdown(self):
+        with AsyncPool(workers=1) as pool:
+            executor = pool.executor
+            assert pool.executor is executor
+
+        assert pool._executor is None
+
+    def test_shutdown_shared_executor(self):
+        with AsyncPool(executor=self.executor) as pool:
+            pass
+
+        assert pool.executor is self.executor
+        assert run(pool.run(sum, [1, 2])) == 3
+
+    def test_loops(self):
+        pool = AsyncPool(executor=self.executor)
+
+        # Each loop gets its own semaphore
+        assert run(pool.run(sum, [1, 2])) == 3
+        assert run(pool.run(sum, [3, 4])) == 7
+
+class TestGetPool(object):
+    def setup_method(self):
+        self.pool = aio._pool
+        aio._pool = None
+
+    def teardown_method(self):
+        aio._pool = self.pool
+
+    def test_get_pool(self):
+        assert get_pool() is get_pool()
+        assert get_pool()._executor is None
+
+class TestCoroutines(ThreadPoolTestCase):
+    def setup_method(self):
+        super().setup_method()
+        self.pool = AsyncPool(executor=self.executor)
+
+    def test_agenerate(self):
+        account = run(agenerate(BitcoinAccount, testnet=True, pool=self.pool))
+
+        assert isinstance(account, BitcoinAccount)
+        assert account.network_name == 'testnet'
+        assert account._pub_key
+
+    def test_aencrypt(self):
+        encrypted = run(aencrypt('secret', PASSPHRASE, cost=10, pool=self.pool))
+
+        assert KeyDecryptor(PASSPHRASE).decrypt(encrypted) == b'secret'
+
+    def test_aencrypt_encryptor(self):
+        encryptor = KeyEncryptor(PASSPHRASE, cost=10)
+        pool = mock.MagicMock()
+
+        encrypted = run(aencrypt('secret', encryptor=encryptor, pool=pool))
+
+        assert KeyDecryptor(PASSPHRASE).decrypt(encrypted) == b'secret'
+        assert not pool.run.called
+
+    def test_aencrypt_no_passphrase(self):
+        with pytest.raises(ValueError):
+            run(aencrypt('secret', pool=self.pool))
+
+    def test_aderive(self):
+        account = run(aderive(XPUB, 'M/0/5', network=BitcoinTestNet, pool=self.pool))
+
+        assert account.address() == derive(XPUB, 'M/0/5', network=BitcoinTestNet).address()
+        assert account.derivation_path == 'M/0/5'
+        assert account._wallet is None
+
+class TestProcessPool(object):
+    def test_process_pool(self):
+        with AsyncPool(workers=1) as pool:
+            async def main():
+                return await asyncio.gather(agenerate(EthereumAccount, pool=pool),
+                                            aderive(XPUB, 'M/1', network=BitcoinTestNet, pool=pool))
+
+            ethereum, bitcoin = run(main())
+
+        assert ethereum.address() == EthereumAccount(priv_key=ethereum.priv_key()).address()
+        assert bitcoin.address() == derive(XPUB, 'M/1', network=BitcoinTestNet).address()
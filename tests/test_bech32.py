@@ -0,0 +1,58 @@
+import pytest
+
+from papyrus import bech32
+
+# Valid and invalid addresses from BIP173 and BIP350
+VALID = (('bc', 'BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4',
+          0, '751e76e8199196d454941c45d1b3a323f1433bd6'),
+         ('tb', 'tb1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3q0sl5k7',
+          0, '1863143c14c5166804bd19203356da136c985678cd4d27a1b8c6329604903262'),
+         ('bc', 'bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kt5nd6y',
+          1, '751e76e8199196d454941c45d1b3a323f1433bd6751e76e8199196d454941c45d1b3a323f1433bd6'),
+         ('bc', 'BC1SW50QGDZ25J', 16, '751e'),
+         ('bc', 'bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs', 2, '751e76e8199196d454941c45d1b3a323'),
+         ('bc', 'bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0',
+          1, '79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798'),
+         )
+
+INVALID = ('tc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq5zuyut',
+           # bech32 checksum on a version 1 program
+           'bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kemeawh',
+           # bech32m checksum on a version 0 program
+           'tb1q0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq24jc47',
+           'bc1p38j9r5y49hruaue7wxjce0updqjuyyx0kh56v8s25huc6995vvpql3jow4',
+           'BC130XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ7ZWS8R',
+           'bc1pw5dgrnzv',
+           'BC1QR508D6QEJXTDG4Y5R3ZARVARYV98GJ9P',
+           'tb1z0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqglt7rf',
+           'bc1gmk9yu',
+           'bc1qW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4',
+           )
+
+class TestBech32(object):
+    def test_encode(self):
+        for hrp, address, version, program in VALID:
+            assert bech32.encode(hrp, version, bytes.fromhex(program)) == address.lower()
+
+    def test_decode(self):
+        for hrp, address, version, program in VALID:
+            assert bech32.decode(hrp, address) == (version, bytes.fromhex(program))
+
+    def test_decode_invalid(self):
+        for address in INVALID:
+            with pytest.raises(ValueError):
+                bech32.decode('bc' if address.lower().startswith('bc') else 'tb', address)
+
+    def test_decode_wrong_network(self):
+        with pytest.raises(ValueError):
+            bech32.decode('tb', VALID[0][1])
+
+    def test_encode_invalid(self):
+        with pytest.raises(ValueError):
+            bech32.encode('bc', 17, bytes(20))
+
+        with pytest.raises(ValueError):
+            bech32.encode('bc', 0, bytes(21))
+
+        with pytest.raises(ValueError):
+            bech32.encode('bc', 1, bytes(41))
@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import mock
+import runpy
+
+from papyrus.account import EthereumAccount
+from papyrus.index import AddressIndex
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'papyrus')
+
+def papyrus(*args):
+    with mock.patch.object(sys, 'argv', ['papyrus'] + list(args)), \
+            mock.patch('getpass.getpass', return_value='test_passphrase'):
+        runpy.run_path(SCRIPT, run_name='__main__')
+
+class TestRecoverBatch(object):
+    def test_csv(self, tmpdir, capsys):
+        wallets = str(tmpdir.join('wallets.csv'))
+        recovered = str(tmpdir.join('recovered.jsonl'))
+
+        papyrus('generate-batch', 'ethereum', '3', '--output={}'.format(wallets), '--format=csv',
+                '--workers=1', '--kdf-cost=10')
+        papyrus('recover-batch', wallets, '--output={}'.format(recovered), '--workers=1')
+
+        with open(recovered) as f:
+            rows = [json.loads(line) for line in f]
+
+        assert [row['line'] for row in rows] == [2, 3, 4]
+        for row in rows:
+            assert row['error'] is None
+            assert EthereumAccount(priv_key=row['priv_key']).address() == row['address']
+
+        assert 'could not be decrypted' not in capsys.readouterr().err
+
+class TestPaper(object):
+    def test_csv(self, tmpdir, capsys):
+        wallets = str(tmpdir.join('wallets.csv'))
+        output = str(tmpdir.join('wallets.pdf'))
+
+        papyrus('generate-batch', 'ethereum', '3', '--output={}'.format(wallets), '--format=csv',
+                '--workers=1', '--kdf-cost=10')
+        papyrus('paper', wallets, '--output={}'.format(output), '--workers=1', '--per-page=2')
+
+        assert '2 pages written to {}'.format(output) in capsys.readouterr().out
+
+    def test_per_page(self, tmpdir, capsys):
+        wallets = str(tmpdir.join('wallets.csv'))
+        output = str(tmpdir.join('wallets.pdf'))
+
+        papyrus('generate-batch', 'ethereum', '1', '--output={}'.format(wallets), '--format=csv',
+                '--workers=1', '--kdf-cost=10')
+        papyrus('paper', wallets, '--output={}'.format(output), '--workers=1', '--per-page=100')
+
+        assert 'must be between 1 and' in capsys.readouterr().out
+        assert not tmpdir.join('wallets.pdf').exists()
+
+class TestGenerateBatch(object):
+    def test_index(self, tmpdir):
+        wallets = str(tmpdir.join('wallets.jsonl'))
+        index_file = str(tmpdir.join('addresses.idx'))
+
+        for _ in range(2):
+            papyrus('generate-batch', 'ethereum', '3', '--output={}'.format(wallets), '--format=jsonl',
+                    '--workers=1', '--kdf-cost=10', '--index={}'.format(index_file))
+
+        with open(wallets) as f:
+            addresses = [json.loads(line)['address'] for line in f]
+
+        with AddressIndex(index_file) as index:
+            assert len(index) == 6
+            assert all(address in index for address in addresses)
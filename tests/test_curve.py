@@ -0,0 +1,168 @@
+import os
+import mock
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from ecdsa import SECP256k1
+
+from papyrus import curve
+from papyrus.curve import (HEADER,
+                           ORDER,
+                           TABLE_CACHE_VARIABLE,
+                           FixedBaseTable,
+                           get_table,
+                           inverse,
+                           load_table,
+                           to_affine,
+                           )
+from papyrus.exceptions import PapyrusException
+
+SECRETS = ((1, 2, 255, 256, 257, (1 << 248) + 1, ORDER - 2, ORDER - 1) +
+           tuple(range(0xdeadbeef, 0xdeadbeef + 1000, 97)) +
+           tuple(ORDER // value for value in (2, 3, 7, 11, 1000003)))
+
+def expected(point):
+    return point.x().to_bytes(32, 'big') + point.y().to_bytes(32, 'big')
+
+@pytest.fixture(scope='module')
+def table():
+    return FixedBaseTable.build()
+
+class TestFixedBaseTable(object):
+    def test_multiply(self, table):
+        for secret in SECRETS:
+            assert table.multiply(secret) == expected(SECP256k1.generator * secret)
+
+    def test_multiply_many(self, table):
+        assert table.multiply_many(SECRETS) == [expected(SECP256k1.generator * secret) for secret in SECRETS]
+        assert table.multiply_many([]) == []
+
+    def test_multiply_offset(self, table):
+        offset = SECP256k1.generator * 0xc0ffee
+
+        for secret in SECRETS[:-5]:
+            assert (table.multiply(secret, offset=(offset.x(), offset.y())) ==
+                    expected(SECP256k1.generator * secret + offset))
+
+    def test_multiply_offset_doubling(self, table):
+        # The offset equals the partial sum, which the addition formula
+        # cannot handle
+        point = SECP256k1.generator * 5
+
+        assert table.multiply(5, offset=(point.x(), point.y())) == expected(SECP256k1.generator * 10)
+
+    def test_invalid_secret(self, table):
+        for secret in (0, -1, ORDER, ORDER + 1):
+            with pytest.raises(ValueError):
+                table.multiply(secret)
+
+    def test_save_load(self, table, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+        table.save(filename)
+
+        loaded = FixedBaseTable.load(filename)
+
+        assert loaded.multiply(0xdeadbeef) == table.multiply(0xdeadbeef)
+        assert os.listdir(str(tmpdir)) == ['secp256k1.table']
+
+    def test_save_concurrently(self, table, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+
+        # Every writer gets its own temporary file
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(table.save, [filename] * 8))
+
+        assert FixedBaseTable.load(filename).multiply(3) == table.multiply(3)
+        assert os.listdir(str(tmpdir)) == ['secp256k1.table']
+
+    def test_save_failure(self, table, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+
+        with mock.patch('os.replace', side_effect=OSError):
+            with pytest.raises(OSError):
+                table.save(filename)
+
+        assert os.listdir(str(tmpdir)) == []
+
+    def test_load_corrupt(self, table, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+        table.save(filename)
+
+        with open(filename, 'r+b') as f:
+            f.seek(HEADER.size + 100)
+            f.write(b'\xff')
+
+        with pytest.raises(PapyrusException):
+            FixedBaseTable.load(filename)
+
+    def test_load_truncated(self, table, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+        table.save(filename)
+
+        with open(filename, 'r+b') as f:
+            f.truncate(HEADER.size + 64)
+
+        with pytest.raises(PapyrusException):
+            FixedBaseTable.load(filename)
+
+    def test_load_invalid(self, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+        with open(filename, 'wb') as f:
+            f.write(b'not an EC table')
+
+        with pytest.raises(PapyrusException):
+            FixedBaseTable.load(filename)
+
+class TestLoadTable(object):
+    @mock.patch('papyrus.curve.FixedBaseTable.build')
+    def test_load(self, mock_build, table, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+        table.save(filename)
+
+        assert load_table(filename).multiply(3) == table.multiply(3)
+        assert not mock_build.called
+
+    def test_rebuild(self, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+        with open(filename, 'wb') as f:
+            f.write(b'not an EC table')
+
+        assert load_table(filename).multiply(3) == expected(SECP256k1.generator * 3)
+        assert FixedBaseTable.load(filename).multiply(3) == expected(SECP256k1.generator * 3)
+
+    def test_read_only(self, tmpdir):
+        filename = str(tmpdir.join('missing', 'secp256k1.table'))
+
+        assert load_table(filename).multiply(3) == expected(SECP256k1.generator * 3)
+        assert not os.path.exists(filename)
+
+class TestGetTable(object):
+    def setup_method(self):
+        self.table = curve._table
+        curve._table = None
+
+    def teardown_method(self):
+        curve._table = self.table
+
+    @mock.patch.dict('os.environ', clear=True)
+    def test_build(self):
+        assert get_table() is get_table()
+
+    def test_cache_file(self, tmpdir):
+        filename = str(tmpdir.join('secp256k1.table'))
+
+        with mock.patch.dict('os.environ', {TABLE_CACHE_VARIABLE: filename}):
+            assert get_table().multiply(3) == expected(SECP256k1.generator * 3)
+
+        assert os.path.exists(filename)
+
+class TestArithmetic(object):
+    def test_inverse(self):
+        for value in (1, 2, ORDER, curve.P - 1):
+            assert value * inverse(value) % curve.P == 1
+
+    def test_to_affine(self):
+        point = SECP256k1.generator * 7
+        jacobian = [(point.x() * z * z % curve.P, point.y() * z * z * z % curve.P, z) for z in (1, 2, 12345)]
+
+        assert to_affine(jacobian) == [(point.x(), point.y())] * 3
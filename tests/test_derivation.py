@@ -0,0 +1,110 @@
+import mock
+import pytest
+
+from bitmerchant.network import BitcoinTestNet
+from bitmerchant.wallet import Wallet
+
+from papyrus.derivation import (DerivationCache,
+                                derive,
+                                parse_path,
+                                )
+
+class TestParsePath(object):
+    def test_absolute(self):
+        assert parse_path("m/44'/0'/1/5") == ((44, True), (0, True), (1, False), (5, False))
+
+    def test_relative(self):
+        assert parse_path('0/12') == ((0, False), (12, False))
+
+    def test_empty(self):
+        assert parse_path('M') == ()
+        assert parse_path('') == ()
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_path('m/a/1')
+
+        with pytest.raises(ValueError):
+            parse_path('m/2147483648')
+
+class TestDerivationCache(object):
+    def setup_method(self):
+        self.master = Wallet.from_master_secret(b'papyrus test seed', network=BitcoinTestNet)
+        self.xprv = self.master.serialize_b58(private=True)
+        self.xpub = self.master.get_child(0, is_prime=True).serialize_b58(private=False)
+
+        self.cache = DerivationCache(maxsize=16)
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError):
+            DerivationCache(maxsize=0)
+
+    def test_derive_private(self):
+        account = self.cache.derive(self.xprv, "m/44'/1'/0'/0/3", network=BitcoinTestNet)
+
+        expected = self.master.get_child_for_path("m/44'/1'/0'/0/3")
+
+        assert account.priv_key() == expected.export_to_wif().decode('ascii')
+        assert account.address() == expected.to_address()
+        assert account.derivation_path == "m/44'/1'/0'/0/3"
+
+    def test_derive_public(self):
+        account = self.cache.derive(self.xpub, 'M/1/7', network=BitcoinTestNet)
+
+        expected = self.master.get_child(0, is_prime=True).get_child(1).get_child(7)
+
+        assert not account.has_private_keys
+        assert account.address() == expected.to_address()
+
+    def test_bypasses_bitmerchant_cache(self):
+        Wallet.get_child.cache_clear()
+
+        self.cache.derive(self.xprv, "m/44'/1'/0'/0/3", network=BitcoinTestNet)
+        self.cache.derive(self.xpub, 'M/1/7', network=BitcoinTestNet)
+
+        # DerivationCache is the only cache holding the nodes
+        assert Wallet.get_child.cache_info().currsize == 0
+
+    def test_reuses_parent(self):
+        for index in range(5):
+            self.cache.derive(self.xpub, 'M/1/{}'.format(index), network=BitcoinTestNet)
+
+        assert self.cache.misses == 1
+        assert self.cache.hits == 4
+        # The root and the M/1 branch, leaves are not cached
+        assert len(self.cache) == 2
+
+    def test_lru_eviction(self):
+        cache = DerivationCache(maxsize=2)
+
+        cache.node(self.xpub, 'M/1', network=BitcoinTestNet)
+        cache.node(self.xpub, 'M/2', network=BitcoinTestNet)
+
+        # The root was used to derive M/2 so M/1 is the least recently used
+        assert len(cache) == 2
+        assert cache._get((self.xpub, BitcoinTestNet, ((1, False),))) is None
+        assert cache._get((self.xpub, BitcoinTestNet, ())) is not None
+        assert cache._get((self.xpub, BitcoinTestNet, ((2, False),))) is not None
+
+    def test_clear(self):
+        self.cache.node(self.xpub, 'M/1', network=BitcoinTestNet)
+        self.cache.clear()
+
+        assert len(self.cache) == 0
+        assert self.cache.misses == 0
+
+class TestDerive(object):
+    def test_default_cache(self):
+        with mock.patch('papyrus.derivation.default_cache') as mock_cache:
+            actual = derive('test_key', 'M/0')
+
+        assert actual == mock_cache.derive.return_value
+        mock_cache.derive.assert_called_once_with('test_key', 'M/0', network=mock.ANY)
+
+    def test_empty_cache(self):
+        cache = mock.MagicMock()
+        cache.__len__.return_value = 0
+
+        derive('test_key', 'M/0', cache=cache)
+
+        cache.derive.assert_called_once_with('test_key', 'M/0', network=mock.ANY)
@@ -0,0 +1,224 @@
+import mock
+import pytest
+
+from papyrus import encryption
+from papyrus.exceptions import PapyrusException
+from papyrus.encryption import (DecryptResult,
+                                KeyDecryptor,
+                                KeyEncryptor,
+                                MIN_COST,
+                                PBKDF2_SHA256,
+                                SCRYPT,
+                                _derive_key,
+                                calibrate,
+                                decrypt_many,
+                                kdf_params,
+                                )
+
+class TestKDFParams(object):
+    def test_scrypt(self):
+        assert kdf_params(SCRYPT, 12) == (('n', 4096), ('r', 8), ('p', 1))
+
+    def test_pbkdf2(self):
+        assert kdf_params(PBKDF2_SHA256, 12) == (('i', 4096),)
+
+    def test_default_cost(self):
+        assert kdf_params(SCRYPT) == kdf_params(SCRYPT, 14)
+
+    def test_invalid_kdf(self):
+        with pytest.raises(PapyrusException):
+            kdf_params('md5')
+
+    @pytest.mark.parametrize('cost', [MIN_COST - 1, 21])
+    def test_invalid_cost(self, cost):
+        with pytest.raises(PapyrusException):
+            kdf_params(SCRYPT, cost)
+
+class TestKeyEncryptor(object):
+    # Keep the tests fast, the cost of the derivation is irrelevant here
+    def setup_method(self):
+        self.encryptor = KeyEncryptor('test_passphrase', kdf=PBKDF2_SHA256, cost=MIN_COST)
+
+    def test_round_trip(self):
+        encrypted_key = self.encryptor.encrypt('test_priv_key')
+
+        assert encrypted_key.startswith(b'$papyrus$2$pbkdf2-sha256$i=1024$')
+        assert KeyDecryptor('test_passphrase').decrypt(encrypted_key) == b'test_priv_key'
+
+    def test_scrypt_round_trip(self):
+        encrypted_key = KeyEncryptor('test_passphrase', kdf=SCRYPT, cost=MIN_COST).encrypt(b'test_priv_key')
+
+        assert encrypted_key.startswith(b'$papyrus$2$scrypt$n=1024,r=8,p=1$')
+        assert KeyDecryptor('test_passphrase').decrypt(encrypted_key) == b'test_priv_key'
+
+    def test_unique_per_record(self):
+        assert self.encryptor.encrypt(b'test_priv_key') != self.encryptor.encrypt(b'test_priv_key')
+
+    def test_derives_once(self):
+        with mock.patch('papyrus.encryption._derive_key', wraps=_derive_key) as mock_derive_key:
+            encryptor = KeyEncryptor('test_passphrase', kdf=PBKDF2_SHA256, cost=MIN_COST)
+
+            for _ in range(3):
+                encryptor.encrypt(b'test_priv_key')
+
+        mock_derive_key.assert_called_once_with('test_passphrase',
+                                                encryptor.salt,
+                                                PBKDF2_SHA256,
+                                                (('i', 1024),))
+
+    def test_unique_salt(self):
+        assert KeyEncryptor('test_passphrase', kdf=PBKDF2_SHA256, cost=MIN_COST).salt != self.encryptor.salt
+
+class TestKeyDecryptor(object):
+    def setup_method(self):
+        self.encryptor = KeyEncryptor('test_passphrase', kdf=PBKDF2_SHA256, cost=MIN_COST)
+        self.decryptor = KeyDecryptor('test_passphrase')
+
+    def test_caches_derived_keys(self):
+        encrypted_keys = [self.encryptor.encrypt(b'a'), self.encryptor.encrypt(b'b')]
+
+        with mock.patch('papyrus.encryption._derive_key', wraps=_derive_key) as mock_derive_key:
+            actual = [self.decryptor.decrypt(encrypted_key) for encrypted_key in encrypted_keys]
+
+        assert actual == [b'a', b'b']
+        assert mock_derive_key.call_count == 1
+
+    def test_str_input(self):
+        encrypted_key = self.encryptor.encrypt(b'a').decode('utf-8')
+
+        assert self.decryptor.decrypt(encrypted_key + '\n') == b'a'
+
+    def test_invalid_passphrase(self):
+        encrypted_key = self.encryptor.encrypt(b'a')
+
+        with pytest.raises(PapyrusException):
+            KeyDecryptor('other_passphrase').decrypt(encrypted_key)
+
+    @pytest.mark.parametrize('encrypted_key', [b'$papyrus$2$pbkdf2-sha256$abc',
+                                               b'$papyrus$2$pbkdf2-sha256$i$c2FsdA==$token',
+                                               b'$papyrus$2$pbkdf2-sha256$x=1$c2FsdA==$token',
+                                               b'$papyrus$2$scrypt$n=1000,r=8,p=1$c2FsdA==$token',
+                                               ])
+    def test_malformed(self, encrypted_key):
+        with pytest.raises(PapyrusException):
+            self.decryptor.decrypt(encrypted_key)
+
+    @pytest.mark.parametrize('params', [b'n=2097152,r=8,p=1',
+                                        b'n=16384,r=1024,p=1',
+                                        b'n=16384,r=8,p=64',
+                                        b'n=16384,r=8',
+                                        b'n=16384,r=8,p=1,i=1',
+                                        b'n=16383,r=8,p=1',
+                                        ])
+    def test_scrypt_limits(self, params):
+        with mock.patch('papyrus.encryption._derive_key') as mock_derive_key:
+            with pytest.raises(PapyrusException):
+                self.decryptor.decrypt(b'$papyrus$2$scrypt$' + params + b'$c2FsdA==$token')
+
+        assert not mock_derive_key.called
+
+    @pytest.mark.parametrize('params', [b'i=2147483648', b'i=4294967295', b'i=1'])
+    def test_pbkdf2_limits(self, params):
+        with mock.patch('papyrus.encryption._derive_key') as mock_derive_key:
+            with pytest.raises(PapyrusException):
+                self.decryptor.decrypt(b'$papyrus$2$pbkdf2-sha256$' + params + b'$c2FsdA==$token')
+
+        assert not mock_derive_key.called
+
+    def test_unsupported_kdf(self):
+        with pytest.raises(PapyrusException):
+            self.decryptor.decrypt(b'$papyrus$2$md5$i=1$c2FsdA==$token')
+
+    def test_unsupported_version(self):
+        encrypted_key = self.encryptor.encrypt(b'a').replace(b'$papyrus$2$', b'$papyrus$9$')
+
+        with pytest.raises(PapyrusException):
+            self.decryptor.decrypt(encrypted_key)
+
+    @mock.patch('lockbox.decrypt')
+    def test_legacy(self, mock_decrypt):
+        actual = self.decryptor.decrypt(b'legacy_key')
+
+        assert actual == mock_decrypt.return_value
+        mock_decrypt.assert_called_once_with('test_passphrase', b'legacy_key')
+
+class TestCalibrate(object):
+    @mock.patch('papyrus.encryption.time_derivation')
+    def test_calibrate(self, mock_time_derivation):
+        mock_time_derivation.side_effect = lambda kdf, cost: 0.001 * 2 ** (cost - MIN_COST)
+
+        cost, timings = calibrate(SCRYPT, target_ms=5)
+
+        assert cost == MIN_COST + 2
+        assert timings == [(MIN_COST, 0.001),
+                           (MIN_COST + 1, 0.002),
+                           (MIN_COST + 2, 0.004),
+                           (MIN_COST + 3, 0.008)]
+
+    @mock.patch('papyrus.encryption.time_derivation')
+    def test_target_below_minimum(self, mock_time_derivation):
+        mock_time_derivation.return_value = 1
+
+        cost, timings = calibrate(SCRYPT, target_ms=5)
+
+        assert cost == MIN_COST
+        assert timings == [(MIN_COST, 1)]
+
+class TestDecryptMany(object):
+    def setup_method(self):
+        self.decrypt_patcher = mock.patch('lockbox.decrypt')
+        self.mock_decrypt = self.decrypt_patcher.start()
+
+    def teardown_method(self):
+        self.decrypt_patcher.stop()
+
+    def test_decrypt(self):
+        self.mock_decrypt.side_effect = lambda passphrase, key: key.upper()
+
+        actual = decrypt_many('test_passphrase', [b'a', b'b'], workers=1)
+
+        assert actual == [DecryptResult(priv_key='A', error=None),
+                          DecryptResult(priv_key='B', error=None)]
+        self.mock_decrypt.assert_has_calls([mock.call('test_passphrase', b'a'),
+                                            mock.call('test_passphrase', b'b')])
+
+    def test_failures_do_not_abort(self):
+        def decrypt(passphrase, key):
+            if key == b'bad':
+                raise ValueError('Invalid passphrase')
+            return key
+
+        self.mock_decrypt.side_effect = decrypt
+
+        actual = decrypt_many('test_passphrase', [b'bad', None, b'good'], workers=1)
+
+        assert actual == [DecryptResult(priv_key=None, error='Invalid passphrase'),
+                          DecryptResult(priv_key=None, error='No encrypted key found'),
+                          DecryptResult(priv_key='good', error=None)]
+
+    def test_envelopes(self):
+        encryptor = KeyEncryptor('test_passphrase', cost=MIN_COST)
+        encrypted_keys = [encryptor.encrypt(b'a'), encryptor.encrypt(b'b'), None]
+
+        with mock.patch('papyrus.encryption._derive_key', wraps=_derive_key) as mock_derive_key:
+            actual = decrypt_many('test_passphrase', encrypted_keys, workers=1)
+
+        assert actual == [DecryptResult(priv_key='a', error=None),
+                          DecryptResult(priv_key='b', error=None),
+                          DecryptResult(priv_key=None, error='No encrypted key found')]
+        assert mock_derive_key.call_count == 1
+        assert not self.mock_decrypt.called
+
+    def test_wrong_passphrase(self):
+        encrypted_key = KeyEncryptor('test_passphrase', cost=MIN_COST).encrypt(b'a')
+
+        actual = decrypt_many('other_passphrase', [encrypted_key], workers=1)
+
+        assert actual == [DecryptResult(priv_key=None, error='Invalid passphrase')]
+
+    def test_passphrase_not_kept(self):
+        encrypted_key = KeyEncryptor('test_passphrase', cost=MIN_COST).encrypt(b'a')
+
+        decrypt_many('test_passphrase', [encrypted_key], workers=1)
+
+        assert encryption._decryptors == {}
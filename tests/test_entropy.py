@@ -0,0 +1,134 @@
+import time
+import pickle
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+
+from ecdsa import SECP256k1
+from ecdsa.rfc6979 import bits2octets, generate_k
+from ecdsa.util import number_to_string
+
+from papyrus import entropy
+from papyrus.entropy import REQUEST_SIZE, HmacDRBG
+
+def fixed_entropy(*values):
+    # Returns each of values in turn, whatever size is asked for
+    values = iter(values)
+    return lambda size: next(values)
+
+def zeros(size):
+    return bytes(size)
+
+class TestHmacDRBG(object):
+    def test_rfc6979(self):
+        # RFC 6979 nonces are the first output of an HMAC_DRBG seeded with the
+        # private key and the message hash
+        order = SECP256k1.order
+        secret = 0xc9afa9d845ba75166b5c215767b1d6934e50c3db36e89b127b8a622b120f6721
+        digest = sha256(b'sample').digest()
+
+        drbg = HmacDRBG(entropy=fixed_entropy(number_to_string(secret, order), bits2octets(digest, order)))
+
+        assert int.from_bytes(drbg.generate(32), 'big') == generate_k(order, secret, sha256, digest)
+
+    def test_deterministic(self):
+        assert HmacDRBG(entropy=zeros).read(100) == HmacDRBG(entropy=zeros).read(100)
+        assert HmacDRBG().read(32) != HmacDRBG().read(32)
+
+    def test_personalization(self):
+        outputs = set(HmacDRBG(personalization=personalization, entropy=zeros).read(32)
+                      for personalization in (None, b'dice rolls', 'dice rolls!', 1234))
+
+        assert len(outputs) == 4
+        assert (HmacDRBG(personalization='1234', entropy=zeros).read(32) ==
+                HmacDRBG(personalization=1234, entropy=zeros).read(32))
+
+    def test_read(self):
+        expected = HmacDRBG(entropy=zeros)
+        drbg = HmacDRBG(entropy=zeros)
+
+        first = drbg.read(10)
+        second = drbg.read(REQUEST_SIZE)
+
+        assert first + second == expected.generate(REQUEST_SIZE) + expected.generate(REQUEST_SIZE)[:10]
+        assert drbg.read(0) == b''
+
+    def test_threads(self):
+        class SlowBytes(bytes):
+            # Hands the GIL over in the middle of every read
+            def __getitem__(self, key):
+                time.sleep(0.0001)
+                return bytes.__getitem__(self, key)
+
+        expected = HmacDRBG(entropy=zeros)
+        drbg = HmacDRBG(entropy=zeros)
+        generate = drbg.generate
+        drbg.generate = lambda size: SlowBytes(generate(size))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            chunks = list(executor.map(lambda _: drbg.read(7), range(1000)))
+
+        # Threads get the chunks in any order but never share bytes
+        assert sorted(chunks) == sorted(expected.read(7) for _ in range(1000))
+
+    def test_generate_limit(self):
+        with pytest.raises(ValueError):
+            HmacDRBG().generate((1 << 16) + 1)
+
+    def test_reseed_interval(self):
+        calls = []
+
+        def counting_entropy(size):
+            calls.append(size)
+            return bytes(size)
+
+        drbg = HmacDRBG(reseed_interval=2, entropy=counting_entropy)
+        assert calls == [32, 16]
+
+        for _ in range(5):
+            drbg.generate(32)
+
+        assert calls == [32, 16, 32, 32]
+
+        with pytest.raises(ValueError):
+            HmacDRBG(reseed_interval=0)
+
+    def test_reseed(self):
+        drbg = HmacDRBG(entropy=zeros)
+        expected = HmacDRBG(entropy=zeros)
+
+        drbg.read(1)
+        drbg.reseed()
+        expected.generate(REQUEST_SIZE)
+
+        # Buffered output from before the reseed is never handed out
+        assert drbg.read(32) != expected.generate(32)
+
+    def test_randrange(self):
+        drbg = HmacDRBG()
+
+        values = set(drbg.randrange(5) for _ in range(200))
+        assert values == {1, 2, 3, 4}
+
+        for _ in range(10):
+            assert 0 < drbg.randrange(SECP256k1.order) < SECP256k1.order
+
+    def test_pickle(self):
+        drbg = HmacDRBG(personalization=b'dice rolls', reseed_interval=10)
+        copy = pickle.loads(pickle.dumps(drbg))
+
+        assert copy.reseed_interval == 10
+        assert copy._personalization == b'dice rolls'
+        assert copy._key != drbg._key
+        assert copy.read(32) != drbg.read(32)
+
+    def test_reseed_after_fork(self):
+        drbg = HmacDRBG()
+        key = drbg._key
+        drbg.read(1)
+
+        entropy._reseed_after_fork()
+
+        assert drbg._key != key
+        assert drbg._buffer == b''
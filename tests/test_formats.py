@@ -0,0 +1,105 @@
+import io
+import json
+import pytest
+
+from papyrus.account import AccountRecord, PapyrusException
+from papyrus.formats import (CSVWriter,
+                             JSONLWriter,
+                             TextWriter,
+                             get_writer,
+                             read_encrypted_keys,
+                             )
+
+class TestWriters(object):
+    def setup_method(self):
+        self.stream = io.StringIO()
+        self.record = AccountRecord(account_type='bitcoin',
+                                    network='testnet',
+                                    address='test_address',
+                                    pub_key='test_pub_key',
+                                    priv_key='test_priv_key',
+                                    derivation_path="m/0'")
+
+    def test_text(self):
+        writer = TextWriter(self.stream)
+        writer.write(self.record, b'test_encrypted_key')
+
+        assert self.stream.getvalue() == 'test_address\ttest_encrypted_key\n'
+
+    def test_text_without_encrypted_key(self):
+        writer = TextWriter(self.stream)
+        writer.write(self.record, None)
+
+        assert self.stream.getvalue() == 'test_address\n'
+
+    def test_jsonl(self):
+        writer = JSONLWriter(self.stream)
+        writer.write(self.record, b'test_encrypted_key')
+        writer.write(self.record, 'other_encrypted_key')
+
+        lines = self.stream.getvalue().splitlines()
+
+        assert len(lines) == 2
+        assert json.loads(lines[0]) == {'type': 'bitcoin',
+                                        'network': 'testnet',
+                                        'address': 'test_address',
+                                        'encrypted_key': 'test_encrypted_key',
+                                        'derivation_path': "m/0'",
+                                        }
+        assert json.loads(lines[1])['encrypted_key'] == 'other_encrypted_key'
+
+    def test_csv(self):
+        writer = CSVWriter(self.stream)
+        writer.write(self.record, b'test_encrypted_key')
+
+        assert self.stream.getvalue() == ('type,network,address,encrypted_key,derivation_path\n'
+                                          "bitcoin,testnet,test_address,test_encrypted_key,m/0'\n")
+
+    def test_private_key_is_never_written(self):
+        for writer_cls in (TextWriter, JSONLWriter, CSVWriter):
+            writer_cls(self.stream).write(self.record, b'test_encrypted_key')
+
+        assert 'test_priv_key' not in self.stream.getvalue()
+
+class TestGetWriter(object):
+    def test_valid(self):
+        assert isinstance(get_writer('jsonl', io.StringIO()), JSONLWriter)
+
+    def test_invalid(self):
+        with pytest.raises(PapyrusException):
+            get_writer('xml', io.StringIO())
+
+class TestReadEncryptedKeys(object):
+    def test_formats(self):
+        stream = io.StringIO('{"address": "addr1", "encrypted_key": "key1"}\n'
+                             '\n'
+                             'addr2\tkey2\n'
+                             'key3\n'
+                             '{not json\n')
+
+        assert list(read_encrypted_keys(stream)) == [(1, 'addr1', 'key1'),
+                                                     (3, 'addr2', 'key2'),
+                                                     (4, None, 'key3'),
+                                                     (5, None, None),
+                                                     ]
+
+    def test_csv(self):
+        stream = io.StringIO()
+        writer = CSVWriter(stream)
+        for address, encrypted_key in (('addr1', 'key,1'), ('addr2', None)):
+            writer.write(AccountRecord(account_type='ethereum',
+                                       network='mainnet',
+                                       address=address,
+                                       pub_key=None,
+                                       priv_key=None,
+                                       derivation_path=None),
+                         encrypted_key)
+        stream.write('\n')
+        stream.seek(0)
+
+        assert list(read_encrypted_keys(stream)) == [(2, 'addr1', 'key,1'),
+                                                     (3, 'addr2', None),
+                                                     ]
+
+    def test_empty(self):
+        assert list(read_encrypted_keys(io.StringIO())) == []
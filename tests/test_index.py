@@ -0,0 +1,184 @@
+import os
+import mock
+import pytest
+
+from concurrent.futures import ProcessPoolExecutor
+
+from papyrus.exceptions import PapyrusException
+from papyrus.index import (HEADER,
+                           AddressCollector,
+                           AddressIndex,
+                           address_bytes,
+                           merge_index,
+                           )
+
+ETHEREUM_ADDRESS = '0x' + '11' * 20
+BITCOIN_ADDRESS = '1BoatSLRHtKNngkdXEeobR76b53LETtpyT'
+
+def records(*values):
+    return [bytes([value]) * 20 for value in values]
+
+def merge_batches(filename, worker):
+    # Five merges of distinct addresses, run by each of several processes
+    return sum(merge_index(filename, [(worker << 32 | batch << 16 | i).to_bytes(20, 'big')
+                                      for i in range(1, 1001)])
+               for batch in range(5))
+
+class TestAddressBytes(object):
+    def test_ethereum(self):
+        assert address_bytes(ETHEREUM_ADDRESS) == b'\x11' * 20
+
+    def test_bitcoin(self):
+        assert len(address_bytes(BITCOIN_ADDRESS)) == 20
+
+    def test_bytes(self):
+        assert address_bytes(bytearray(20)) == bytes(20)
+
+    def test_invalid(self):
+        for address in ('0x1234', 'nonsense', BITCOIN_ADDRESS[:-1] + 'U', bytes(19)):
+            with pytest.raises(ValueError):
+                address_bytes(address)
+
+class TestMergeIndex(object):
+    def test_create(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+
+        assert merge_index(filename, records(3, 1, 2, 1)) == 3
+
+        with AddressIndex(filename) as index:
+            assert list(index) == records(1, 2, 3)
+
+    def test_merge(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(2, 4, 6))
+
+        assert merge_index(filename, records(1, 4, 5, 7)) == 3
+
+        with AddressIndex(filename) as index:
+            assert list(index) == records(1, 2, 4, 5, 6, 7)
+        assert sorted(os.listdir(str(tmpdir))) == ['addresses.idx', 'addresses.idx.lock']
+
+    @mock.patch('papyrus.index.COPY_SIZE', 40)
+    def test_merge_in_slices(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(*range(0, 20, 2)))
+
+        merge_index(filename, records(9))
+
+        with AddressIndex(filename) as index:
+            assert list(index) == records(*sorted(list(range(0, 20, 2)) + [9]))
+
+    def test_merge_into_empty(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, [])
+
+        assert merge_index(filename, records(1)) == 1
+
+    def test_invalid_address(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(1))
+
+        with pytest.raises(ValueError):
+            merge_index(filename, records(2) + ['0x1234'])
+
+        with AddressIndex(filename) as index:
+            assert list(index) == records(1)
+
+    def test_failed_merge_keeps_index(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(1, 3))
+
+        with mock.patch('papyrus.index.AddressIndex._copy', side_effect=OSError):
+            with pytest.raises(OSError):
+                merge_index(filename, records(2))
+
+        with AddressIndex(filename) as index:
+            assert list(index) == records(1, 3)
+        assert sorted(os.listdir(str(tmpdir))) == ['addresses.idx', 'addresses.idx.lock']
+
+    def test_concurrent_merges(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(0))
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            added = list(executor.map(merge_batches, [filename] * 2, [0, 1]))
+
+        assert added == [5000, 5000]
+        with AddressIndex(filename) as index:
+            assert len(index) == 10001
+        assert sorted(os.listdir(str(tmpdir))) == ['addresses.idx', 'addresses.idx.lock']
+
+class TestAddressIndex(object):
+    def setup_method(self):
+        self.addresses = [ETHEREUM_ADDRESS, BITCOIN_ADDRESS] + records(*range(3, 200, 3))
+
+    def test_contains(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, self.addresses)
+
+        with AddressIndex(filename) as index:
+            assert len(index) == len(self.addresses)
+
+            for address in self.addresses:
+                assert address in index
+
+            assert '0x' + '00' * 20 not in index
+            assert records(1)[0] not in index
+            assert records(255)[0] not in index
+
+    def test_empty(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, [])
+
+        with AddressIndex(filename) as index:
+            assert len(index) == 0
+            assert ETHEREUM_ADDRESS not in index
+
+    def test_not_an_index(self, tmpdir):
+        filename = tmpdir.join('addresses.idx')
+        filename.write(b'not an index', mode='wb')
+
+        with pytest.raises(PapyrusException):
+            AddressIndex(str(filename))
+
+    def test_truncated(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(1, 2))
+
+        with open(filename, 'r+b') as f:
+            f.truncate(HEADER.size + 30)
+
+        with pytest.raises(PapyrusException):
+            AddressIndex(filename)
+
+class TestAddressCollector(object):
+    def test_runs(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+        merge_index(filename, records(2, 9))
+
+        with AddressCollector(run_size=4) as collector:
+            for address in records(7, 1, 9, 4, 1, 8, 7, 3) + [ETHEREUM_ADDRESS]:
+                collector.add(address)
+
+            # Two full runs were spilled, the rest is still in memory
+            assert len(collector._runs) == 2
+            assert list(collector.sorted_records()) == records(1, 3, 4, 7, 8, 9, 0x11)
+
+            assert collector.merge_into(filename) == 6
+
+        with AddressIndex(filename) as index:
+            assert list(index) == records(1, 2, 3, 4, 7, 8, 9, 0x11)
+
+    def test_empty(self, tmpdir):
+        filename = str(tmpdir.join('addresses.idx'))
+
+        with AddressCollector() as collector:
+            assert collector.merge_into(filename) == 0
+
+        with AddressIndex(filename) as index:
+            assert len(index) == 0
+
+    def test_invalid_address(self):
+        with AddressCollector() as collector:
+            with pytest.raises(ValueError):
+                collector.add('0x1234')
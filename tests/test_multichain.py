@@ -0,0 +1,107 @@
+import pytest
+
+from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
+from ecdsa import SECP256k1, SigningKey
+
+from papyrus import bech32
+from papyrus.account import EthereumAccount
+from papyrus.multichain import MultiChainAccount
+
+# Well known addresses of the secret 1
+SECRET = (1).to_bytes(32, 'big')
+ETHEREUM_ADDRESS = '0x7e5f4552091a69125d5dfcb7b8c2659029395bdf'
+P2PKH_ADDRESS = '1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH'
+P2SH_P2WPKH_ADDRESS = '3JvL6Ymt8MVWiCNHC7oWU6nLeHNJKLZGLN'
+P2WPKH_ADDRESS = 'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4'
+WIF = 'KwDiBf89QgGbjEhKnhXJuH7LrciVrZi3qYjgd9M7rFU73sVHnoWn'
+
+class TestMultiChainAccount(object):
+    def test_addresses(self):
+        account = MultiChainAccount(priv_key=SECRET)
+
+        assert account.ethereum_address() == ETHEREUM_ADDRESS
+        assert account.p2pkh_address() == P2PKH_ADDRESS
+        assert account.p2sh_p2wpkh_address() == P2SH_P2WPKH_ADDRESS
+        assert account.p2wpkh_address() == P2WPKH_ADDRESS
+        assert account.wif() == WIF
+
+    def test_testnet(self):
+        account = MultiChainAccount(priv_key=SECRET, network=BitcoinTestNet)
+
+        assert account.network_name == 'testnet'
+        assert account.ethereum_address() == ETHEREUM_ADDRESS
+        assert account.p2pkh_address() == 'mrCDrCybB6J1vRfbwM5hemdJz73FwDBC8r'
+        assert account.p2wpkh_address() == 'tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx'
+        assert bech32.decode('tb', account.p2wpkh_address()) == bech32.decode('bc', P2WPKH_ADDRESS)
+
+    def test_public_only(self):
+        pub_key = MultiChainAccount(priv_key=SECRET)._pub_key_bytes()
+        account = MultiChainAccount(pub_key=pub_key)
+
+        assert not account.has_private_keys
+        assert account.p2wpkh_address() == P2WPKH_ADDRESS
+        assert account.serialize().priv_key is None
+
+        with pytest.raises(ValueError):
+            account.wif()
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            MultiChainAccount()
+
+        with pytest.raises(ValueError):
+            MultiChainAccount(priv_key=SECRET, network='mainnet')
+
+        with pytest.raises(ValueError):
+            MultiChainAccount(priv_key=bytes(31))
+
+    def test_generate(self):
+        account = MultiChainAccount.generate(testnet=True)
+        signing_key = SigningKey.from_string(account._priv_key, curve=SECP256k1)
+
+        assert account._pub_key == signing_key.get_verifying_key().to_string()
+        assert account._network is BitcoinTestNet
+
+    def test_matches_ethereum_account(self):
+        account = MultiChainAccount.generate()
+        ethereum = account.ethereum_account()
+
+        assert ethereum.address() == account.ethereum_address()
+        assert ethereum.priv_key() == account.priv_key()
+        assert EthereumAccount(priv_key=account.priv_key()).address() == account.ethereum_address()
+
+    def test_serialize(self):
+        record = MultiChainAccount(priv_key=SECRET).serialize()
+
+        assert record.network == 'mainnet'
+        assert record.priv_key == SECRET.hex()
+        assert record.wif == WIF
+        assert (record.ethereum, record.p2pkh, record.p2sh_p2wpkh, record.p2wpkh) == (ETHEREUM_ADDRESS,
+                                                                                     P2PKH_ADDRESS,
+                                                                                     P2SH_P2WPKH_ADDRESS,
+                                                                                     P2WPKH_ADDRESS)
+
+class TestFromSecrets(object):
+    def test_batches(self):
+        secrets = [1] + list(range(0xdeadbeef, 0xdeadbeef + 1000, 97))
+        accounts = list(MultiChainAccount.from_secrets(secrets, batch_size=3))
+
+        assert [account._priv_key for account in accounts] == [secret.to_bytes(32, 'big') for secret in secrets]
+        assert accounts[0].p2wpkh_address() == P2WPKH_ADDRESS
+
+        for secret, account in zip(secrets, accounts):
+            assert account._pub_key == SigningKey.from_secret_exponent(secret, curve=SECP256k1).get_verifying_key().to_string()
+            assert account._network is BitcoinMainNet
+
+    def test_bytes(self):
+        account, = MultiChainAccount.from_secrets([SECRET], testnet=True)
+
+        assert account.ethereum_address() == ETHEREUM_ADDRESS
+        assert account.network_name == 'testnet'
+
+    def test_invalid_secret(self):
+        with pytest.raises(ValueError):
+            list(MultiChainAccount.from_secrets([1, 0]))
+
+    def test_empty(self):
+        assert list(MultiChainAccount.from_secrets([])) == []
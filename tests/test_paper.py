@@ -0,0 +1,146 @@
+import io
+import mock
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from PIL.PdfParser import PdfParser
+
+from papyrus import qr
+from papyrus.exceptions import PapyrusException
+from papyrus.paper import (MIN_QR_SIZE,
+                           PDFWriter,
+                           _qr_image,
+                           max_per_page,
+                           render_page,
+                           render_pages,
+                           save_pages,
+                           )
+
+# Low resolution pages keep the tests fast
+DPI = 50
+
+ETHEREUM_ADDRESS = '0x7a7bfcadd5381864ebe4d88b3afad4aabd770fc0'
+BITCOIN_ADDRESS = '12P4LrrBSWAS1DHKvbQTdNKZkmXvvBS8a1'
+
+WALLETS = [('address{}'.format(i), 'encrypted_key{}'.format(i)) for i in range(5)]
+
+class TestQRImage(object):
+    def test_scaled_to_whole_modules(self):
+        image = _qr_image('test_address', 100)
+
+        # Version 1 codes are 21 modules wide, without a border
+        assert image.mode == '1'
+        assert image.size == (84, 84)
+
+    def test_never_smaller_than_one_pixel_per_module(self):
+        assert _qr_image('test_address', 10).size == (21, 21)
+
+class TestRenderPage(object):
+    def test_page_size(self):
+        assert render_page(WALLETS[:2], dpi=DPI).size == (425, 550)
+        assert render_page(WALLETS[:2], page_size='a4', dpi=DPI).size == (413, 584)
+
+    def test_watch_only(self):
+        page = render_page([('test_address', None)], dpi=DPI)
+
+        # Nothing is drawn on the right half of the page
+        assert page.crop((page.size[0] // 2, 0) + page.size).convert('L').getextrema() == (255, 255)
+
+    def test_invalid_page_size(self):
+        with pytest.raises(PapyrusException):
+            render_page(WALLETS[:1], page_size='legal', dpi=DPI)
+
+    @pytest.mark.parametrize('address, account_type', [(ETHEREUM_ADDRESS, 'ethereum'),
+                                                       (BITCOIN_ADDRESS, 'bitcoin')])
+    def test_address_profile(self, address, account_type):
+        with mock.patch('papyrus.qr.encode', wraps=qr.encode) as mock_encode:
+            render_page([(address, 'encrypted_key')], dpi=DPI)
+
+        # Addresses get the pinned (and cached) profile of their account type,
+        # the encrypted key the smallest code that fits
+        assert mock_encode.call_args_list == [mock.call(address, account_type=account_type),
+                                              mock.call('encrypted_key', account_type=None)]
+
+    def test_per_page(self):
+        for page_size in ('letter', 'a4'):
+            per_page = max_per_page(page_size)
+
+            with mock.patch('papyrus.paper._qr_image', wraps=_qr_image) as mock_qr_image:
+                render_page(WALLETS[:per_page], page_size=page_size, dpi=DPI, per_page=per_page)
+
+            # Even the fullest page keeps every qrcode at a printable size
+            assert min(size for (_, size), _ in mock_qr_image.call_args_list) >= MIN_QR_SIZE * DPI
+
+            for per_page in (0, per_page + 1):
+                with pytest.raises(PapyrusException):
+                    render_page(WALLETS[:1], page_size=page_size, dpi=DPI, per_page=per_page)
+
+class TestRenderPages(object):
+    def test_in_process(self):
+        pages = list(render_pages(WALLETS, dpi=DPI, per_page=2, workers=1))
+
+        assert len(pages) == 3
+        assert pages[0].tobytes() == render_page(WALLETS[:2], dpi=DPI, per_page=2).tobytes()
+        assert pages[2].tobytes() == render_page(WALLETS[4:], dpi=DPI, per_page=2).tobytes()
+
+    def test_executor_keeps_order(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pages = list(render_pages(WALLETS, dpi=DPI, per_page=1, workers=2, executor=executor))
+
+        assert [page.tobytes() for page in pages] == [render_page([wallet], dpi=DPI, per_page=1).tobytes()
+                                                      for wallet in WALLETS]
+
+    def test_empty(self):
+        assert list(render_pages([], dpi=DPI, workers=1)) == []
+
+class TestPDFWriter(object):
+    def test_write(self):
+        stream = io.BytesIO()
+        writer = PDFWriter(stream, dpi=DPI)
+
+        page = render_page(WALLETS[:1], dpi=DPI)
+        writer.add_page(page)
+        writer.add_page(page.convert('L'))
+        writer.close()
+
+        parser = PdfParser(buf=stream.getvalue())
+        assert len(parser.pages) == 2
+        assert parser.read_indirect(parser.pages[0])[b'MediaBox'] == [0, 0, 612, 792]
+
+class TestSavePages(object):
+    def setup_method(self):
+        self.pages = [Image.new('1', (10, 20), 1) for _ in range(3)]
+
+    def test_pdf(self, tmpdir):
+        output = str(tmpdir.join('wallets.pdf'))
+
+        assert save_pages(iter(self.pages), output, dpi=DPI) == 3
+        assert len(PdfParser(output).pages) == 3
+
+    def test_pdf_failure(self, tmpdir):
+        output = tmpdir.join('wallets.pdf')
+        output.write(b'previous wallets', mode='wb')
+
+        def pages():
+            yield self.pages[0]
+            raise PapyrusException('No address found on line 2')
+
+        with pytest.raises(PapyrusException):
+            save_pages(pages(), str(output), dpi=DPI)
+
+        # The previous document is untouched and nothing is left behind
+        assert output.read(mode='rb') == b'previous wallets'
+        assert [f.basename for f in tmpdir.listdir()] == ['wallets.pdf']
+
+    def test_png(self, tmpdir):
+        output = str(tmpdir.join('wallets.png'))
+
+        assert save_pages(iter(self.pages), output, dpi=DPI) == 3
+        assert sorted(f.basename for f in tmpdir.listdir()) == ['wallets-0001.png',
+                                                                'wallets-0002.png',
+                                                                'wallets-0003.png']
+
+    def test_invalid_extension(self, tmpdir):
+        with pytest.raises(PapyrusException):
+            save_pages(iter(self.pages), str(tmpdir.join('wallets.jpg')))
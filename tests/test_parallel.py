@@ -0,0 +1,44 @@
+import mock
+
+from concurrent.futures import ThreadPoolExecutor
+
+from papyrus.parallel import error_message, map_chunked
+
+def square(value):
+    return value * value
+
+class TestMapChunked(object):
+    def test_in_process(self):
+        with mock.patch('concurrent.futures.ProcessPoolExecutor') as mock_executor:
+            assert map_chunked(square, iter(range(5)), workers=1) == [0, 1, 4, 9, 16]
+
+        assert not mock_executor.called
+
+    def test_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with mock.patch.object(executor, 'map', wraps=executor.map) as mock_map:
+                actual = map_chunked(square, range(100), workers=2, executor=executor)
+
+        assert actual == [value * value for value in range(100)]
+        # A few chunks per worker
+        assert mock_map.call_args[1] == {'chunksize': 12}
+
+    def test_chunksize(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with mock.patch.object(executor, 'map', wraps=executor.map) as mock_map:
+                map_chunked(square, range(3), workers=4, chunksize=2, executor=executor)
+                map_chunked(square, range(3), workers=4, executor=executor)
+
+        assert [call[1] for call in mock_map.call_args_list] == [{'chunksize': 2}, {'chunksize': 1}]
+
+    def test_process_pool(self):
+        assert map_chunked(square, range(10), workers=2) == [value * value for value in range(10)]
+
+    def test_empty(self):
+        assert map_chunked(square, [], workers=1) == []
+        assert map_chunked(square, [], workers=2) == []
+
+class TestErrorMessage(object):
+    def test_error_message(self):
+        assert error_message(ValueError('Invalid passphrase')) == 'Invalid passphrase'
+        assert error_message(KeyError()) == 'KeyError'
@@ -0,0 +1,115 @@
+import io
+import mock
+import qrcode
+import pytest
+
+from papyrus import qr
+
+ETHEREUM_ADDRESS = '0x7a7bfcadd5381864ebe4d88b3afad4aabd770fc0'
+BITCOIN_ADDRESS = '12P4LrrBSWAS1DHKvbQTdNKZkmXvvBS8a1'
+
+def reference_matrix(data, **kwargs):
+    code = qrcode.QRCode(border=0, **kwargs)
+    code.add_data(data, optimize=0)
+    code.make(fit=kwargs.get('version') is None)
+    return tuple(tuple(row) for row in code.get_matrix())
+
+class TestEncode(object):
+    def setup_method(self):
+        qr.clear_cache()
+
+    @pytest.mark.parametrize('account_type, address', [('ethereum', ETHEREUM_ADDRESS),
+                                                       ('bitcoin', BITCOIN_ADDRESS),
+                                                       ])
+    def test_pinned_version(self, account_type, address):
+        actual = qr.encode(address, account_type=account_type)
+
+        # Version 3 codes are 29 modules wide
+        assert len(actual) == 29
+        assert actual == reference_matrix(address, version=3)
+
+    def test_unknown_account_type(self):
+        assert qr.encode('test_data') == reference_matrix('test_data')
+
+    def test_bytes(self):
+        assert qr.encode(b'\xfftest_data') == reference_matrix(b'\xfftest_data')
+
+    def test_overflow(self):
+        data = ETHEREUM_ADDRESS * 2
+
+        assert qr.encode(data, account_type='ethereum') == reference_matrix(data)
+
+    def test_fixed_mask(self):
+        actual = qr.encode(ETHEREUM_ADDRESS, account_type='ethereum', mask=5)
+
+        assert actual == reference_matrix(ETHEREUM_ADDRESS, version=3, mask_pattern=5)
+
+    def test_cache(self):
+        first = qr.encode(ETHEREUM_ADDRESS, account_type='ethereum')
+        second = qr.encode(ETHEREUM_ADDRESS, account_type='ethereum')
+
+        assert first is second
+        assert qr.cache_info().hits == 1
+        assert qr.cache_info().misses == 1
+
+    def test_key_material_not_cached(self):
+        qr.encode('test_priv_key')
+        qr.make_image('test_encrypted_key')
+
+        assert qr.cache_info().currsize == 0
+
+class TestRender(object):
+    def test_to_image(self):
+        image = qr.to_image(qr.encode('test_data'), box_size=3).convert('L')
+
+        # 21 modules plus a quiet zone of 4 on each side
+        assert image.size == (87, 87)
+        assert image.getpixel((0, 0)) == 255
+        assert image.getpixel((12, 12)) == 0
+
+    def test_make_image(self):
+        assert qr.make_image(ETHEREUM_ADDRESS, account_type='ethereum', box_size=1, border=0).size == (29, 29)
+
+    def test_to_terminal(self):
+        matrix = ((True, False, True),
+                  (True, True, False),
+                  (False, True, False))
+
+        assert qr.to_terminal(matrix, border=0) == ('\033[30;47m\u2588\u2584\u2580\033[0m\n'
+                                                    '\033[30;47m \u2580 \033[0m\n')
+
+    def test_to_terminal_size(self):
+        lines = qr.to_terminal(qr.encode('test_data')).splitlines()
+
+        # 21 modules plus a quiet zone of 2 on each side, two rows per line
+        assert len(lines) == 13
+        assert all(len(line) == len('\033[30;47m\033[0m') + 25 for line in lines)
+
+    def test_to_terminal_full_blocks(self):
+        assert qr.to_terminal_full_blocks(((True, False),), border=0) == ('\033[0;37;40m  '
+                                                                          '\033[0;37;47m  '
+                                                                          '\033[0m\n')
+
+class TestDraw(object):
+    def test_single_write(self):
+        buffer = mock.MagicMock()
+        stream = mock.MagicMock(buffer=buffer, encoding='utf-8')
+
+        qr.draw('test_data', stream=stream)
+
+        buffer.write.assert_called_once_with(qr.to_terminal(qr.encode('test_data')).encode('utf-8'))
+        assert not stream.write.called
+
+    def test_ascii_terminal(self):
+        stream = io.TextIOWrapper(io.BytesIO(), encoding='ascii')
+
+        qr.draw('test_data', stream=stream)
+
+        assert stream.buffer.getvalue().decode('ascii') == qr.to_terminal_full_blocks(qr.encode('test_data'))
+
+    def test_without_buffer(self):
+        stream = io.StringIO()
+
+        qr.draw('test_data', stream=stream)
+
+        assert stream.getvalue() == qr.to_terminal(qr.encode('test_data'))
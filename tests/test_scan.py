@@ -0,0 +1,133 @@
+import mock
+import pytest
+
+from PIL import Image
+
+from papyrus import qr, scan
+from papyrus.exceptions import PapyrusException
+from papyrus.scan import (DecodeResult,
+                          MAX_SCAN_SIZE,
+                          _otsu_threshold,
+                          decode,
+                          decode_many,
+                          list_images,
+                          prepare,
+                          )
+
+class ZbarTestCase(object):
+    def setup_method(self):
+        self.zbar = mock.MagicMock()
+        self.symbol = mock.MagicMock(data='test_payload')
+        self.zbar.Image.return_value.__iter__.side_effect = lambda: iter([self.symbol])
+
+        self.modules_patcher = mock.patch.dict('sys.modules', {'zbar': self.zbar})
+        self.modules_patcher.start()
+        scan._scanner = None
+
+    def teardown_method(self):
+        self.modules_patcher.stop()
+        scan._scanner = None
+
+class TestOtsuThreshold(object):
+    def test_bimodal(self):
+        histogram = [0] * 256
+        histogram[30] = 1000
+        histogram[220] = 3000
+
+        assert 30 <= _otsu_threshold(histogram) < 220
+
+    def test_uniform_image(self):
+        histogram = [0] * 256
+        histogram[255] = 1000
+
+        assert _otsu_threshold(histogram) == 128
+
+class TestPrepare(object):
+    def test_crop_and_scale(self):
+        code = qr.make_image('test_payload', box_size=60, border=0).convert('L')
+        page = Image.new('L', (4000, 4000), 200)
+        page.paste(code, (1000, 1500))
+
+        actual = prepare(page)
+
+        assert max(actual.size) == MAX_SCAN_SIZE
+        # Cropped to the code and its margin, which are square
+        assert abs(actual.size[0] - actual.size[1]) <= 1
+        # Only black and white pixels are left
+        assert sum(actual.histogram()[1:255]) == 0
+
+    def test_small_image(self):
+        code = qr.make_image('test_payload', box_size=2).convert('L')
+
+        assert max(prepare(code).size) <= max(code.size)
+
+class TestDecode(ZbarTestCase):
+    def setup_method(self):
+        super().setup_method()
+        self.image = Image.new('L', (50, 50), 255)
+
+        self.open_patcher = mock.patch('PIL.Image.open')
+        self.mock_open = self.open_patcher.start()
+        self.mock_open.return_value.__enter__.return_value = self.image
+
+    def teardown_method(self):
+        self.open_patcher.stop()
+        super().teardown_method()
+
+    def test_decode(self):
+        assert decode('test.png') == 'test_payload'
+        self.zbar.ImageScanner.return_value.parse_config.assert_called_once_with('enable')
+
+    def test_bytes_payload(self):
+        self.symbol.data = b'test_payload'
+
+        assert decode('test.png') == 'test_payload'
+
+    def test_scanner_reused(self):
+        decode('test1.png')
+        decode('test2.png')
+
+        assert self.zbar.ImageScanner.call_count == 1
+        assert self.zbar.ImageScanner.return_value.scan.call_count == 2
+
+    def test_retry_without_preparing(self):
+        results = iter([[], [self.symbol]])
+        self.zbar.Image.return_value.__iter__.side_effect = lambda: iter(next(results))
+
+        assert decode('test.png') == 'test_payload'
+        assert self.zbar.ImageScanner.return_value.scan.call_count == 2
+
+    def test_not_found(self):
+        self.zbar.Image.return_value.__iter__.side_effect = lambda: iter([])
+
+        with pytest.raises(PapyrusException):
+            decode('test.png')
+
+class TestDecodeMany(ZbarTestCase):
+    @mock.patch('papyrus.scan.decode')
+    def test_failures_do_not_abort(self, mock_decode):
+        def decode(filename):
+            if filename == 'bad.png':
+                raise PapyrusException('No qrcode found')
+            return filename.upper()
+
+        mock_decode.side_effect = decode
+
+        actual = decode_many(['a.png', 'bad.png', 'b.png'], workers=1)
+
+        assert actual == [DecodeResult(file='a.png', payload='A.PNG', error=None),
+                          DecodeResult(file='bad.png', payload=None, error='No qrcode found'),
+                          DecodeResult(file='b.png', payload='B.PNG', error=None)]
+
+class TestListImages(object):
+    def test_list_images(self, tmpdir):
+        for name in ('b.PNG', 'a.jpg', 'notes.txt'):
+            tmpdir.join(name).write('')
+        tmpdir.mkdir('c.png')
+
+        assert list_images(str(tmpdir)) == [str(tmpdir.join('a.jpg')),
+                                            str(tmpdir.join('b.PNG'))]
+
+    def test_not_a_directory(self, tmpdir):
+        with pytest.raises(PapyrusException):
+            list_images(str(tmpdir.join('missing')))
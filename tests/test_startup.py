@@ -0,0 +1,74 @@
+import os
+import sys
+import pytest
+import subprocess
+
+import papyrus
+
+# Budget for `import papyrus` (cumulative microseconds reported by
+# -X importtime). The package itself should cost a few milliseconds, the
+# budget leaves plenty of headroom for slow CI machines.
+IMPORT_BUDGET_US = 50000
+
+HEAVY_MODULES = ('PIL',
+                 'bitmerchant',
+                 'blessings',
+                 'cryptography',
+                 'ecdsa',
+                 'lockbox',
+                 'qrcode',
+                 'sha3',
+                 'zbar',
+                 )
+
+def run_python(code, *args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+
+    return subprocess.run([sys.executable] + list(args) + ['-c', code],
+                          env=env,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE,
+                          universal_newlines=True,
+                          check=True)
+
+def loaded_heavy_modules(code):
+    result = run_python(code + '\n'
+                        'import sys\n'
+                        'print(",".join(sorted(set(name.split(".")[0] for name in sys.modules))))')
+    loaded = result.stdout.strip().split(',')
+
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+class TestStartup(object):
+    def test_import_papyrus(self):
+        assert loaded_heavy_modules('import papyrus') == []
+
+    def test_cli_startup_modules(self):
+        # Everything scripts/papyrus imports before dispatching a command
+        assert loaded_heavy_modules('import docopt\n'
+                                    'import papyrus.exceptions\n'
+                                    'import papyrus.formats\n'
+                                    'import papyrus._version') == []
+
+    def test_lazy_attribute(self):
+        result = run_python('import papyrus\n'
+                            'print(papyrus.EthereumAccount.__module__)')
+
+        assert result.stdout.strip() == 'papyrus.account'
+
+    def test_unknown_attribute(self):
+        with pytest.raises(AttributeError):
+            papyrus.not_an_attribute
+
+    def test_import_budget(self):
+        result = run_python('import papyrus', '-X', 'importtime')
+
+        cumulative = None
+        for line in result.stderr.splitlines():
+            parts = [part.strip() for part in line.split('|')]
+            if len(parts) == 3 and parts[2] == 'papyrus':
+                cumulative = int(parts[1])
+
+        assert cumulative is not None
+        assert cumulative < IMPORT_BUDGET_US
@@ -0,0 +1,166 @@
+import mock
+import base58
+import pytest
+
+from bitmerchant.network import BitcoinTestNet, BitcoinMainNet
+from bitmerchant.wallet import Wallet
+
+from papyrus.account import BitcoinAccount, EthereumAccount
+from papyrus.exceptions import PapyrusException
+from papyrus.table import HEADER, AccountTable
+
+def ethereum_accounts(count):
+    return [EthereumAccount(priv_key=(i + 1).to_bytes(32, 'big')) for i in range(count)]
+
+def bitcoin_accounts(count, network=BitcoinTestNet):
+    wallet = Wallet.from_master_secret(b'papyrus test seed', network=network)
+    return [BitcoinAccount(priv_key=wallet.get_child(i).serialize_b58(private=True), network=network)
+            for i in range(count)]
+
+class TestAccountTableInit(object):
+    def test_invalid_account_cls(self):
+        with pytest.raises(ValueError):
+            AccountTable(object)
+
+class TestAccountTableFromAccounts(object):
+    def setup_method(self):
+        self.accounts = ethereum_accounts(4)
+
+    def test_from_accounts(self):
+        table = AccountTable.from_accounts(iter(self.accounts))
+
+        assert len(table) == 4
+        assert table.account_cls is EthereumAccount
+        assert [account.address() for account in table] == [account.address() for account in self.accounts]
+        assert [account.pub_key() for account in table] == [account.pub_key() for account in self.accounts]
+
+    def test_rows_are_watch_only(self):
+        table = AccountTable.from_accounts(self.accounts)
+
+        assert not table[0].has_private_keys
+        assert table[-1].address() == self.accounts[-1].address()
+
+        with pytest.raises(IndexError):
+            table[4]
+
+    def test_encryptor(self):
+        encryptor = mock.MagicMock()
+        encryptor.encrypt.side_effect = lambda priv_key: priv_key.encode('ascii')
+
+        table = AccountTable.from_accounts(self.accounts, encryptor=encryptor)
+
+        assert [table.encrypted_key(row) for row in range(4)] == [account.priv_key().encode('ascii')
+                                                                  for account in self.accounts]
+
+    def test_no_encrypted_key(self):
+        table = AccountTable.from_accounts(self.accounts)
+
+        assert table.encrypted_key(0) is None
+
+    def test_empty(self):
+        with pytest.raises(ValueError):
+            AccountTable.from_accounts([])
+
+        assert len(AccountTable.from_accounts([], account_cls=BitcoinAccount)) == 0
+
+    def test_mixed_account_types(self):
+        with pytest.raises(ValueError):
+            AccountTable.from_accounts(self.accounts + bitcoin_accounts(1))
+
+class TestAccountTableColumns(object):
+    def test_ethereum(self):
+        accounts = ethereum_accounts(3)
+        table = AccountTable.from_accounts(accounts)
+
+        assert table.addresses() == [account.address() for account in accounts]
+        assert table.pub_keys() == [account.pub_key() for account in accounts]
+
+    def test_bitcoin(self):
+        accounts = bitcoin_accounts(2) + bitcoin_accounts(1, network=BitcoinMainNet)
+        table = AccountTable(BitcoinAccount)
+        table.extend(accounts)
+
+        assert table.addresses() == [account.address() for account in accounts]
+        assert table.pub_keys() == [account.pub_key() for account in accounts]
+        assert [account.network_name for account in table] == ['testnet', 'testnet', 'mainnet']
+
+class TestAccountTableFind(object):
+    def setup_method(self):
+        self.accounts = ethereum_accounts(8)
+        self.table = AccountTable.from_accounts(self.accounts)
+
+    def test_unsorted(self):
+        assert not self.table.is_sorted
+
+        for row, account in enumerate(self.accounts):
+            assert self.table.find(account.address()) == row
+            assert self.table.find(account._address_bytes()) == row
+
+    def test_sorted(self):
+        self.table.sort()
+
+        assert self.table.is_sorted
+        assert self.table.addresses() == sorted(account.address() for account in self.accounts)
+        for account in self.accounts:
+            assert self.table[self.table.find(account.address())].pub_key() == account.pub_key()
+
+    def test_missing(self):
+        assert self.table.find('0x' + '00' * 20) is None
+        assert '0x' + 'ff' * 20 not in self.table
+        assert self.accounts[3].address() in self.table
+
+    def test_append_after_lookup(self):
+        self.table.find(self.accounts[0].address())
+        account = ethereum_accounts(9)[-1]
+        self.table.append(account)
+
+        assert self.table.find(account.address()) == 8
+
+    def test_invalid_address(self):
+        with pytest.raises(ValueError):
+            self.table.find('0x1234')
+
+    def test_bitcoin_network(self):
+        account = bitcoin_accounts(1)[0]
+        table = AccountTable.from_accounts([account])
+        mainnet_address = base58.b58encode_check(bytes([BitcoinMainNet.PUBKEY_ADDRESS]) +
+                                                 account._address_bytes()).decode('ascii')
+
+        assert table.find(account.address()) == 0
+        assert table.find(account._address_bytes()) == 0
+        assert table.find(mainnet_address) is None
+
+class TestAccountTableSaveLoad(object):
+    def test_round_trip(self, tmpdir):
+        filename = str(tmpdir.join('accounts.tbl'))
+        accounts = bitcoin_accounts(3) + bitcoin_accounts(1, network=BitcoinMainNet)
+        table = AccountTable.from_accounts(accounts)
+        table.append(accounts[0], encrypted_key='test_encrypted_key')
+        table.sort()
+
+        table.save(filename)
+        loaded = AccountTable.load(filename)
+
+        assert loaded.account_cls is BitcoinAccount
+        assert loaded.is_sorted
+        assert loaded.addresses() == table.addresses()
+        assert loaded.pub_keys() == table.pub_keys()
+        assert [loaded.encrypted_key(row) for row in range(5)] == [table.encrypted_key(row) for row in range(5)]
+        assert b'test_encrypted_key' in [loaded.encrypted_key(row) for row in range(5)]
+
+    def test_not_a_table(self, tmpdir):
+        filename = tmpdir.join('accounts.tbl')
+        filename.write(b'not a table', mode='wb')
+
+        with pytest.raises(PapyrusException):
+            AccountTable.load(str(filename))
+
+    def test_truncated(self, tmpdir):
+        filename = str(tmpdir.join('accounts.tbl'))
+        AccountTable.from_accounts(ethereum_accounts(2)).save(filename)
+
+        with open(filename, 'r+b') as f:
+            f.truncate(HEADER.size + 30)
+
+        with pytest.raises(PapyrusException):
+            AccountTable.load(filename)
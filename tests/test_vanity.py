@@ -0,0 +1,130 @@
+import mock
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from papyrus.account import (BitcoinAccount,
+                             EthereumAccount,
+                             PapyrusException,
+                             )
+from papyrus.vanity import (BITCOIN_BATCH_SIZE,
+                            ETHEREUM_BATCH_SIZE,
+                            VanityPattern,
+                            estimate_seconds,
+                            find_vanity,
+                            )
+
+class TestVanityPatternInit(object):
+    def test_missing_pattern(self):
+        with pytest.raises(PapyrusException):
+            VanityPattern(EthereumAccount)
+
+    def test_invalid_account_cls(self):
+        with pytest.raises(PapyrusException):
+            VanityPattern(mock.MagicMock, prefix='a')
+
+    def test_ethereum_invalid_characters(self):
+        with pytest.raises(PapyrusException):
+            VanityPattern(EthereumAccount, prefix='xyz')
+
+    def test_ethereum_normalizes_prefix(self):
+        pattern = VanityPattern(EthereumAccount, prefix='0xABC', suffix='DE')
+
+        assert pattern.prefix == 'abc'
+        assert pattern.suffix == 'de'
+
+    def test_bitcoin_invalid_characters(self):
+        with pytest.raises(PapyrusException):
+            VanityPattern(BitcoinAccount, prefix='1O')
+
+    def test_bitcoin_invalid_leading_character(self):
+        with pytest.raises(PapyrusException):
+            VanityPattern(BitcoinAccount, prefix='2abc')
+
+    def test_bitcoin_testnet_leading_character(self):
+        with pytest.raises(PapyrusException):
+            VanityPattern(BitcoinAccount, prefix='1abc', testnet=True)
+
+        VanityPattern(BitcoinAccount, prefix='mabc', testnet=True)
+
+class TestVanityPatternMatches(object):
+    def test_ethereum(self):
+        pattern = VanityPattern(EthereumAccount, prefix='ab', suffix='ef')
+
+        assert pattern.matches('0xab0000000000000000000000000000000000ef')
+        assert not pattern.matches('0xac0000000000000000000000000000000000ef')
+        assert not pattern.matches('0xab0000000000000000000000000000000000ee')
+
+    def test_bitcoin(self):
+        pattern = VanityPattern(BitcoinAccount, prefix='1Pap')
+
+        assert pattern.matches('1PapyrusAddress')
+        assert not pattern.matches('1papyrusAddress')
+
+    def test_regex(self):
+        pattern = VanityPattern(EthereumAccount, regex='^0x[0-9]+$')
+
+        assert pattern.matches('0x1234')
+        assert not pattern.matches('0x12a4')
+
+class TestVanityPatternDifficulty(object):
+    def test_ethereum(self):
+        pattern = VanityPattern(EthereumAccount, prefix='ab', suffix='c')
+
+        assert pattern.difficulty() == 16 ** 3
+
+    def test_bitcoin(self):
+        pattern = VanityPattern(BitcoinAccount, prefix='1Ab', suffix='z')
+
+        assert pattern.difficulty() == 58 ** 3
+
+    def test_bitcoin_testnet(self):
+        pattern = VanityPattern(BitcoinAccount, prefix='mA', testnet=True)
+
+        assert pattern.difficulty() == 2 * 58
+
+    def test_regex(self):
+        pattern = VanityPattern(EthereumAccount, prefix='ab', regex='a')
+
+        assert pattern.difficulty() is None
+
+class TestEstimateSeconds(object):
+    def test_estimate(self):
+        assert estimate_seconds(1000, 100) == 10
+
+    def test_unknown(self):
+        assert estimate_seconds(None, 100) is None
+        assert estimate_seconds(1000, 0) is None
+
+class TestFindVanity(object):
+    def test_ethereum(self):
+        progress = mock.MagicMock()
+
+        account = find_vanity(EthereumAccount,
+                              prefix='a',
+                              workers=2,
+                              batch_size=4,
+                              progress=progress)
+
+        assert account.address().startswith('0xa')
+        assert len(account.priv_key()) == 64
+
+    def test_bitcoin(self):
+        account = find_vanity(BitcoinAccount,
+                              suffix='a',
+                              testnet=True,
+                              workers=2,
+                              batch_size=4)
+
+        assert account.address().endswith('a')
+        assert account.address()[0] in 'mn'
+
+    @pytest.mark.parametrize('account_cls, batch_size', [(EthereumAccount, ETHEREUM_BATCH_SIZE),
+                                                         (BitcoinAccount, BITCOIN_BATCH_SIZE)])
+    @mock.patch('papyrus.vanity.ProcessPoolExecutor', ThreadPoolExecutor)
+    @mock.patch('papyrus.vanity._load_account')
+    def test_default_batch_size(self, mock_load_account, account_cls, batch_size):
+        with mock.patch('papyrus.vanity._search', side_effect=[(1, None), (1, b'secret')]) as mock_search:
+            assert find_vanity(account_cls, regex='.', workers=1) == mock_load_account.return_value
+
+        assert {call[0][0][2] for call in mock_search.call_args_list} == {batch_size}